@@ -1,41 +1,99 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import (Flask, render_template, request, jsonify, send_file, Response,
+                   stream_with_context, redirect, url_for, g)
 from flask_cors import CORS
-import sqlite3
 from datetime import datetime
-import json
-from scraper import CourtScraper
+from driver_pool import get_pool
+from case_service import lookup_case, get_cached_case
+from case_cache import case_cache
+from rate_limiter import rate_limiter
+from resilience import resilience
+from single_flight import single_flight, StillRunning
+import tracing
+from log_config import get_logger, request_id
+from batch_lookup import run_batch
+from case_import import import_cases
+from judgment_stream import DownloadRejected, check_source
+import judgment_store
+import judgment_text
+import watchlist
+from history import list_history
+from search import search, search_judgments
+from causelist_store import get_causelist, get_stored_causelist, start_prefetcher
+from config_file import (BATCH, CAUSELIST, ECOURTS_URLS, JUDGMENT_TEXT, SCRAPING, SINGLE_FLIGHT, STARTUP,
+                         TRACING, WATCHLIST)
+import jobs
+import db
 import os
+import json
+import threading
+import uuid
 
 app = Flask(__name__)
 CORS(app)
 
-# Database setup
-def init_db():
-    conn = sqlite3.connect('court_data.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS queries
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  case_type TEXT,
-                  case_number TEXT,
-                  year TEXT,
-                  court_type TEXT,
-                  court_name TEXT,
-                  query_time TIMESTAMP,
-                  raw_response TEXT,
-                  parsed_data TEXT,
-                  status TEXT)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS judgments
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  query_id INTEGER,
-                  filename TEXT,
-                  file_path TEXT,
-                  download_time TIMESTAMP,
-                  FOREIGN KEY(query_id) REFERENCES queries(id))''')
-    conn.commit()
-    conn.close()
-
-init_db()
+logger = get_logger(__name__)
+
+# The schema is applied by `python setup.py` / `python db.py migrate` and by
+# gunicorn's master (gunicorn.conf.py), so importing the app never touches the database
+
+def _warm_http_sessions():
+    from http_backend import get_session_pool
+
+    for base_url in (ECOURTS_URLS['high_court_main'], ECOURTS_URLS['district_court_main']):
+        try:
+            get_session_pool().warm_up(base_url)
+        except Exception as e:
+            logger.warning('HTTP session warm-up failed', extra={'url': base_url, 'error': str(e)})
+
+def warm_up_worker():
+    """
+    Open this process's pools before it takes traffic
+    Called by gunicorn's post_fork hook and by the dev server. SQLite
+    connections are per thread and gthread workers serve requests on their
+    own pool threads, so each of those opens its connection on first use
+    """
+    # Network and browser warm-up run in the background so the worker can start accepting
+    if STARTUP['warm_http_sessions'] and SCRAPING['mode'] == 'live':
+        threading.Thread(target=_warm_http_sessions, daemon=True).start()
+    if STARTUP['warm_browsers']:
+        threading.Thread(target=get_pool().warm_up, daemon=True).start()
+
+@app.before_request
+def start_request_trace():
+    g.request_id_token = request_id.set(request.headers.get('X-Request-ID') or uuid.uuid4().hex)
+    g.trace, g.trace_token = tracing.start_trace()
+
+@app.after_request
+def add_server_timing(response):
+    """Expose the request's stage breakdown and record its latency"""
+    trace = g.pop('trace', None)
+    if trace is None:
+        return response
+
+    if TRACING['server_timing']:
+        response.headers['Server-Timing'] = trace.server_timing()
+    response.headers['X-Request-ID'] = request_id.get()
+
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    tracing.REQUEST_SECONDS.observe((endpoint, request.method, str(response.status_code)), trace.elapsed())
+    logger.info('request', extra={'method': request.method, 'endpoint': endpoint,
+                                  'status': response.status_code,
+                                  'duration_ms': round(trace.elapsed() * 1000, 1)})
+    return response
+
+@app.teardown_request
+def end_request_trace(exc):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        tracing.end_trace(token)
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id.reset(token)
+
+@app.route('/metrics')
+def metrics():
+    """Stage and request latency histograms in Prometheus text format"""
+    return Response(tracing.render_metrics(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -54,39 +112,89 @@ def fetch_case():
         if not all([case_type, case_number, year]):
             return jsonify({'error': 'Missing required fields', 'status': 'error'}), 400
         
-        scraper = CourtScraper()
-        result = scraper.fetch_case_details(
-            case_type=case_type,
-            case_number=case_number,
-            year=year,
-            court_type=court_type,
-            court_name=court_name
-        )
+        refresh = bool(data.get('refresh'))
+        payload = {
+            'case_type': case_type,
+            'case_number': case_number,
+            'year': year,
+            'court_type': court_type,
+            'court_name': court_name,
+            'refresh': refresh
+        }
+        
+        if data.get('async'):
+            # Cache hits are answered straight away; only real scrapes are queued
+            cached = None if refresh else get_cached_case(case_type, case_number, year,
+                                                          court_type, court_name)
+            if cached is not None:
+                return jsonify(cached)
+            
+            job_id = jobs.enqueue('fetch_case', payload)
+            return jsonify({'status': 'queued', 'job_id': job_id}), 202
+        
+        try:
+            result = lookup_case(**payload, max_wait=SINGLE_FLIGHT['max_wait'])
+        except StillRunning:
+            # Another request is still scraping this case: hand the wait to a job
+            # rather than hold this worker up to the gunicorn timeout
+            job_id = jobs.enqueue('fetch_case', payload)
+            return jsonify({'status': 'queued', 'job_id': job_id}), 202
         
         if result.get('status') == 'error':
             return jsonify(result), 400
         
-        # Store in database
-        conn = sqlite3.connect('court_data.db')
-        c = conn.cursor()
-        c.execute('''INSERT INTO queries 
-                     (case_type, case_number, year, court_type, court_name, 
-                      query_time, raw_response, parsed_data, status)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                  (case_type, case_number, year, court_type, court_name,
-                   datetime.now(), json.dumps(result.get('raw_html', '')),
-                   json.dumps(result.get('parsed_data', {})), 'success'))
-        query_id = c.lastrowid
-        conn.commit()
-        conn.close()
-        
-        result['query_id'] = query_id
         return jsonify(result)
         
     except Exception as e:
-        print(f"Error in fetch_case: {str(e)}")
+        logger.exception('fetch_case failed')
         return jsonify({'error': str(e), 'status': 'error'}), 500
 
+@app.route('/api/fetch-cases/batch', methods=['POST'])
+def fetch_cases_batch():
+    """Look up many cases at once, streaming one JSON line per case"""
+    data = request.json or {}
+    items = data.get('cases')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'No cases provided', 'status': 'error'}), 400
+    if len(items) > BATCH['max_items']:
+        return jsonify({'error': f"At most {BATCH['max_items']} cases per batch", 'status': 'error'}), 400
+    
+    court_type = data.get('court_type', 'high_court')
+    
+    def generate():
+        for line in run_batch(items, court_type):
+            yield json.dumps(line) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/import', methods=['POST'])
+def import_case_list():
+    """
+    Bulk import a CSV or XLSX case list (multipart field "file")
+    Form fields: mode (lookup, watch or validate), court_type, court_name, label
+    Streams one JSON line per row error and per batch handed on, then a summary
+    """
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'No file provided', 'status': 'error'}), 400
+    
+    lines = import_cases(upload.stream, upload.filename, request.form.get('mode', 'lookup'),
+                         request.form.get('court_type', 'high_court'),
+                         request.form.get('court_name', 'Delhi'), request.form.get('label'))
+    try:
+        # Header and format problems surface on the first line, before anything is streamed
+        first = next(lines)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    
+    def generate():
+        yield json.dumps(first) + '\n'
+        for line in lines:
+            yield json.dumps(line) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/download-judgment', methods=['POST'])
 def download_judgment():
     try:
@@ -97,28 +205,57 @@ def download_judgment():
         if not judgment_url:
             return jsonify({'error': 'No judgment URL provided', 'status': 'error'}), 400
         
-        scraper = CourtScraper()
-        file_path = scraper.download_judgment(judgment_url, query_id)
-        
-        if file_path and os.path.exists(file_path):
-            conn = sqlite3.connect('court_data.db')
-            c = conn.cursor()
-            c.execute('''INSERT INTO judgments 
-                         (query_id, filename, file_path, download_time)
-                         VALUES (?, ?, ?, ?)''',
-                      (query_id, os.path.basename(file_path), 
-                       file_path, datetime.now()))
-            conn.commit()
-            conn.close()
-            
-            return send_file(file_path, as_attachment=True)
-        else:
-            return jsonify({'error': 'Failed to download judgment', 'status': 'error'}), 500
-            
+        # judgments.query_id is NOT NULL: check it before anything is streamed with a 200
+        if (not isinstance(query_id, int) or isinstance(query_id, bool)
+                or db.query_one('SELECT 1 FROM queries WHERE id = ?', (query_id,)) is None):
+            return jsonify({'error': 'query_id must be the id of a stored case lookup', 'status': 'error'}), 400
+        
+        check_source(judgment_url)
+        
+        # Already stored: serve from disk via the GET route (Range/If-None-Match aware)
+        existing = judgment_store.find_by_url(judgment_url)
+        if existing:
+            judgment_id = existing['id']
+            if existing['query_id'] != query_id:
+                judgment_id = judgment_store.link_existing(existing, judgment_url, query_id)
+            return redirect(url_for('get_judgment_file', judgment_id=judgment_id), code=303)
+        
+        download = judgment_store.open_download(judgment_url, query_id)
+        
+        def generate():
+            yield from download.chunks()
+            judgment_store.commit_download(download)
+        
+        headers = {'Content-Disposition': f'attachment; filename="{download.filename}"'}
+        if download.content_length:
+            headers['Content-Length'] = str(download.content_length)
+        
+        return Response(stream_with_context(generate()), mimetype=download.content_type, headers=headers)
+        
+    except DownloadRejected as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
     except Exception as e:
-        print(f"Error in download_judgment: {str(e)}")
+        logger.exception('download_judgment failed')
         return jsonify({'error': str(e), 'status': 'error'}), 500
 
+@app.route('/api/judgments/<int:judgment_id>/file')
+def get_judgment_file(judgment_id):
+    """Serve a downloaded judgment with Range and ETag support"""
+    row = db.query_one('SELECT filename, file_path FROM judgments WHERE id = ?', (judgment_id,))
+    
+    if row is None or not os.path.exists(row['file_path']):
+        return jsonify({'error': 'Judgment not found', 'status': 'error'}), 404
+    
+    return send_file(os.path.abspath(row['file_path']), as_attachment=True,
+                     download_name=row['filename'], conditional=True, etag=True)
+
+@app.route('/api/judgments/<int:judgment_id>', methods=['DELETE'])
+def delete_judgment(judgment_id):
+    """Remove a downloaded judgment; its file goes once no other judgment uses it and gc runs"""
+    if not judgment_store.remove_judgment(judgment_id):
+        return jsonify({'error': 'Judgment not found', 'status': 'error'}), 404
+    return jsonify({'status': 'success'})
+
 @app.route('/api/fetch-causelist', methods=['POST'])
 def fetch_causelist():
     try:
@@ -127,10 +264,22 @@ def fetch_causelist():
         court_name = data.get('court_name', 'Delhi')
         date = data.get('date', datetime.now().strftime('%Y-%m-%d'))
         
-        print(f"Fetching causelist: {court_type}, {court_name}, {date}")  # Debug
+        refresh = bool(data.get('refresh'))
         
-        scraper = CourtScraper()
-        result = scraper.fetch_causelist(court_type, court_name, date)
+        if data.get('async'):
+            stored = None if refresh else get_stored_causelist(court_type, court_name, date)
+            if stored is not None:
+                return jsonify(stored)
+            
+            job_id = jobs.enqueue('fetch_causelist', {
+                'court_type': court_type,
+                'court_name': court_name,
+                'date': date,
+                'refresh': refresh
+            })
+            return jsonify({'status': 'queued', 'job_id': job_id, 'cases': []}), 202
+        
+        result = get_causelist(court_type, court_name, date, refresh=refresh)
         
         # Ensure result is valid
         if result is None:
@@ -145,14 +294,30 @@ def fetch_causelist():
         if 'cases' not in result:
             result['cases'] = []
         
-        print(f"Causelist result: {result}")  # Debug
+        logger.debug('causelist served', extra={'court_name': court_name, 'date': date,
+                                                'cases': len(result['cases'])})
         
         return jsonify(result)
         
     except Exception as e:
-        print(f"Error in fetch_causelist: {str(e)}")
+        logger.exception('fetch_causelist failed')
         return jsonify({'error': str(e), 'status': 'error', 'cases': []}), 500
 
+@app.route('/api/jobs/<int:job_id>')
+def get_job(job_id):
+    """Job status; pass ?wait=N to long-poll up to N seconds for completion"""
+    wait = request.args.get('wait', default=0, type=float)
+    
+    if wait > 0:
+        job = jobs.wait_for_job(job_id, wait)
+    else:
+        job = jobs.get_job(job_id)
+    
+    if job is None:
+        return jsonify({'error': 'Job not found', 'status': 'error'}), 404
+    
+    return jsonify(job)
+
 @app.route('/api/courts')
 def get_courts():
     """Return list of available courts"""
@@ -168,36 +333,153 @@ def get_courts():
     }
     return jsonify(courts)
 
+@app.route('/api/judgments/stats')
+def get_judgment_stats():
+    """Return judgment store usage and text extraction progress"""
+    stats = judgment_store.stats()
+    stats['text'] = judgment_text.stats()
+    return jsonify(stats)
+
+@app.route('/api/driver-pool')
+def get_driver_pool_stats():
+    """Return headless browser pool counters"""
+    return jsonify(get_pool().stats())
+
+@app.route('/api/rate-limits')
+def get_rate_limits():
+    """Return the current adaptive request rate for each court host"""
+    return jsonify(rate_limiter.rates())
+
+@app.route('/api/portal-health')
+def get_portal_health():
+    """Return circuit breaker state, retry and hedging counters per court host"""
+    return jsonify(resilience.stats())
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Return case lookup cache counters"""
+    stats = case_cache.stats()
+    stats['coalescing'] = single_flight.stats()
+    return jsonify(stats)
+
 @app.route('/api/history')
 def get_history():
-    """Get query history"""
+    """
+    Get query history, newest first
+    Filters: court_name, case_type, year, status, date_from, date_to (YYYY-MM-DD)
+    Pagination: limit, cursor (from the previous page's next_cursor)
+    """
     try:
-        conn = sqlite3.connect('court_data.db')
-        c = conn.cursor()
-        c.execute('''SELECT id, case_type, case_number, year, court_name, 
-                            query_time, status 
-                     FROM queries 
-                     ORDER BY query_time DESC LIMIT 50''')
-        rows = c.fetchall()
-        conn.close()
-        
-        history = []
-        for row in rows:
-            history.append({
-                'id': row[0],
-                'case_type': row[1],
-                'case_number': row[2],
-                'year': row[3],
-                'court_name': row[4],
-                'query_time': row[5],
-                'status': row[6]
-            })
-        
-        return jsonify(history)
+        filters = {name: request.args.get(name)
+                   for name in ('court_name', 'case_type', 'year', 'status', 'date_from', 'date_to')}
+        page = list_history(filters, request.args.get('cursor'), request.args.get('limit'))
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
     except Exception as e:
-        print(f"Error in get_history: {str(e)}")
-        return jsonify([])
+        logger.exception('get_history failed')
+        return jsonify({'items': [], 'next_cursor': None})
+
+@app.route('/api/search')
+def search_records():
+    """
+    Full-text search over stored cases and cause lists, best match first
+    Parameters: q (words; the last may be partial), source (all, cases, causelists), limit, offset
+    """
+    try:
+        page = search(request.args.get('q'), request.args.get('source'),
+                      request.args.get('limit'), request.args.get('offset'))
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        logger.exception('search failed')
+        return jsonify({'error': 'Search failed', 'status': 'error'}), 500
+
+@app.route('/api/judgments/search')
+def search_judgment_text():
+    """
+    Full-text search inside downloaded judgments, best match first
+    Parameters: q (words or "exact phrases"; a trailing word may be partial), limit, offset
+    """
+    try:
+        page = search_judgments(request.args.get('q'), request.args.get('limit'),
+                                request.args.get('offset'))
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        logger.exception('judgment search failed')
+        return jsonify({'error': 'Search failed', 'status': 'error'}), 500
+
+@app.route('/api/watchlist', methods=['POST'])
+def add_to_watchlist():
+    """Track cases for scheduled refreshes; body is like /api/fetch-cases/batch plus an optional label"""
+    data = request.json or {}
+    items = data.get('cases')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'No cases provided', 'status': 'error'}), 400
+    if len(items) > WATCHLIST['max_items']:
+        return jsonify({'error': f"At most {WATCHLIST['max_items']} cases per request", 'status': 'error'}), 400
+    
+    return jsonify(watchlist.watch(items, data.get('court_type', 'high_court'), data.get('label')))
+
+@app.route('/api/watchlist')
+def get_watchlist():
+    """Watched cases with their refresh state; pagination: limit, cursor"""
+    try:
+        return jsonify(watchlist.list_watched(request.args.get('cursor'), request.args.get('limit')))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+@app.route('/api/watchlist/<int:watch_id>', methods=['DELETE'])
+def remove_from_watchlist(watch_id):
+    if not watchlist.unwatch(watch_id):
+        return jsonify({'error': 'Not on the watchlist', 'status': 'error'}), 404
+    return jsonify({'status': 'success'})
+
+@app.route('/api/watchlist/changes')
+def get_watchlist_changes():
+    """
+    Field changes of watched cases, oldest first
+    Parameters: since (YYYY-MM-DD or ISO timestamp, default 24 hours ago), watch_id, field, limit, cursor
+    """
+    try:
+        page = watchlist.changes_since(request.args.get('since'), request.args.get('watch_id'),
+                                       request.args.get('field'), request.args.get('cursor'),
+                                       request.args.get('limit'))
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+
+@app.route('/api/watchlist/stats')
+def get_watchlist_stats():
+    """Return watched, due and failing case counts"""
+    return jsonify(watchlist.stats())
+
+@app.route('/api/watchlist/refresh', methods=['POST'])
+def refresh_watchlist():
+    """Queue a refresh of the cases that are due now"""
+    data = request.get_json(silent=True) or {}
+    job_id = jobs.enqueue('refresh_watchlist', {'limit': data.get('limit')})
+    return jsonify({'status': 'queued', 'job_id': job_id}), 202
 
 if __name__ == '__main__':
+    db.migrate()
+
+    # The dev server runs its own job worker, cause list pre-fetcher, judgment text
+    # extractor and watchlist scheduler (in the reloader child);
+    # in production run `python jobs.py` alongside gunicorn
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up_worker()
+        threading.Thread(target=jobs.run_worker, daemon=True).start()
+        if CAUSELIST['prefetch_enabled']:
+            start_prefetcher()
+        if JUDGMENT_TEXT['enabled']:
+            judgment_text.start_extractor()
+        if WATCHLIST['enabled']:
+            watchlist.start_scheduler()
+    
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
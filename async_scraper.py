@@ -0,0 +1,307 @@
+"""
+asyncio scraping engine for Court Data Fetcher
+AsyncCourtScraper keeps hundreds of portal requests outstanding on one
+aiohttp session, bounded per court host. SyncCourtScraper runs it on a
+background event loop so Flask routes and worker threads can call it
+like CourtScraper.
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+from urllib.parse import urljoin, urlparse
+import aiohttp
+from config_file import ASYNC_SCRAPING, PORTAL_ENDPOINTS, SCRAPING, SELECTORS
+import judgment_store
+from judgment_stream import MAX_REDIRECTS, DownloadRejected, check_source
+from parser_engine import parse_causelist
+from rate_limiter import rate_limiter
+from resilience import FallbackRequired, resilience
+from scraper import CourtScraper
+from utils_module import detect_captcha, is_valid_url
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class AsyncCourtScraper:
+    """
+    Coroutine versions of CourtScraper.fetch_case_details, fetch_causelist
+    and download_judgment
+
+    Use as `async with AsyncCourtScraper() as scraper:`. Pages the portal
+    won't serve over plain HTTP are rendered by a pooled browser in a thread.
+    """
+
+    def __init__(self):
+        self._scraper = CourtScraper()
+        self._session = None
+        self._semaphores = {}
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def start(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=ASYNC_SCRAPING['max_connections'],
+                limit_per_host=ASYNC_SCRAPING['per_host_concurrency'])
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=SCRAPING['timeout']),
+                headers={'User-Agent': SCRAPING['user_agent']})
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(ASYNC_SCRAPING['per_host_concurrency'])
+        return self._semaphores[host]
+
+    async def _post_page(self, url, form):
+        """One rate-limited POST; raises FallbackRequired if the portal wants a browser"""
+        async with self._host_semaphore(url):
+            await rate_limiter.acquire_async(url)
+            start = time.time()
+            try:
+                with resilience.exchange():
+                    async with self._session.post(url, data=form) as response:
+                        page = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await asyncio.to_thread(rate_limiter.record, url, time.time() - start)
+                raise
+
+        # CAPTCHA detection and the rate limiter's SQLite update would stall every request on the loop
+        captcha = await asyncio.to_thread(self._record_page, url, time.time() - start, response.status, page)
+        if response.status == 403 or captcha:
+            raise FallbackRequired(f'Portal challenged the HTTP session for {url}')
+
+        response.raise_for_status()
+        return page
+
+    @staticmethod
+    def _record_page(url, latency, status, page):
+        captcha = detect_captcha(page)
+        rate_limiter.record(url, latency, status, captcha)
+        return captcha
+
+    async def _fetch_page(self, court_type, endpoint, form, submit, result_selector):
+        """Async counterpart of CourtScraper._fetch_page"""
+        base_url = self._scraper.base_urls[court_type]
+        url = base_url + PORTAL_ENDPOINTS[court_type][endpoint]
+
+        try:
+            return await resilience.call_async(url, lambda: self._post_page(url, form))
+        except FallbackRequired:
+            logger.warning('HTTP session challenged, falling back to browser', extra={'court_type': court_type})
+
+        return await asyncio.to_thread(self._render_page, base_url, form, submit, result_selector)
+
+    def _render_page(self, *args):
+        with CourtScraper() as scraper:
+            return scraper._render_page(*args)
+
+    async def fetch_case_details(self, case_type, case_number, year, court_type='high_court', court_name='Delhi',
+                                 last_hash=None):
+        """Fetch case details from eCourts portal (see CourtScraper.fetch_case_details for last_hash)"""
+        try:
+            logger.info('fetching case', extra={'case': f'{case_type}/{case_number}/{year}',
+                                                'court_name': court_name, 'court_type': court_type})
+
+            if SCRAPING['mode'] != 'live':
+                return self._scraper._generate_mock_case_data(case_type, case_number, year, court_name)
+
+            form, submit = self._scraper._case_form(court_type, case_type, case_number, year)
+            page = await self._fetch_page(court_type, 'case_status', form, submit,
+                                          SELECTORS[court_type]['result_table'])
+            # Parsing is CPU-bound; on the loop it would block every other request in flight
+            return await asyncio.to_thread(self._scraper._case_result, page, last_hash)
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'message': f'Error fetching case details: {str(e) or type(e).__name__}',
+                'parsed_data': {}
+            }
+
+    async def fetch_causelist(self, court_type, court_name, date):
+        """Fetch cause list for a specific date"""
+        try:
+            logger.info('fetching cause list', extra={'court_name': court_name, 'court_type': court_type,
+                                                      'date': date})
+
+            if SCRAPING['mode'] == 'live':
+                form, submit = self._scraper._causelist_form(court_name, date)
+                page = await self._fetch_page(court_type, 'causelist', form, submit,
+                                              SELECTORS['causelist']['result_table'])
+                cases = await asyncio.to_thread(parse_causelist, page)
+            else:
+                cases = self._scraper._generate_mock_causelist(court_name, date)
+
+            return {
+                'status': 'success',
+                'date': date,
+                'court': court_name,
+                'cases': cases
+            }
+
+        except Exception as e:
+            return {
+                'status': 'error',
+                'message': f'Cause list fetch error: {str(e) or type(e).__name__}',
+                'cases': []
+            }
+
+    async def download_judgment(self, url, query_id):
+        """
+        Download a judgment into the content-addressed store (judgment_store)
+        and return the stored file's path, or None on failure
+        """
+        try:
+            existing = await asyncio.to_thread(judgment_store.find_by_url, url)
+            if existing:
+                if existing['query_id'] != query_id:
+                    await asyncio.to_thread(judgment_store.link_existing, existing, url, query_id)
+                return existing['file_path']
+
+            if not is_valid_url(url):
+                # Demo placeholder, nothing to wait on upstream
+                download = judgment_store.open_download(url, query_id)
+                download.save()
+            else:
+                # Not hedged: a duplicate GET would download the whole file twice
+                download = await resilience.call_async(url, lambda: self._get_judgment(url, query_id),
+                                                       hedge=False)
+
+            await asyncio.to_thread(judgment_store.commit_download, download)
+            logger.info('downloaded judgment', extra={'path': download.filepath})
+            return download.filepath
+
+        except Exception as e:
+            logger.error('judgment download failed', extra={'url': url, 'error': str(e)})
+            return None
+
+    async def _get_judgment(self, url, query_id):
+        """
+        Rate-limited GET of a judgment into the store's temp folder, following
+        redirects only between portal hosts
+        """
+        source = url
+        for _ in range(MAX_REDIRECTS + 1):
+            check_source(source)
+            async with self._host_semaphore(source):
+                await rate_limiter.acquire_async(source)
+                start = time.time()
+                try:
+                    # Timed up to the response headers, so file size doesn't skew the host's latency
+                    with resilience.exchange():
+                        response = await self._session.get(source, allow_redirects=False)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    await asyncio.to_thread(rate_limiter.record, source, time.time() - start)
+                    raise
+
+                async with response:
+                    await asyncio.to_thread(rate_limiter.record, source, time.time() - start, response.status)
+                    if response.status in (301, 302, 303, 307, 308) and 'Location' in response.headers:
+                        source = urljoin(source, response.headers['Location'])
+                        continue
+                    response.raise_for_status()
+                    download = judgment_store.accept_download(url, query_id, response.content_type,
+                                                              response.content_length)
+                    await self._save_response(download, response)
+                    return download
+        raise DownloadRejected('Too many redirects')
+
+    async def _save_response(self, download, response):
+        """Stream a response body through the JudgmentStream's checks into its temp file"""
+        download.begin()
+        try:
+            async for chunk in response.content.iter_chunked(download.chunk_size):
+                download.write(chunk)
+            download.finish()
+        finally:
+            download.discard()
+
+
+class SyncCourtScraper:
+    """
+    Blocking facade over one AsyncCourtScraper on a background event loop
+
+    The loop and its aiohttp session live for the whole process, so every
+    caller shares the same connection pool and per-host limits.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='async-scraper', daemon=True)
+        self._thread.start()
+        self._scraper = AsyncCourtScraper()
+        self._submit(self._scraper.start()).result()
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Shared engine; nothing to hand back per call
+        pass
+
+    def fetch_case_details(self, case_type, case_number, year, court_type='high_court', court_name='Delhi',
+                           last_hash=None):
+        return self._submit(self._scraper.fetch_case_details(
+            case_type, case_number, year, court_type, court_name, last_hash)).result()
+
+    def fetch_causelist(self, court_type, court_name, date):
+        return self._submit(self._scraper.fetch_causelist(court_type, court_name, date)).result()
+
+    def download_judgment(self, url, query_id):
+        return self._submit(self._scraper.download_judgment(url, query_id)).result()
+
+    def fetch_many(self, cases):
+        """
+        Yield (key, result) for each case as it completes
+        `cases` maps a key to fetch_case_details kwargs
+        """
+        futures = {self._submit(self._scraper.fetch_case_details(**case)): key
+                   for key, case in cases.items()}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def shutdown(self):
+        if not self._thread.is_alive():
+            return
+        self._submit(self._scraper.close()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_scraper = None
+_scraper_pid = None
+_scraper_lock = threading.Lock()
+
+
+def get_async_scraper():
+    """Process-wide SyncCourtScraper, started on first use (and again after a fork)"""
+    global _scraper, _scraper_pid
+
+    if _scraper is None or _scraper_pid != os.getpid():
+        with _scraper_lock:
+            if _scraper is None or _scraper_pid != os.getpid():
+                _scraper = SyncCourtScraper()
+                _scraper_pid = os.getpid()
+                atexit.register(_scraper.shutdown)
+
+    return _scraper
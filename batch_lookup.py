@@ -0,0 +1,122 @@
+"""
+Batch case lookup for Court Data Fetcher
+Fans a list of cases out over the asyncio scraping engine
+"""
+
+from utils_module import generate_query_hash
+from case_cache import case_cache, FRESH
+from case_service import (last_versions, mark_verified, matches_stored, remember_page_hash, store_case_result,
+                          stored_result)
+import db
+
+FIELDS = ('case_type', 'case_number', 'year', 'court_name')
+
+
+def normalize_items(items, default_court_type='high_court'):
+    """
+    Accept [case_type, case_number, year, court] lists or dicts
+    Returns (cases, errors); cases are de-duplicated by query hash
+    """
+    cases = {}
+    errors = []
+
+    for index, item in enumerate(items):
+        if isinstance(item, (list, tuple)):
+            item = dict(zip(FIELDS, item))
+        elif not isinstance(item, dict):
+            errors.append({'index': index, 'status': 'error', 'message': 'Invalid item'})
+            continue
+
+        case = {
+            'case_type': str(item.get('case_type') or '').strip(),
+            'case_number': str(item.get('case_number') or '').strip(),
+            'year': str(item.get('year') or '').strip(),
+            'court_type': item.get('court_type') or default_court_type,
+            'court_name': item.get('court_name') or item.get('court') or 'Delhi',
+        }
+
+        if not all([case['case_type'], case['case_number'], case['year']]):
+            errors.append({'index': index, 'status': 'error', 'message': 'Missing required fields'})
+            continue
+
+        query_hash = generate_query_hash(case['case_type'], case['case_number'], case['year'],
+                                         case['court_type'], case['court_name'])
+        cases.setdefault(query_hash, case)
+
+    return cases, errors
+
+
+def run_batch(items, default_court_type='high_court'):
+    """
+    Generator yielding one dict per case (without raw_html) as soon as it
+    completes, then a summary once every new row is written in a single transaction
+    """
+    cases, errors = normalize_items(items, default_court_type)
+    yield from errors
+
+    fetched = {}
+    verified = []
+    rehashed = {}
+    cached_count = 0
+
+    pending = {}
+    for query_hash, case in cases.items():
+        cached, state = case_cache.get(query_hash)
+        if cached is not None and state == FRESH:
+            cached_count += 1
+            yield {'query_hash': query_hash, 'case': case, 'cached': True, **cached}
+        else:
+            pending[query_hash] = case
+
+    # Imported on first batch: aiohttp is the slowest import in the app.
+    # Per-host concurrency is bounded inside the engine (ASYNC_SCRAPING)
+    from async_scraper import get_async_scraper
+
+    # Pages that still match the stored version are answered from it and only re-verified
+    versions = last_versions(pending)
+    lookups = {query_hash: dict(case, last_hash=versions[query_hash]['page_hash'] if query_hash in versions
+                                else None)
+               for query_hash, case in pending.items()}
+
+    for query_hash, result in get_async_scraper().fetch_many(lookups):
+        if result.get('unchanged'):
+            result.update(stored_result(versions[query_hash]))
+            verified.append(query_hash)
+            case_cache.put(query_hash, result)
+        elif matches_stored(result, versions.get(query_hash)):
+            # Only the markup changed: keep the stored version under the page's new fingerprint
+            rehashed[query_hash] = result.get('page_hash')
+            result.update(stored_result(versions[query_hash]), unchanged=True)
+            case_cache.put(query_hash, result)
+        elif result.get('status') != 'error':
+            fetched[query_hash] = result
+
+        # The page goes to raw_store with the row; streaming it too would multiply each line's size
+        line = {key: value for key, value in result.items() if key != 'raw_html'}
+        yield {'query_hash': query_hash, 'case': pending[query_hash], 'cached': False, **line}
+
+    query_ids = {}
+    if fetched or verified or rehashed:
+        with db.transaction():
+            mark_verified([versions[query_hash]['id'] for query_hash in verified])
+            for query_hash, page_hash in rehashed.items():
+                remember_page_hash(query_hash, page_hash)
+            for query_hash, result in fetched.items():
+                case = pending[query_hash]
+                query_ids[query_hash] = store_case_result(
+                    case['case_type'], case['case_number'], case['year'],
+                    case['court_type'], case['court_name'], result, query_hash)
+
+        for query_hash, result in fetched.items():
+            result['query_id'] = query_ids[query_hash]
+            case_cache.put(query_hash, result)
+
+    yield {
+        'summary': True,
+        'total': len(cases),
+        'cached': cached_count,
+        'fetched': len(fetched),
+        'unchanged': len(verified) + len(rehashed),
+        'failed': len(pending) - len(fetched) - len(verified) - len(rehashed) + len(errors),
+        'query_ids': query_ids,
+    }
@@ -0,0 +1,116 @@
+"""
+Parser benchmark for Court Data Fetcher
+Compares per-page parse time of parser_engine (lxml) against a
+BeautifulSoup html.parser implementation of the same extraction
+
+Usage:  python bench_parser.py [--rows 500] [--iterations 50]
+"""
+
+import argparse
+import random
+import time
+from bs4 import BeautifulSoup
+from config_file import PARSER_KEYWORDS
+from parser_engine import parse_case_details, parse_causelist
+
+
+def make_case_page():
+    """A case status page shaped like the portal's result table"""
+    rows = [
+        ('Petitioner Name', 'Rajesh Kumar'),
+        ('Petitioner Advocate', 'A. Sharma'),
+        ('Respondent Name', 'State of Delhi'),
+        ('Filing Date', '01/01/2024'),
+        ('Next Hearing Date', '15/03/2024'),
+        ('Case Status', 'Pending'),
+        ('Coram', 'Hon\'ble Justice X'),
+    ]
+    body = ''.join(f'<tr><td>{label}</td><td>{value}</td></tr>' for label, value in rows)
+    links = ''.join(f'<a href="/orders/{i}.pdf">Order dated {i}/01/2024</a>' for i in range(1, 6))
+    padding = '<div class="nav"><ul>' + '<li><a href="#">Menu</a></li>' * 200 + '</ul></div>'
+    return f'<html><body>{padding}<table class="case-details">{body}</table>{links}</body></html>'
+
+
+def make_causelist_page(rows):
+    """A cause list page with `rows` listed cases"""
+    random.seed(rows)
+    body = ''.join(
+        f'<tr><td>WP/{random.randint(100, 9999)}/2024</td>'
+        f'<td>Party {i} vs State of Delhi</td>'
+        f'<td>Court Room {i % 5 + 1}</td><td>10:{i % 60:02d} AM</td></tr>'
+        for i in range(rows))
+    header = '<tr><th>Case No.</th><th>Parties</th><th>Court Room</th><th>Time</th></tr>'
+    return f'<html><body><table class="causelist-table">{header}{body}</table></body></html>'
+
+
+def bs4_parse_case_details(page):
+    """Baseline: BeautifulSoup with keyword scanning per row"""
+    soup = BeautifulSoup(page, 'html.parser')
+    details = {}
+    table = soup.select_one('table.case-details') or soup
+    for row in table.find_all('tr'):
+        cells = row.find_all(['td', 'th'])
+        if len(cells) < 2:
+            continue
+        label = cells[0].get_text(strip=True).lower()
+        for field, keywords in PARSER_KEYWORDS.items():
+            if field not in details and any(keyword in label for keyword in keywords):
+                details[field] = cells[1].get_text(strip=True)
+                break
+    details['judgments'] = [{'text': a.get_text(strip=True), 'url': a['href']}
+                            for a in soup.find_all('a', href=True)
+                            if 'pdf' in a['href'] or 'judgment' in a['href']]
+    return details
+
+
+def bs4_parse_causelist(page):
+    """Baseline: BeautifulSoup walking the cause list table"""
+    soup = BeautifulSoup(page, 'html.parser')
+    table = soup.select_one('table.causelist-table')
+    cases = []
+    for row in table.find_all('tr')[1:]:
+        cells = [cell.get_text(strip=True) for cell in row.find_all('td')]
+        cases.append(dict(zip(['case_number', 'parties', 'court_room', 'time'], cells)))
+    return cases
+
+
+def time_per_page(func, page, iterations):
+    """Mean milliseconds per call"""
+    func(page)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(page)
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parser benchmark')
+    parser.add_argument('--rows', type=int, default=500, help='Cases on the cause list page')
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    case_page = make_case_page()
+    causelist_page = make_causelist_page(args.rows)
+
+    # Both implementations must agree before timings mean anything
+    assert len(parse_causelist(causelist_page)) == len(bs4_parse_causelist(causelist_page)) == args.rows
+    assert parse_case_details(case_page)['petitioner'] == 'Rajesh Kumar'
+
+    print("=" * 60)
+    print(f"PARSER BENCHMARK ({args.iterations} iterations)")
+    print("=" * 60)
+
+    for name, page, fast, baseline in [
+        ('Case details', case_page, parse_case_details, bs4_parse_case_details),
+        (f'Cause list ({args.rows} rows)', causelist_page, parse_causelist, bs4_parse_causelist),
+    ]:
+        lxml_ms = time_per_page(fast, page, args.iterations)
+        bs4_ms = time_per_page(baseline, page, args.iterations)
+        print(f"{name}:")
+        print(f"  lxml engine:        {lxml_ms:8.3f} ms/page")
+        print(f"  BeautifulSoup:      {bs4_ms:8.3f} ms/page")
+        print(f"  Speedup:            {bs4_ms / lxml_ms:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
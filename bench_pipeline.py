@@ -0,0 +1,365 @@
+"""
+Pipeline benchmark for Court Data Fetcher
+Serves the recorded pages in fixtures/ from a local fake eCourts portal
+(configurable latency, error and CAPTCHA rates) and drives the parsers,
+SQLite persistence, CourtScraper, the async engine and the API endpoints
+against it. Reports p50/p95/p99 latency, throughput and memory per stage
+and writes the results as JSON for comparison across commits.
+
+Usage:  python bench_pipeline.py [--requests 200] [--concurrency 8]
+                                 [--latency-ms 50] [--error-rate 0.02]
+                                 [--compare bench_results/<old>.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results')
+
+PDF_BODY = b'%PDF-1.4\n' + b'0' * 48 * 1024 + b'\n%%EOF\n'
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def causelist_page(court_name, date, rows=150):
+    """The cause list fixture filled with `rows` listed cases"""
+    body = '\n'.join(
+        f'  <tr><td>{i + 1}</td><td>WP/{1000 + i}/2024</td>'
+        f'<td>Party {i} vs State of Delhi</td><td>Court Room {i % 5 + 1}</td>'
+        f'<td>{10 + i % 6}:{i % 60:02d} AM</td></tr>'
+        for i in range(rows))
+    return load_fixture('causelist.html').replace('{rows}', body).format(court_name=court_name, date=date)
+
+
+class FakePortal(ThreadingHTTPServer):
+    """eCourts stand-in answering the PORTAL_ENDPOINTS used in live mode"""
+
+    daemon_threads = True
+
+    def __init__(self, latency_ms=50, jitter_ms=20, error_rate=0.0, captcha_rate=0.0, seed=1):
+        super().__init__(('127.0.0.1', 0), _PortalHandler)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.captcha_rate = captcha_rate
+        self.random = random.Random(seed)
+        self.case_page = load_fixture('case_status.html')
+        self.captcha_page = load_fixture('captcha.html')
+        self.counts = {'requests': 0, 'errors': 0, 'captchas': 0}
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/'
+
+    def handle_error(self, request, client_address):
+        # Hedged and cancelled requests hang up early; that's expected here
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _PortalHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith('/orders/'):
+            return self._send(200, PDF_BODY, 'application/pdf')
+        self._send(200, '<html><body>eCourts Services</body></html>')
+
+    def do_POST(self):
+        portal = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+
+        portal.counts['requests'] += 1
+        time.sleep(max(0.0, portal.latency + portal.random.uniform(-portal.jitter, portal.jitter)))
+
+        roll = portal.random.random()
+        if roll < portal.error_rate:
+            portal.counts['errors'] += 1
+            return self._send(503, 'Service Unavailable')
+        if roll < portal.error_rate + portal.captcha_rate:
+            portal.counts['captchas'] += 1
+            return self._send(200, portal.captcha_page)
+
+        if 'cause_list' in self.path:
+            return self._send(200, causelist_page(form.get('courtComplex', ''), form.get('causeListDate', '')))
+
+        # A fresh anti-forgery token per response, as the portals send; it must not count as a change
+        token = f'<input type="hidden" name="csrf_token" value="{portal.random.getrandbits(64):x}">'
+        self._send(200, portal.case_page.format(
+            case_type=form.get('caseType', 'CS'),
+            case_number=form.get('caseNumber', '1'),
+            year=form.get('caseYear', '2024')).replace('</body>', token + '\n</body>'))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return 0
+
+
+def _failed(result):
+    return result is None or (isinstance(result, dict) and result.get('status') == 'error')
+
+
+def run_stage(name, func, items, concurrency=1, trace_memory=False):
+    """Time func(item) for every item; returns the stage's summary dict"""
+    latencies = []
+    errors = 0
+
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            failed = _failed(func(item))
+        except Exception:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    if trace_memory:
+        tracemalloc.start()
+    rss_before = _rss_kb()
+    start = time.perf_counter()
+
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(timed, items))
+    else:
+        outcomes = [timed(item) for item in items]
+
+    elapsed = time.perf_counter() - start
+    for latency, failed in outcomes:
+        latencies.append(latency)
+        errors += failed
+
+    return _summary(name, latencies, errors, elapsed, rss_before, trace_memory)
+
+
+def _summary(name, latencies, errors, elapsed, rss_before, trace_memory):
+    summary = {
+        'count': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'throughput_per_s': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'rss_delta_kb': _rss_kb() - rss_before,
+    }
+    if trace_memory:
+        summary['peak_alloc_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+
+    print(f"  {name:<16} n={summary['count']:<5} err={errors:<4} "
+          f"p50={summary['p50_ms']:>9.2f}ms p95={summary['p95_ms']:>9.2f}ms "
+          f"p99={summary['p99_ms']:>9.2f}ms {summary['throughput_per_s']:>8.1f}/s "
+          f"rss+{summary['rss_delta_kb']}KB")
+    return summary
+
+
+def run_async_stage(name, cases, trace_memory=False):
+    """Time-to-result for every case submitted at once to the async engine"""
+    from async_scraper import get_async_scraper
+
+    scraper = get_async_scraper()
+    if trace_memory:
+        tracemalloc.start()
+    rss_before = _rss_kb()
+    start = time.perf_counter()
+    latencies = []
+    errors = 0
+
+    for _, result in scraper.fetch_many(cases):
+        latencies.append(time.perf_counter() - start)
+        errors += _failed(result)
+
+    return _summary(name, latencies, errors, time.perf_counter() - start, rss_before, trace_memory)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def compare(current, previous_path):
+    """Print p95 and throughput changes against an earlier results file"""
+    with open(previous_path) as f:
+        previous = json.load(f)
+
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('timestamp')}):")
+    for name, stage in current['stages'].items():
+        old = previous.get('stages', {}).get(name)
+        if not old:
+            continue
+        p95 = (stage['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+        rate = ((stage['throughput_per_s'] - old['throughput_per_s']) / old['throughput_per_s'] * 100
+                if old['throughput_per_s'] else 0.0)
+        print(f"  {name:<16} p95 {p95:+7.1f}%   throughput {rate:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrape/parse/persist pipeline benchmark')
+    parser.add_argument('--requests', type=int, default=200, help='Lookups per network stage')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=50, help='Fake portal response time')
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of portal requests answered 503')
+    parser.add_argument('--captcha-rate', type=float, default=0.0, help='Share answered with a CAPTCHA page')
+    parser.add_argument('--retry-delay', type=float, default=0.05, help='Backoff base during the run')
+    parser.add_argument('--stages', default='parse,persist,scrape,async,download,api')
+    parser.add_argument('--trace-memory', action='store_true', help='Also report tracemalloc peaks (slower)')
+    parser.add_argument('--output', default=None, help='Results file (default bench_results/<time>-<commit>.json)')
+    parser.add_argument('--compare', default=None, help='Earlier results file to compare against')
+    args = parser.parse_args()
+    for name in ('output', 'compare'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    portal = FakePortal(args.latency_ms, args.jitter_ms, args.error_rate, args.captcha_rate).start()
+
+    # Everything the pipeline writes (database, downloads, logs) goes to a scratch directory,
+    # so the modules below are imported only after it is in place
+    workdir = tempfile.mkdtemp(prefix='court-bench-')
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'bench.db')
+    os.chdir(workdir)
+
+    from config_file import ECOURTS_URLS, SCRAPING
+    ECOURTS_URLS['high_court_main'] = portal.base_url
+    ECOURTS_URLS['district_court_main'] = portal.base_url
+    SCRAPING['mode'] = 'live'
+    SCRAPING['retry_delay'] = args.retry_delay
+
+    import db
+    from rate_limiter import rate_limiter
+    db.init_schema()
+    # The fake portal is local; keep the limiter from becoming the bottleneck
+    rate_limiter.settings.update(initial_rate=10000, max_rate=10000, burst=10000)
+
+    from parser_engine import parse_case_details, parse_causelist
+    from case_service import store_case_result
+    from scraper import CourtScraper
+
+    stages = args.stages.split(',')
+    case_page = load_fixture('case_status.html').format(case_type='WP', case_number='1', year='2024')
+    list_page = causelist_page('Delhi', '2024-10-02')
+    parsed = {'status': 'success', 'parsed_data': parse_case_details(case_page), 'raw_html': case_page}
+    n = args.requests
+
+    print("=" * 100)
+    print(f"PIPELINE BENCHMARK  requests={n} concurrency={args.concurrency} "
+          f"latency={args.latency_ms}ms errors={args.error_rate} captchas={args.captcha_rate}")
+    print("=" * 100)
+
+    results = {}
+    if 'parse' in stages:
+        results['parse_case'] = run_stage('parse_case', lambda _: parse_case_details(case_page),
+                                          range(n * 5), trace_memory=args.trace_memory)
+        results['parse_causelist'] = run_stage('parse_causelist', lambda _: parse_causelist(list_page),
+                                               range(n), trace_memory=args.trace_memory)
+
+    if 'persist' in stages:
+        results['persist'] = run_stage(
+            'persist',
+            lambda i: store_case_result('WP', str(i), '2024', 'high_court', 'Delhi', parsed, f'bench-{i}'),
+            range(n), trace_memory=args.trace_memory)
+
+    def scrape(i):
+        with CourtScraper() as scraper:
+            return scraper.fetch_case_details('WP', str(10000 + i), '2024', 'high_court', 'Delhi')
+
+    if 'scrape' in stages:
+        results['scrape'] = run_stage('scrape', scrape, range(n), args.concurrency, args.trace_memory)
+
+    if 'async' in stages:
+        cases = {i: dict(case_type='WP', case_number=str(20000 + i), year='2024') for i in range(n)}
+        results['async_scrape'] = run_async_stage('async_scrape', cases, args.trace_memory)
+
+    if 'download' in stages:
+        def download(i):
+            with CourtScraper() as scraper:
+                return scraper.download_judgment(f'{portal.base_url}orders/{i}-1.pdf', i)
+
+        results['download'] = run_stage('download', download, range(max(1, n // 4)),
+                                        args.concurrency, args.trace_memory)
+
+    if 'api' in stages:
+        from app import app
+
+        def api_lookup(i):
+            response = app.test_client().post('/api/fetch-case', json={
+                'case_type': 'WP', 'case_number': str(30000 + i), 'year': '2024',
+                'court_type': 'high_court', 'court_name': 'Delhi', 'refresh': True})
+            return response.get_json() if response.status_code == 200 else None
+
+        results['api_fetch_case'] = run_stage('api_fetch_case', api_lookup, range(n),
+                                              args.concurrency, args.trace_memory)
+        # The same cases again: the pages are unchanged, so nothing is parsed or stored
+        results['api_unchanged'] = run_stage('api_unchanged', api_lookup, range(n),
+                                             args.concurrency, args.trace_memory)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'settings': vars(args),
+        'portal': portal.counts,
+        'stages': results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_FOLDER, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[OK] Results written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+    portal.shutdown()
+
+
+if __name__ == '__main__':
+    main()
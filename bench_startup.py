@@ -0,0 +1,116 @@
+"""
+Startup benchmark for Court Data Fetcher
+Times cold imports of the app and CLI entry points in fresh interpreters,
+the schema migration, and a new worker's warm-up and first request.
+Exits non-zero when a cold `import app` takes longer than
+STARTUP['import_budget_ms'], or when an entry point loads a scraping
+backend that should only be imported on first use.
+
+Usage:  python bench_startup.py [--runs 5] [--budget-ms 400]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from config_file import STARTUP
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ENTRY_POINTS = ['app', 'scraper', 'case_service', 'jobs', 'test_script']
+
+# Only imported once a lookup needs them (gunicorn's master preloads them for its workers)
+LAZY_MODULES = ['selenium', 'bs4', 'aiohttp', 'requests']
+
+IMPORT_SNIPPET = '''
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+print(json.dumps({'ms': (time.perf_counter() - start) * 1000,
+                  'loaded': [name for name in sys.argv[2:] if name in sys.modules]}))
+'''
+
+WORKER_SNIPPET = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.warm_up_worker()
+warmed = time.perf_counter()
+response = app.app.test_client().get('/api/history')
+assert response.status_code == 200
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'warm_ms': (warmed - imported) * 1000,
+                  'first_request_ms': (done - warmed) * 1000}))
+'''
+
+MIGRATE_SNIPPET = '''
+import json, time, db
+start = time.perf_counter()
+applied = db.migrate()
+print(json.dumps({'ms': (time.perf_counter() - start) * 1000, 'applied': applied}))
+'''
+
+
+def run_python(code, args, workdir):
+    """Run a snippet in a fresh interpreter and return its JSON output"""
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_PATH=os.path.join(workdir, 'bench.db'),
+               DRIVER_POOL_WARMUP='false', HTTP_SESSION_WARMUP='false')
+    output = subprocess.run([sys.executable, '-c', code, *args], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per measurement')
+    parser.add_argument('--budget-ms', type=float, default=STARTUP['import_budget_ms'],
+                        help='Median cold `import app` allowed')
+    args = parser.parse_args()
+
+    failures = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print("=" * 60)
+        print(f"STARTUP BENCHMARK (median of {args.runs} fresh interpreters)")
+        print("=" * 60)
+
+        print("Cold import:")
+        medians = {}
+        for module in ENTRY_POINTS:
+            runs = [run_python(IMPORT_SNIPPET, [module, *LAZY_MODULES], workdir) for _ in range(args.runs)]
+            medians[module] = statistics.median(run['ms'] for run in runs)
+            loaded = sorted({name for run in runs for name in run['loaded']})
+            note = f"  loads {', '.join(loaded)}" if loaded else ''
+            print(f"  {module:<14} {medians[module]:8.1f} ms{note}")
+            if loaded:
+                failures.append(f"{module} imports {', '.join(loaded)} at startup")
+
+        first = run_python(MIGRATE_SNIPPET, [], workdir)
+        again = run_python(MIGRATE_SNIPPET, [], workdir)
+        print("Schema migration:")
+        print(f"  new database   {first['ms']:8.1f} ms")
+        print(f"  up to date     {again['ms']:8.1f} ms")
+        assert first['applied'] and not again['applied']
+
+        workers = [run_python(WORKER_SNIPPET, [], workdir) for _ in range(args.runs)]
+        print("New worker:")
+        for key, label in [('import_ms', 'import app'), ('warm_ms', 'warm-up'),
+                           ('first_request_ms', 'first request')]:
+            print(f"  {label:<14} {statistics.median(run[key] for run in workers):8.1f} ms")
+
+    if medians['app'] > args.budget_ms:
+        failures.append(f"import app took {medians['app']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"[OK] import app within {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == '__main__':
+    main()
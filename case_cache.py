@@ -0,0 +1,175 @@
+"""
+Case lookup cache for Court Data Fetcher
+In-process LRU with per-status TTLs, backed by past rows in the queries table
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from config_file import CACHE
+import db
+from tracing import span
+
+FRESH = 'fresh'
+STALE = 'stale'
+
+# Result keys not kept in the cache
+UNCACHED = ('raw_html',)
+
+# "not disposed", "non-disposed", "not yet disposed" must not get the disposed TTL
+_NEGATION = re.compile(r'\b(?:not|non)(?:\W+yet)?\W+$')
+
+
+def ttl_for_status(case_status):
+    """TTL in seconds for a case, from the first configured keyword its status contains as a word"""
+    status = (case_status or '').lower()
+
+    for keyword, ttl in CACHE['status_ttl'].items():
+        for match in re.finditer(rf'\b{re.escape(keyword)}\b', status):
+            if not _NEGATION.search(status, 0, match.start()):
+                return ttl
+
+    return CACHE['default_ttl']
+
+
+def _age_seconds(query_time):
+    """Seconds since a stored query_time value"""
+    if isinstance(query_time, datetime):
+        stored = query_time
+    else:
+        try:
+            stored = datetime.fromisoformat(str(query_time))
+        except ValueError:
+            return None
+
+    return (datetime.now() - stored).total_seconds()
+
+
+class CaseCache:
+    """
+    Two-tier cache keyed by utils_module.generate_query_hash
+
+    get() returns (result, state) where state is FRESH, STALE (expired but
+    within the grace window, caller should refresh) or None on a miss.
+    Entries are kept as JSON, so every get() returns a new result that
+    callers may change without touching the cached copy.
+    """
+
+    def __init__(self, max_entries=None, stale_grace=None):
+        self.max_entries = max_entries or CACHE['memory_max_entries']
+        self.stale_grace = stale_grace if stale_grace is not None else CACHE['stale_grace']
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+        }
+
+    def _state(self, age, ttl):
+        if age is None:
+            return None
+        if age <= ttl:
+            return FRESH
+        if age <= ttl + self.stale_grace:
+            return STALE
+        return None
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+
+            result, stored_at, ttl = entry
+            state = self._state(time.time() - stored_at, ttl)
+            if state is None:
+                del self._entries[key]
+                return None, None
+
+            self._entries.move_to_end(key)
+            return json.loads(result), state
+
+    def _get_db(self, key):
+        # A re-fetch that found the page unchanged refreshes verified_at, not query_time
+        row = db.query_one('''SELECT id, COALESCE(verified_at, query_time) AS query_time, parsed_data
+                              FROM queries
+                              WHERE query_hash = ? AND status = 'success'
+                              ORDER BY id DESC LIMIT 1''', (key,))
+        if row is None:
+            return None, None
+
+        parsed_data = json.loads(row['parsed_data'] or '{}')
+        ttl = ttl_for_status(parsed_data.get('case_status'))
+        age = _age_seconds(row['query_time'])
+        state = self._state(age, ttl)
+        if state is None:
+            return None, None
+
+        result = {
+            'status': 'success',
+            'parsed_data': parsed_data,
+            'query_id': row['id'],
+        }
+
+        # Promote into memory with the remaining lifetime
+        self._put_memory(key, result, ttl, stored_at=time.time() - age)
+        return result, state
+
+    def _put_memory(self, key, result, ttl, stored_at=None):
+        with self._lock:
+            self._entries[key] = (json.dumps(result, separators=(',', ':')), stored_at or time.time(), ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @span('cache_lookup')
+    def get(self, key):
+        """Look up a case by query hash"""
+        result, state = self._get_memory(key)
+        if result is not None:
+            self._count('memory_hits' if state == FRESH else 'stale_hits')
+            return result, state
+
+        result, state = self._get_db(key)
+        if result is not None:
+            self._count('db_hits' if state == FRESH else 'stale_hits')
+            return result, state
+
+        self._count('misses')
+        return None, None
+
+    def put(self, key, result):
+        """
+        Cache a successful lookup (the row itself is already in queries)
+        The page HTML stays in raw_responses; only parsed fields are kept in memory
+        """
+        ttl = ttl_for_status(result.get('parsed_data', {}).get('case_status'))
+        self._put_memory(key, {name: value for name, value in result.items() if name not in UNCACHED}, ttl)
+
+    def invalidate(self, key):
+        """Drop a case from the in-process tier"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+
+        lookups = sum(stats[name] for name in ('memory_hits', 'db_hits', 'stale_hits', 'misses'))
+        stats['hit_ratio'] = round((lookups - stats['misses']) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+case_cache = CaseCache()
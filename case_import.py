@@ -0,0 +1,277 @@
+"""
+Bulk case import for Court Data Fetcher
+Streams CSV or XLSX case lists row by row and validates them in batches
+against precompiled rules. Valid cases are normalised, de-duplicated by
+query hash and handed on one batch at a time (queued as lookup jobs, put on
+the watchlist, or only counted), so only the current batch is in memory.
+
+Import a file:  python case_import.py cases.xlsx [--mode lookup|watch|validate] [--court-type district_court]
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import re
+import zipfile
+from config_file import IMPORT, PORTAL_ENDPOINTS
+from batch_lookup import FIELDS
+from utils_module import (generate_query_hash, CASE_NUMBER_PATTERN, CASE_NUMBER_MAX_LENGTH,
+                          CASE_TYPE_PATTERN, MIN_YEAR, max_year)
+import db
+import jobs
+import watchlist
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+MODES = ('lookup', 'watch', 'validate')
+FORMATS = ('csv', 'xlsx')
+COURT_TYPES = tuple(PORTAL_ENDPOINTS)
+REQUIRED = ('case_type', 'case_number', 'year')
+
+_XLSX_MAGIC = b'PK\x03\x04'
+_HEADER_NAME = re.compile(r'[^a-z0-9]+')
+_ALIASES = {alias: field for field, aliases in IMPORT['columns'].items() for alias in aliases}
+
+
+def detect_format(stream, filename=None):
+    """'csv' or 'xlsx' from the file extension, or from the first bytes when there is none"""
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in FORMATS:
+        return extension
+
+    head = stream.read(len(_XLSX_MAGIC))
+    stream.seek(0)
+    return 'xlsx' if head == _XLSX_MAGIC else 'csv'
+
+
+def _cell(value):
+    """Spreadsheet cell as stripped text; whole floats (2024.0) lose their decimals"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _csv_rows(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        for row in csv.reader(text):
+            yield [value.strip() for value in row]
+    finally:
+        # Leave the caller's binary stream open
+        text.detach()
+
+
+def _xlsx_rows(stream):
+    # Imported on first use: only spreadsheet uploads need openpyxl
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('XLSX import needs openpyxl (pip install openpyxl); upload a CSV instead')
+
+    # read_only parses the sheet XML as it is iterated instead of building the workbook
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError):
+        raise ValueError('Not a readable XLSX file')
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [_cell(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(stream, file_format):
+    """Yield (row number, values) for each non-empty row of a CSV or XLSX stream"""
+    rows = _xlsx_rows(stream) if file_format == 'xlsx' else _csv_rows(stream)
+    for line, values in enumerate(rows, 1):
+        if any(values):
+            yield line, values
+
+
+def header_columns(values):
+    """
+    Field -> column index for a header row, or None if the row isn't a header
+    Raises ValueError when a header lacks a required column
+    """
+    positions = {}
+    for index, name in enumerate(values):
+        field = _ALIASES.get(_HEADER_NAME.sub('_', name.lower()).strip('_'))
+        if field and field not in positions:
+            positions[field] = index
+
+    if not positions:
+        return None
+
+    missing = [field for field in REQUIRED if field not in positions]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return positions
+
+
+def _row_error(case, latest_year):
+    """Same checks and messages as the utils_module validators, with the rules compiled once"""
+    if not case['case_type']:
+        return 'Case type is required'
+    if not CASE_TYPE_PATTERN.match(case['case_type']):
+        return 'Invalid case type format'
+    if not case['case_number']:
+        return 'Case number is required'
+    if not CASE_NUMBER_PATTERN.match(case['case_number']):
+        return 'Case number can only contain letters, numbers, / and -'
+    if len(case['case_number']) > CASE_NUMBER_MAX_LENGTH:
+        return f"Case number must be between 1 and {CASE_NUMBER_MAX_LENGTH} characters"
+    if not case['year'].isdigit():
+        return 'Invalid year format'
+    if not MIN_YEAR <= int(case['year']) <= latest_year:
+        return f"Year must be between {MIN_YEAR} and {latest_year}"
+    if case['court_type'] not in COURT_TYPES:
+        return f"Court type must be one of: {', '.join(COURT_TYPES)}"
+    return None
+
+
+def validate_batch(rows, positions, latest_year, court_type='high_court', court_name='Delhi'):
+    """
+    Normalise and check a batch of (row number, values) rows
+    Returns (cases, errors): cases are (query_hash, case) pairs in file order
+    """
+    cases = []
+    errors = []
+
+    for line, values in rows:
+        row = {field: values[index] if index < len(values) else ''
+               for field, index in positions.items()}
+        case = {
+            'case_type': row['case_type'].upper(),
+            'case_number': row['case_number'],
+            'year': row['year'],
+            'court_type': row.get('court_type') or court_type,
+            'court_name': row.get('court_name') or court_name,
+        }
+
+        message = _row_error(case, latest_year)
+        if message:
+            errors.append({'line': line, 'status': 'error', 'message': message})
+            continue
+
+        cases.append((generate_query_hash(case['case_type'], case['case_number'], case['year'],
+                                          case['court_type'], case['court_name']), case))
+
+    return cases, errors
+
+
+def _hand_off(cases, mode, court_type, label):
+    """Pass one batch of unique, valid cases on; returns what to report for it"""
+    if mode == 'lookup':
+        return {'job_id': jobs.enqueue('fetch_cases', {'cases': cases, 'court_type': court_type})}
+    if mode == 'watch':
+        return {'added': watchlist.watch(cases, court_type, label)['added']}
+    return {}
+
+
+def import_cases(stream, filename=None, mode='lookup', court_type='high_court', court_name='Delhi',
+                 label=None):
+    """
+    Generator yielding each row error (up to IMPORT['max_errors']), one line
+    per batch handed on, then a summary
+    Raises ValueError on the first next() for unreadable files or headers
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+
+    file_format = detect_format(stream, filename)
+    rows = read_rows(stream, file_format)
+
+    first = next(rows, None)
+    if first is None:
+        raise ValueError('The file has no rows')
+
+    positions = header_columns(first[1])
+    if positions is None:
+        positions = {field: index for index, field in enumerate(FIELDS)}
+        rows = itertools.chain([first], rows)
+
+    latest_year = max_year()
+    seen = set()
+    summary = {'summary': True, 'rows': 0, 'valid': 0, 'duplicates': 0, 'invalid': 0,
+               'truncated': False}
+    handed = {'jobs': []} if mode == 'lookup' else {'added': 0} if mode == 'watch' else {}
+    batch_number = 0
+
+    def flush(batch):
+        nonlocal batch_number
+        cases, errors = validate_batch(batch, positions, latest_year, court_type, court_name)
+
+        for error in errors:
+            summary['invalid'] += 1
+            if summary['invalid'] <= IMPORT['max_errors']:
+                yield error
+
+        unique = []
+        for query_hash, case in cases:
+            if query_hash in seen:
+                summary['duplicates'] += 1
+            else:
+                seen.add(query_hash)
+                unique.append(case)
+
+        if unique:
+            batch_number += 1
+            summary['valid'] += len(unique)
+            result = _hand_off(unique, mode, court_type, label)
+            if 'job_id' in result:
+                handed['jobs'].append(result['job_id'])
+            elif 'added' in result:
+                handed['added'] += result['added']
+            yield {'batch': batch_number, 'first_line': batch[0][0], 'last_line': batch[-1][0],
+                   'cases': len(unique), **result}
+
+    batch = []
+    for row in rows:
+        if summary['rows'] >= IMPORT['max_rows']:
+            summary['truncated'] = True
+            break
+
+        summary['rows'] += 1
+        batch.append(row)
+        if len(batch) >= IMPORT['batch_size']:
+            yield from flush(batch)
+            batch = []
+
+    if batch:
+        yield from flush(batch)
+
+    logger.info('case import finished', extra={'mode': mode, 'format': file_format, **summary})
+    yield {**summary, **handed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk case import from CSV or XLSX')
+    parser.add_argument('path')
+    parser.add_argument('--mode', choices=MODES, default='lookup',
+                        help='lookup: queue fetch_cases jobs; watch: add to the watchlist; validate: check only')
+    parser.add_argument('--court-type', choices=COURT_TYPES, default='high_court')
+    parser.add_argument('--court-name', default='Delhi')
+    parser.add_argument('--label', default=None, help='Watchlist label (watch)')
+    args = parser.parse_args()
+
+    db.migrate()
+    with open(args.path, 'rb') as stream:
+        try:
+            for line in import_cases(stream, args.path, args.mode, args.court_type, args.court_name, args.label):
+                if line.get('summary'):
+                    print(f"[OK] {line}")
+                elif 'batch' in line:
+                    print(f"  batch {line['batch']}: rows {line['first_line']}-{line['last_line']}, "
+                          f"{line['cases']} cases")
+                else:
+                    print(f"  row {line['line']}: {line['message']}")
+        except ValueError as e:
+            parser.error(str(e))
+
+
+if __name__ == '__main__':
+    main()
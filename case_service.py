@@ -0,0 +1,208 @@
+"""
+Case lookup service for Court Data Fetcher
+Scrapes, stores and caches case details for the API routes
+"""
+
+import json
+import threading
+from datetime import datetime
+from scraper import CourtScraper
+from utils_module import generate_query_hash
+from case_cache import case_cache, STALE
+from raw_store import put_raw, compact_json, raw_for_query
+from single_flight import single_flight
+import db
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def store_case_result(case_type, case_number, year, court_type, court_name, result, query_hash):
+    """Insert a successful lookup into queries and return its id"""
+    raw_hash = put_raw(result.get('raw_html', ''))
+    now = datetime.now()
+    c = db.execute('''INSERT INTO queries
+                      (case_type, case_number, year, court_type, court_name,
+                       query_time, raw_hash, parsed_data, status, query_hash,
+                       page_hash, verified_at)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                   (case_type, case_number, year, court_type, court_name,
+                    now, raw_hash,
+                    compact_json(result.get('parsed_data', {})), 'success', query_hash,
+                    result.get('page_hash'), now))
+    return c.lastrowid
+
+
+def last_versions(query_hashes):
+    """Latest successful stored row per case, keyed by query hash"""
+    versions = {}
+    query_hashes = list(query_hashes)
+    for start in range(0, len(query_hashes), 500):
+        chunk = query_hashes[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        rows = db.query_all(f'''SELECT id, query_hash, page_hash, raw_hash, raw_response, parsed_data
+                                FROM queries
+                                WHERE id IN (SELECT MAX(id) FROM queries
+                                             WHERE query_hash IN ({placeholders}) AND status = 'success'
+                                             GROUP BY query_hash)''', chunk)
+        versions.update((row['query_hash'], row) for row in rows)
+    return versions
+
+
+def stored_result(row):
+    """Lookup result for a stored queries row"""
+    return {
+        'status': 'success',
+        'parsed_data': json.loads(row['parsed_data'] or '{}'),
+        'raw_html': raw_for_query(row),
+        'query_id': row['id'],
+    }
+
+
+def mark_verified(query_ids):
+    """
+    Record that stored versions still match the portal
+    Runs on the thread's connection, so it joins an open db.transaction()
+    """
+    now = datetime.now()
+    db.get_connection().executemany('UPDATE queries SET verified_at = ? WHERE id = ?',
+                                    [(now, query_id) for query_id in query_ids])
+
+
+def matches_stored(result, version):
+    """
+    True when a freshly parsed page has the same fields as the stored version,
+    i.e. only markup around them changed (a timestamp, a visitor counter)
+    """
+    if version is None or result.get('status') == 'error' or result.get('unchanged'):
+        return False
+    return json.loads(compact_json(result.get('parsed_data', {}))) == json.loads(version['parsed_data'] or '{}')
+
+
+def remember_page_hash(query_hash, page_hash):
+    """
+    Point the latest stored version of a case at a new page fingerprint and mark it verified
+    Used when the page changed but its fields didn't, so the next lookup matches without parsing
+    Runs on the thread's connection, so it joins an open db.transaction()
+    """
+    if page_hash is None:
+        return
+    db.get_connection().execute('''UPDATE queries SET page_hash = ?, verified_at = ?
+                                   WHERE id = (SELECT MAX(id) FROM queries
+                                               WHERE query_hash = ? AND status = 'success')''',
+                                (page_hash, datetime.now(), query_hash))
+
+
+def _scrape_and_store(case_type, case_number, year, court_type, court_name, query_hash):
+    version = last_versions([query_hash]).get(query_hash)
+    with CourtScraper() as scraper:
+        result = scraper.fetch_case_details(
+            case_type=case_type,
+            case_number=case_number,
+            year=year,
+            court_type=court_type,
+            court_name=court_name,
+            last_hash=version['page_hash'] if version else None
+        )
+
+    if result.get('status') == 'error':
+        return result
+
+    if result.get('unchanged'):
+        # The portal still shows the stored version: answer from it and only bump verified_at
+        result.update(stored_result(version))
+        mark_verified([version['id']])
+    elif matches_stored(result, version):
+        # Same fields on a page whose markup changed: keep the stored version under the new fingerprint
+        remember_page_hash(query_hash, result.get('page_hash'))
+        result.update(stored_result(version), unchanged=True)
+    else:
+        result['query_id'] = store_case_result(case_type, case_number, year,
+                                               court_type, court_name, result, query_hash)
+    case_cache.put(query_hash, result)
+    return result
+
+
+def _stored_since(query_hash, since):
+    """Result another worker stored (or verified unchanged) for this case after `since`, if any"""
+    row = db.query_one('''SELECT id, raw_hash, raw_response, parsed_data FROM queries
+                          WHERE query_hash = ? AND status = 'success'
+                            AND COALESCE(verified_at, query_time) >= ?
+                          ORDER BY id DESC LIMIT 1''', (query_hash, since))
+    if row is None:
+        return None
+
+    result = stored_result(row)
+    case_cache.put(query_hash, result)
+    return result
+
+
+def fetch_and_store_case(case_type, case_number, year, court_type, court_name, max_wait=None):
+    """
+    Scrape a case, persist it and refresh the cache
+    Concurrent calls for the same case, in any worker, share one scrape;
+    waiting longer than max_wait on another one raises StillRunning
+    """
+    query_hash = generate_query_hash(case_type, case_number, year, court_type, court_name)
+    since = datetime.now()
+
+    return single_flight.do(
+        query_hash,
+        lambda: _scrape_and_store(case_type, case_number, year, court_type, court_name, query_hash),
+        lambda: _stored_since(query_hash, since),
+        max_wait)
+
+
+def _refresh_case(query_hash, case_type, case_number, year, court_type, court_name):
+    try:
+        fetch_and_store_case(case_type, case_number, year, court_type, court_name)
+    except Exception as e:
+        logger.warning('background refresh failed', extra={'case': f'{case_type}/{case_number}/{year}',
+                                                          'error': str(e)})
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(query_hash)
+
+
+def _refresh_in_background(query_hash, *args):
+    """Start at most one background refresh per case in this process"""
+    with _refreshing_lock:
+        if query_hash in _refreshing:
+            return
+        _refreshing.add(query_hash)
+
+    threading.Thread(target=_refresh_case, args=(query_hash,) + args, daemon=True).start()
+
+
+def get_cached_case(case_type, case_number, year, court_type='high_court', court_name='Delhi'):
+    """
+    Cached case details, or None on a miss
+    Stale entries are returned immediately while a background scrape refreshes them
+    """
+    query_hash = generate_query_hash(case_type, case_number, year, court_type, court_name)
+    cached, state = case_cache.get(query_hash)
+    if cached is None:
+        return None
+
+    if state == STALE:
+        _refresh_in_background(query_hash, case_type, case_number, year, court_type, court_name)
+    cached['cached'] = True
+    cached['cache_state'] = state
+    return cached
+
+
+def lookup_case(case_type, case_number, year, court_type='high_court', court_name='Delhi', refresh=False,
+                max_wait=None):
+    """Return case details, from cache when possible"""
+    if not refresh:
+        cached = get_cached_case(case_type, case_number, year, court_type, court_name)
+        if cached is not None:
+            return cached
+
+    result = fetch_and_store_case(case_type, case_number, year, court_type, court_name, max_wait)
+    if result.get('status') != 'error':
+        result['cached'] = False
+    return result
@@ -0,0 +1,167 @@
+"""
+Cause list store for Court Data Fetcher
+Persists scraped cause lists in causelists/causelist_cases and serves them
+back: past dates permanently, today and later dates for a short TTL
+
+Pre-fetch today's and tomorrow's lists with:  python causelist_store.py prefetch
+"""
+
+import json
+import sys
+import threading
+import time
+from datetime import datetime, date as date_type, timedelta
+from scraper import CourtScraper
+from config_file import CAUSELIST
+import db
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def _max_age(causelist_date):
+    """Seconds a stored list stays valid, or None if it never expires"""
+    try:
+        listed = datetime.strptime(causelist_date, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return CAUSELIST['today_ttl']
+
+    today = date_type.today()
+    if listed < today:
+        return None
+    if listed == today:
+        return CAUSELIST['today_ttl']
+    return CAUSELIST['future_ttl']
+
+
+def load_causelist(court_type, court_name, causelist_date):
+    """Stored list as returned by the scraper, with fetch_time; None if absent"""
+    parent = db.query_one('''SELECT id, fetch_time, total_cases FROM causelists
+                             WHERE court_type = ? AND court_name = ? AND causelist_date = ?''',
+                          (court_type, court_name, causelist_date))
+    if parent is None:
+        return None
+
+    rows = db.query_all('''SELECT case_number, parties, court_room, time
+                           FROM causelist_cases
+                           WHERE causelist_id = ? ORDER BY position''', (parent['id'],))
+
+    return {
+        'status': 'success',
+        'date': causelist_date,
+        'court': court_name,
+        'cases': [dict(row) for row in rows],
+        'fetch_time': parent['fetch_time'],
+    }
+
+
+def save_causelist(court_type, court_name, causelist_date, result):
+    """Replace the stored list for a court and date"""
+    cases = result.get('cases', [])
+
+    with db.transaction() as conn:
+        conn.execute('''INSERT INTO causelists
+                        (court_type, court_name, causelist_date, fetch_time, raw_data, total_cases)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(court_type, court_name, causelist_date) DO UPDATE SET
+                            fetch_time = excluded.fetch_time,
+                            raw_data = excluded.raw_data,
+                            total_cases = excluded.total_cases''',
+                     (court_type, court_name, causelist_date, datetime.now(),
+                      json.dumps(result), len(cases)))
+
+        causelist_id = conn.execute('''SELECT id FROM causelists
+                                       WHERE court_type = ? AND court_name = ? AND causelist_date = ?''',
+                                    (court_type, court_name, causelist_date)).fetchone()['id']
+
+        conn.execute('DELETE FROM causelist_cases WHERE causelist_id = ?', (causelist_id,))
+        conn.executemany('''INSERT INTO causelist_cases
+                            (causelist_id, position, case_number, parties, court_room, time)
+                            VALUES (?, ?, ?, ?, ?, ?)''',
+                         [(causelist_id, position, case.get('case_number'), case.get('parties'),
+                           case.get('court_room'), case.get('time'))
+                          for position, case in enumerate(cases)])
+
+
+def _is_fresh(stored, causelist_date):
+    max_age = _max_age(causelist_date)
+    if max_age is None:
+        return True
+
+    try:
+        fetched = datetime.fromisoformat(str(stored['fetch_time']))
+    except ValueError:
+        return False
+    return (datetime.now() - fetched).total_seconds() <= max_age
+
+
+def get_stored_causelist(court_type, court_name, causelist_date):
+    """Stored list if it is still valid, otherwise None"""
+    stored = load_causelist(court_type, court_name, causelist_date)
+    if stored is None or not _is_fresh(stored, causelist_date):
+        return None
+
+    stored['cached'] = True
+    return stored
+
+
+def get_causelist(court_type, court_name, causelist_date, refresh=False):
+    """Cause list from the store when still valid, otherwise scraped and stored"""
+    if not refresh:
+        stored = get_stored_causelist(court_type, court_name, causelist_date)
+        if stored is not None:
+            return stored
+
+    with CourtScraper() as scraper:
+        result = scraper.fetch_causelist(court_type, court_name, causelist_date)
+
+    if result and result.get('status') == 'success':
+        save_causelist(court_type, court_name, causelist_date, result)
+        result['cached'] = False
+
+    return result
+
+
+def prefetch_causelists(courts=None):
+    """
+    Keep today's and tomorrow's lists for the configured courts in the store
+    Each list is only scraped again once it has outlived its TTL
+    """
+    today = date_type.today()
+    dates = [today.strftime('%Y-%m-%d'), (today + timedelta(days=1)).strftime('%Y-%m-%d')]
+    fetched = 0
+
+    for court_type, court_name in courts or CAUSELIST['prefetch_courts']:
+        for causelist_date in dates:
+            try:
+                result = get_causelist(court_type, court_name, causelist_date)
+                if result and not result.get('cached'):
+                    fetched += 1
+            except Exception as e:
+                logger.warning('cause list prefetch failed', extra={
+                    'court_name': court_name, 'court_type': court_type,
+                    'date': str(causelist_date), 'error': str(e)})
+
+    return fetched
+
+
+def _prefetch_loop():
+    while True:
+        prefetch_causelists()
+        time.sleep(CAUSELIST['prefetch_interval'])
+
+
+def start_prefetcher():
+    """Run prefetch_causelists periodically in a daemon thread"""
+    thread = threading.Thread(target=_prefetch_loop, daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'prefetch':
+        db.migrate()
+        print(f"[OK] Pre-fetched {prefetch_causelists()} cause list(s)")
+    else:
+        print("Usage: python causelist_store.py prefetch")
+        sys.exit(1)
@@ -3,6 +3,8 @@ Configuration file for Court Data Fetcher
 Contains URLs and selectors for different courts
 """
 
+import os
+
 # Court URLs
 ECOURTS_URLS = {
     'high_court_main': 'https://services.ecourts.gov.in/ecourtindia_v6/',
@@ -77,6 +79,9 @@ DOWNLOAD_SETTINGS = {
     'folder': 'downloads',
     'max_file_size_mb': 50,
     'allowed_extensions': ['.pdf', '.doc', '.docx'],
+    'chunk_size_kb': 64,        # Streaming chunk size for judgment downloads
+    'blob_folder': 'downloads/blobs',   # Content-addressed store, sharded by SHA-256
+    'tmp_folder': 'downloads/tmp',      # In-progress downloads
 }
 
 # Database settings
@@ -84,6 +89,13 @@ DATABASE = {
     'sqlite': {
         'name': 'court_data.db',
         'check_same_thread': False,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',      # Safe with WAL, avoids an fsync per commit
+        'cache_size_kb': 20000,
+        'mmap_size_mb': 256,
+        'busy_timeout_ms': 5000,
+        'lock_retries': 3,            # Extra attempts after busy_timeout expires
+        'statement_cache_size': 256,  # Prepared statements kept per connection
     },
     'postgres': {
         'host': 'localhost',
@@ -100,6 +112,243 @@ SCRAPING = {
     'retry_delay': 2,
     'timeout': 30,
     'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    # 'demo' generates mock data; 'live' queries the portals (HTTP first, browser fallback)
+    'mode': os.environ.get('SCRAPER_MODE', 'demo'),
+}
+
+# Plain-HTTP scraping backend (Selenium is only used to bootstrap sessions
+# or when a page can't be fetched without a browser)
+HTTP_BACKEND = {
+    'sessions_per_host': 4,     # Pooled requests.Session objects per portal host
+    'connections_per_host': 10, # urllib3 keep-alive pool size per session
+    'session_max_age': 1800,    # Re-bootstrap cookies after this many seconds
+    'acquire_timeout': 30,
+}
+
+# Adaptive per-host rate limiting (AIMD token bucket shared through SQLite)
+RATE_LIMIT = {
+    'initial_rate': 1.0,        # Requests per second for a host we haven't seen
+    'min_rate': 0.1,
+    'max_rate': 10.0,
+    'burst': 3,                 # Bucket capacity in requests
+    'increase_step': 0.05,      # Added to the rate after each healthy response
+    'decrease_factor': 0.5,     # Rate multiplier on 429/503, CAPTCHA or slow responses
+    'slow_latency': 8.0,        # Seconds; slower responses count as throttling
+    'decrease_interval': 5,     # At most one decrease per host in this many seconds
+    'acquire_timeout': 60,
+}
+
+# Structured logging (log_config.py): JSON lines written by a background thread
+LOGGING = {
+    'level': os.environ.get('LOG_LEVEL', 'INFO'),
+    # Shared by every gunicorn and job worker process, which only append to it;
+    # rotate it with logrotate (the file is reopened when it is moved). Empty: console only
+    'file': os.environ.get('LOG_FILE', 'logs/app.log'),
+    'queue_size': 10000,        # Records waiting for the writer; extra records are dropped
+    'debug_sample_rate': 0.1,   # Share of DEBUG records kept (override per call with extra={'sample_rate': ...})
+    'console_format': os.environ.get('LOG_FORMAT', 'text'),   # 'text' or 'json'
+    'quiet_loggers': ['urllib3', 'selenium', 'asyncio'],
+}
+
+# Per-stage timing (tracing.py): Server-Timing header and /metrics histograms
+TRACING = {
+    'enabled': True,
+    'server_timing': True,
+    'buckets': [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60],
+}
+
+# Coalescing of identical in-flight case lookups (single_flight.py)
+SINGLE_FLIGHT = {
+    'lease': 120,               # Seconds before another worker may take over a crashed leader's key
+    'poll_interval': 0.2,       # How often workers check whether another worker's scrape finished
+    'max_wait': 20,             # Seconds a web request waits on another lookup's scrape before answering 202
+                                # with a job id; keep well under the gunicorn timeout
+}
+
+# Retries, circuit breaker and hedging around portal requests (resilience.py)
+RESILIENCE = {
+    'max_delay': 30,            # Backoff cap; base is SCRAPING['retry_delay'], full jitter
+    'failure_threshold': 5,     # Consecutive transient failures that open a host's circuit
+    'reset_timeout': 60,        # Seconds an open circuit fails fast before one probe is let through
+    'hedge_enabled': True,      # Send a second request when the first outlives the host's p95
+    'hedge_percentile': 95,
+    'hedge_min_samples': 20,    # Latencies needed before hedging kicks in
+    'latency_window': 200,      # Recent latencies kept per host
+}
+
+# Portal endpoints used in live mode, relative to the court's base URL
+PORTAL_ENDPOINTS = {
+    'high_court': {
+        'case_status': '?p=casestatus/submitCaseType',
+        'causelist': '?p=cause_list/submitCauseList',
+    },
+    'district_court': {
+        'case_status': '?p=casestatus/submitCaseType',
+        'causelist': '?p=cause_list/submitCauseList',
+    },
+}
+
+# Headless browser pool settings (shared by all CourtScraper instances)
+DRIVER_POOL = {
+    'max_size': 2,              # Chrome instances per worker process
+    'warm_size': 1,             # Instances started when the pool is warmed up
+    'max_uses': 50,             # Recycle a driver after this many borrows
+    'max_memory_mb': 600,       # Recycle a driver once its process tree exceeds this
+    'acquire_timeout': 30,      # Seconds to wait for a free driver
+    'page_load_timeout': 30,
+}
+
+# Worker startup: gunicorn.conf.py preloads the app in the master, imports
+# the scraping backends there once, and warms each worker after it forks
+STARTUP = {
+    'preload_modules': ['async_scraper', 'http_backend'],   # Shared copy-on-write by all workers
+    'warm_http_sessions': os.environ.get('HTTP_SESSION_WARMUP', 'false').lower() == 'true',  # Live mode only
+    'warm_browsers': os.environ.get('DRIVER_POOL_WARMUP', 'false').lower() == 'true',
+    'import_budget_ms': 400,    # bench_startup.py fails when a cold `import app` takes longer
+}
+
+# Raw portal responses, stored compressed and de-duplicated outside queries
+RAW_STORE = {
+    'codec': 'zlib',
+    'compression_level': 6,
+    'migrate_batch_size': 500,  # Rows rewritten per transaction by `python raw_store.py migrate`
+}
+
+# Case lookup cache (in-process LRU backed by the queries table)
+CACHE = {
+    'memory_max_entries': 2000,
+    # TTL in seconds for the first keyword found as a whole word in the lower-cased case
+    # status; negated mentions ("Not Disposed", "non-disposed") don't count
+    'status_ttl': {
+        'disposed': 3 * 24 * 3600,
+        'dismissed': 3 * 24 * 3600,
+        'withdrawn': 3 * 24 * 3600,
+        'reserved': 3600,
+        'pending': 10 * 60,
+        'hearing': 10 * 60,
+    },
+    'default_ttl': 10 * 60,
+    'stale_grace': 30 * 60,     # Serve expired entries this long while refreshing
+}
+
+# Cause list store settings
+CAUSELIST = {
+    'today_ttl': 15 * 60,       # Today's list may still change during the day
+    'future_ttl': 6 * 3600,     # Lists published ahead of time
+    'prefetch_enabled': True,
+    'prefetch_interval': 600,   # Under today_ttl so today's lists never go stale
+    'prefetch_courts': [
+        ('high_court', 'Delhi'),
+        ('high_court', 'Mumbai'),
+        ('district_court', 'Delhi'),
+    ],
+}
+
+# Query history listing
+HISTORY = {
+    'default_limit': 50,
+    'max_limit': 200,
+}
+
+# Full-text search over stored cases and cause lists (/api/search)
+SEARCH = {
+    'default_limit': 20,
+    'max_limit': 100,
+    'max_offset': 1000,         # Deeper pages rank too many matches; refine the query instead
+    'max_terms': 8,
+    'rank_window': 5000,        # Newest matches scored per query; bounds the cost of common words
+    'weights': {                # bm25 column weights
+        'petitioner': 10.0,
+        'respondent': 10.0,
+        'case_status': 2.0,
+    },
+}
+
+# Judgment text extraction (judgment_text.py) and /api/judgments/search
+JUDGMENT_TEXT = {
+    'enabled': True,            # Run the extractor alongside the job worker
+    'interval': 60,             # Seconds between checks for new judgments
+    'workers': min(4, os.cpu_count() or 1),  # Extraction processes
+    'pages_per_task': 8,        # Pages per pool task; large judgments spread across workers
+    'batch_size': 20,           # Judgments scheduled per round
+    'max_pages': 2000,          # Larger PDFs are not extracted
+    'max_attempts': 3,          # Before a judgment is marked failed
+    'rank_window': 5000,
+    'snippet_tokens': 24,
+    'snippet_marks': ('[', ']'),
+    'default_limit': 20,
+    'max_limit': 100,
+    'max_offset': 1000,
+}
+
+# Case watchlist (watchlist.py): scheduled refreshes of tracked cases
+WATCHLIST = {
+    'enabled': True,            # Run the scheduler alongside the job worker
+    'interval': 300,            # Seconds between checks for due cases
+    'batch_size': 200,          # Cases refreshed per round, soonest next hearing first
+    'refresh_every': 24 * 3600, # Usual gap between refreshes of a case
+    'hearing_soon_days': 2,     # Cases with a hearing this close ...
+    'hearing_soon_every': 6 * 3600,  # ... are refreshed this often
+    'closed_every': 7 * 24 * 3600,   # Cases whose status contains a closed_statuses word
+    'closed_statuses': ('disposed', 'dismissed', 'withdrawn'),
+    'retry_after': 30 * 60,     # After a failed refresh; doubles per consecutive failure
+    'max_retry_after': 24 * 3600,
+    'ignore_fields': [],        # parsed_data fields never reported as changed
+    'max_items': 5000,          # Cases accepted per request
+    'changes_window': 24 * 3600,  # Default `since` for /api/watchlist/changes
+    'default_limit': 100,
+    'max_limit': 1000,
+}
+
+# Change detection for re-fetched case pages: a page that hashes the same as
+# the stored version is neither parsed nor stored again
+CHANGE_DETECTION = {
+    'enabled': True,
+    # Markup that differs between responses without the case changing; removed before hashing
+    'volatile_patterns': [
+        r'<!--.*?-->',
+        r'<script\b.*?</script>',
+        r'<input\b[^>]*\btype=["\']?hidden\b[^>]*>',
+        r'<meta\b[^>]*\bname=["\']?csrf[^>]*>',
+    ],
+}
+
+# Batch case lookup settings
+BATCH = {
+    'max_items': 500,           # Cases accepted per request
+}
+
+# Bulk case import from CSV/XLSX (case_import.py, /api/import)
+IMPORT = {
+    'batch_size': 500,          # Rows validated together; also the cases per lookup job
+    'max_rows': 50000,          # Rows read per file; the rest are reported as skipped
+    'max_errors': 1000,         # Row errors reported one by one; later ones are only counted
+    # Accepted header names per field, compared lower-cased with punctuation as "_".
+    # Files without a recognised header are read as case_type, case_number, year, court
+    'columns': {
+        'case_type': ('case_type', 'type', 'casetype'),
+        'case_number': ('case_number', 'case_no', 'caseno', 'number', 'no', 'registration_no'),
+        'year': ('year', 'case_year'),
+        'court_name': ('court_name', 'court', 'bench'),
+        'court_type': ('court_type',),
+    },
+}
+
+# asyncio scraping engine (bulk lookups, async_scraper.py)
+ASYNC_SCRAPING = {
+    'max_connections': 200,     # Outstanding portal requests across all hosts
+    'per_host_concurrency': 8,  # Outstanding requests against any one court host
+}
+
+# Background job queue settings
+JOBS = {
+    'poll_interval': 0.5,       # Seconds between queue checks when idle
+    'max_wait': 20,             # Longest long-poll on /api/jobs/<id>, kept under the gunicorn timeout
+    'max_attempts': 2,          # Attempts before a job is marked failed
+    'heartbeat_interval': 10,   # Seconds between "still running" updates of a running job
+    'stale_after': 60,          # Requeue running jobs without a heartbeat for this long
+    'retention_days': 7,        # Finished and failed jobs are deleted after this many days
+    'prune_interval': 3600,     # Seconds between retention sweeps by each worker
 }
 
 # Parser settings for extracting data
@@ -113,6 +362,14 @@ PARSER_KEYWORDS = {
     'advocate': ['advocate', 'counsel', 'lawyer'],
 }
 
+# Cause list table header keywords, per output column
+CAUSELIST_COLUMNS = {
+    'case_number': ['case no', 'case number', 'case'],
+    'parties': ['parties', 'party', 'title', 'cause title'],
+    'court_room': ['court room', 'court no', 'room', 'bench'],
+    'time': ['time', 'timing', 'slot'],
+}
+
 # Error messages
 ERROR_MESSAGES = {
     'invalid_case_number': 'Invalid case number format',
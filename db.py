@@ -0,0 +1,543 @@
+"""
+Database connection manager for Court Data Fetcher
+Keeps one tuned SQLite connection per thread and worker process
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from config_file import DATABASE
+from tracing import span
+from utils_module import clean_text, generate_query_hash, parse_case_parties
+
+SETTINGS = DATABASE['sqlite']
+
+_local = threading.local()
+
+# Canonical schema, shared by app.py and setup.py
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS queries
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        case_type TEXT NOT NULL,
+        case_number TEXT NOT NULL,
+        year TEXT NOT NULL,
+        court_type TEXT NOT NULL,
+        court_name TEXT NOT NULL,
+        query_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        raw_response TEXT,
+        parsed_data TEXT,
+        status TEXT NOT NULL,
+        error_message TEXT)''',
+
+    '''CREATE TABLE IF NOT EXISTS judgments
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        query_id INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        file_size INTEGER,
+        download_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(query_id) REFERENCES queries(id))''',
+
+    '''CREATE TABLE IF NOT EXISTS raw_responses
+       (content_hash TEXT PRIMARY KEY,
+        codec TEXT NOT NULL,
+        raw_size INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+
+    '''CREATE TABLE IF NOT EXISTS judgment_blobs
+       (content_hash TEXT PRIMARY KEY,
+        file_path TEXT NOT NULL,
+        file_size INTEGER NOT NULL,
+        ref_count INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+
+    '''CREATE TABLE IF NOT EXISTS causelists
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        court_type TEXT NOT NULL,
+        court_name TEXT NOT NULL,
+        causelist_date DATE NOT NULL,
+        fetch_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        raw_data TEXT,
+        total_cases INTEGER)''',
+
+    '''CREATE TABLE IF NOT EXISTS causelist_cases
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        causelist_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        case_number TEXT,
+        parties TEXT,
+        court_room TEXT,
+        time TEXT,
+        FOREIGN KEY(causelist_id) REFERENCES causelists(id))''',
+
+    '''CREATE TABLE IF NOT EXISTS jobs
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_type TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        result TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP)''',
+
+    '''CREATE TABLE IF NOT EXISTS data_migrations
+       (name TEXT PRIMARY KEY,
+        applied_at TIMESTAMP)''',
+
+    '''CREATE TABLE IF NOT EXISTS inflight
+       (key TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        started_at REAL NOT NULL)''',
+
+    '''CREATE TABLE IF NOT EXISTS rate_limits
+       (host TEXT PRIMARY KEY,
+        rate REAL NOT NULL,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        successes INTEGER NOT NULL DEFAULT 0,
+        throttles INTEGER NOT NULL DEFAULT 0,
+        last_throttle_at REAL)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_queries_case
+       ON queries(case_type, case_number, year)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_queries_hash
+       ON queries(query_hash, id)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_queries_court
+       ON queries(court_type, court_name)''',
+
+    # History listing: each index leads with its filter, then (query_time, id)
+    # for the keyset order, and carries every listed column so the table (and
+    # its large raw_response / parsed_data values) is never read
+    '''CREATE INDEX IF NOT EXISTS idx_queries_history
+       ON queries(query_time, id, case_type, case_number, year, court_name, status)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_queries_history_court
+       ON queries(court_name, query_time, id, case_type, case_number, year, status)''',
+
+    # Replaced by idx_queries_history_type: with year before query_time, a
+    # case_type-only filter needed a sort step
+    '''DROP INDEX IF EXISTS idx_queries_history_case_type''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_queries_history_type
+       ON queries(case_type, query_time, id, case_number, year, court_name, status)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_queries_history_year
+       ON queries(year, query_time, id, case_type, case_number, court_name, status)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_queries_history_status
+       ON queries(status, query_time, id, case_type, case_number, year, court_name)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_judgments_query
+       ON judgments(query_id)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_judgments_url
+       ON judgments(source_url, id)''',
+
+    '''CREATE UNIQUE INDEX IF NOT EXISTS idx_causelists_court_date
+       ON causelists(court_type, court_name, causelist_date)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_causelist_cases_list
+       ON causelist_cases(causelist_id, position)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_judgments_hash
+       ON judgments(content_hash)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced
+       ON judgment_blobs(ref_count) WHERE ref_count <= 0''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_jobs_status
+       ON jobs(status, id)''',
+
+    # Full-text party search. rowid is queries.id / causelist_cases.id; the
+    # text is normalized by the clean_text() and case_party() SQL functions
+    # registered in _connect(), so rows must be written over its connections
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS case_search USING fts5
+       (petitioner, respondent, case_status,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')''',
+
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS causelist_search USING fts5
+       (petitioner, respondent,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')''',
+
+    # Only the latest successful lookup of a case stays in the index
+    '''CREATE TRIGGER IF NOT EXISTS trg_queries_search_insert
+       AFTER INSERT ON queries
+       WHEN NEW.status = 'success' AND NEW.parsed_data IS NOT NULL
+       BEGIN
+           DELETE FROM case_search WHERE rowid IN
+               (SELECT id FROM queries WHERE query_hash = NEW.query_hash AND id < NEW.id);
+           INSERT INTO case_search (rowid, petitioner, respondent, case_status)
+           VALUES (NEW.id,
+                   clean_text(json_extract(NEW.parsed_data, '$.petitioner')),
+                   clean_text(json_extract(NEW.parsed_data, '$.respondent')),
+                   clean_text(COALESCE(json_extract(NEW.parsed_data, '$.case_status'),
+                                       json_extract(NEW.parsed_data, '$.status'))));
+       END''',
+
+    '''CREATE TRIGGER IF NOT EXISTS trg_queries_search_delete
+       AFTER DELETE ON queries
+       BEGIN
+           DELETE FROM case_search WHERE rowid = OLD.id;
+       END''',
+
+    '''CREATE TRIGGER IF NOT EXISTS trg_causelist_cases_search_insert
+       AFTER INSERT ON causelist_cases
+       BEGIN
+           INSERT INTO causelist_search (rowid, petitioner, respondent)
+           VALUES (NEW.id, case_party(NEW.parties, 0), case_party(NEW.parties, 1));
+       END''',
+
+    '''CREATE TRIGGER IF NOT EXISTS trg_causelist_cases_search_delete
+       AFTER DELETE ON causelist_cases
+       BEGIN
+           DELETE FROM causelist_search WHERE rowid = OLD.id;
+       END''',
+
+    # Judgment text, extracted per stored PDF blob by judgment_text.py.
+    # judgment_texts tracks each blob's progress, judgment_pages holds the
+    # text page by page and judgment_search indexes it (external content)
+    '''CREATE TABLE IF NOT EXISTS judgment_texts
+       (content_hash TEXT PRIMARY KEY,
+        status TEXT NOT NULL DEFAULT 'pending',
+        page_count INTEGER,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+
+    '''CREATE TABLE IF NOT EXISTS judgment_pages
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        content_hash TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        text TEXT NOT NULL)''',
+
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS judgment_search USING fts5
+       (text, content = 'judgment_pages', content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2')''',
+
+    '''CREATE UNIQUE INDEX IF NOT EXISTS idx_judgment_pages_page
+       ON judgment_pages(content_hash, page)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_judgment_texts_status
+       ON judgment_texts(status, updated_at)''',
+
+    '''CREATE TRIGGER IF NOT EXISTS trg_judgment_pages_search_insert
+       AFTER INSERT ON judgment_pages
+       BEGIN
+           INSERT INTO judgment_search (rowid, text) VALUES (NEW.id, NEW.text);
+       END''',
+
+    '''CREATE TRIGGER IF NOT EXISTS trg_judgment_pages_search_delete
+       AFTER DELETE ON judgment_pages
+       BEGIN
+           INSERT INTO judgment_search (judgment_search, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+       END''',
+
+    # New PDF blobs are queued for extraction; garbage-collected ones drop their text
+    '''CREATE TRIGGER IF NOT EXISTS trg_judgment_blobs_text_insert
+       AFTER INSERT ON judgment_blobs
+       WHEN lower(NEW.file_path) LIKE '%.pdf'
+       BEGIN
+           INSERT OR IGNORE INTO judgment_texts (content_hash) VALUES (NEW.content_hash);
+       END''',
+
+    '''CREATE TRIGGER IF NOT EXISTS trg_judgment_blobs_text_delete
+       AFTER DELETE ON judgment_blobs
+       BEGIN
+           DELETE FROM judgment_pages WHERE content_hash = OLD.content_hash;
+           DELETE FROM judgment_texts WHERE content_hash = OLD.content_hash;
+       END''',
+
+    # Case watchlist (watchlist.py). field_hashes is the last snapshot of a
+    # case, one hash per parsed_data field; watch_changes keeps the value of
+    # each field only when it changes (baseline rows hold the first snapshot)
+    '''CREATE TABLE IF NOT EXISTS watchlist
+       (id INTEGER PRIMARY KEY,
+        query_hash TEXT NOT NULL UNIQUE,
+        case_type TEXT NOT NULL,
+        case_number TEXT NOT NULL,
+        year TEXT NOT NULL,
+        court_type TEXT NOT NULL,
+        court_name TEXT NOT NULL,
+        label TEXT,
+        next_hearing TEXT,
+        case_status TEXT,
+        snapshot_hash TEXT,
+        field_hashes TEXT,
+        last_query_id INTEGER,
+        last_checked TIMESTAMP,
+        last_changed TIMESTAMP,
+        next_check TIMESTAMP NOT NULL,
+        failures INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        created_at TIMESTAMP)''',
+
+    '''CREATE TABLE IF NOT EXISTS watch_changes
+       (id INTEGER PRIMARY KEY,
+        watch_id INTEGER NOT NULL,
+        field TEXT NOT NULL,
+        value TEXT,
+        baseline INTEGER NOT NULL DEFAULT 0,
+        changed_at TIMESTAMP NOT NULL)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_watchlist_due
+       ON watchlist(next_check)''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_watch_changes_time
+       ON watch_changes(changed_at) WHERE baseline = 0''',
+
+    '''CREATE INDEX IF NOT EXISTS idx_watch_changes_field
+       ON watch_changes(watch_id, field, id)''',
+
+    '''CREATE TRIGGER IF NOT EXISTS trg_watchlist_delete
+       AFTER DELETE ON watchlist
+       BEGIN
+           DELETE FROM watch_changes WHERE watch_id = OLD.id;
+       END''',
+]
+
+
+# Columns added after the original schema: (table, column, declaration)
+COLUMNS = [
+    ('queries', 'query_hash', 'TEXT'),
+    ('queries', 'raw_hash', 'TEXT'),
+    ('judgments', 'source_url', 'TEXT'),
+    ('judgments', 'content_hash', 'TEXT'),
+    ('queries', 'page_hash', 'TEXT'),
+    ('queries', 'verified_at', 'TIMESTAMP'),
+    ('jobs', 'heartbeat', 'TIMESTAMP'),
+]
+
+
+# Fill a derived table from existing rows when migration first creates it
+BACKFILLS = {
+    'case_search': '''INSERT INTO case_search (rowid, petitioner, respondent, case_status)
+                      SELECT id,
+                             clean_text(json_extract(parsed_data, '$.petitioner')),
+                             clean_text(json_extract(parsed_data, '$.respondent')),
+                             clean_text(COALESCE(json_extract(parsed_data, '$.case_status'),
+                                                 json_extract(parsed_data, '$.status')))
+                      FROM queries
+                      WHERE id IN (SELECT MAX(id) FROM queries
+                                   WHERE status = 'success' AND parsed_data IS NOT NULL
+                                   GROUP BY COALESCE(query_hash, id))''',
+
+    'causelist_search': '''INSERT INTO causelist_search (rowid, petitioner, respondent)
+                           SELECT id, case_party(parties, 0), case_party(parties, 1)
+                           FROM causelist_cases''',
+
+    'judgment_texts': '''INSERT OR IGNORE INTO judgment_texts (content_hash)
+                         SELECT content_hash FROM judgment_blobs
+                         WHERE lower(file_path) LIKE '%.pdf' ''',
+}
+
+
+# One-off rewrites of existing rows, each applied once and recorded in data_migrations.
+# Statements may call query_hash(case_type, case_number, year, court_type, court_name)
+DATA_MIGRATIONS = {
+    # Query hashes now include court_type, so a High Court and a District Court
+    # case with the same court name no longer share a cache, lock or watchlist key
+    'query_hash_court_type': [
+        '''UPDATE queries SET query_hash = query_hash(case_type, case_number, year, court_type, court_name)
+           WHERE query_hash IS NOT NULL''',
+        '''UPDATE watchlist SET query_hash = query_hash(case_type, case_number, year, court_type, court_name)''',
+    ],
+}
+
+
+def _case_party(text, index):
+    """Petitioner (0) or respondent (1) of a "A vs B" string, normalized for the search index"""
+    return clean_text(parse_case_parties(text)[index])
+
+
+def database_path():
+    """Path of the SQLite database file"""
+    return os.environ.get('DATABASE_PATH', SETTINGS['name'])
+
+
+def _connect():
+    """Open a new connection with the performance pragmas applied"""
+    conn = sqlite3.connect(
+        database_path(),
+        timeout=SETTINGS['busy_timeout_ms'] / 1000,
+        check_same_thread=SETTINGS['check_same_thread'],
+        cached_statements=SETTINGS['statement_cache_size'],
+        isolation_level=None,
+    )
+    conn.row_factory = sqlite3.Row
+
+    conn.execute(f"PRAGMA journal_mode={SETTINGS['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous={SETTINGS['synchronous']}")
+    conn.execute(f"PRAGMA cache_size=-{SETTINGS['cache_size_kb']}")
+    conn.execute(f"PRAGMA mmap_size={SETTINGS['mmap_size_mb'] * 1024 * 1024}")
+    conn.execute(f"PRAGMA busy_timeout={SETTINGS['busy_timeout_ms']}")
+    conn.execute('PRAGMA temp_store=MEMORY')
+
+    # Used by the full-text search triggers
+    conn.create_function('clean_text', 1, clean_text, deterministic=True)
+    conn.create_function('case_party', 2, _case_party, deterministic=True)
+
+    return conn
+
+
+def get_connection():
+    """
+    Connection for the current thread
+    Reopened automatically after a fork so gunicorn workers never share one
+    """
+    conn = getattr(_local, 'conn', None)
+
+    if conn is None or _local.pid != os.getpid():
+        conn = _connect()
+        _local.conn = conn
+        _local.pid = os.getpid()
+
+    return conn
+
+
+def close_connection():
+    """Close the current thread's connection, if any"""
+    conn = getattr(_local, 'conn', None)
+
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
+
+
+def _is_locked(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def _with_retry(func):
+    """Run func, retrying with backoff if the database stays locked past busy_timeout"""
+    attempts = SETTINGS['lock_retries'] + 1
+
+    for attempt in range(attempts):
+        try:
+            return func()
+        except sqlite3.OperationalError as e:
+            if not _is_locked(e) or attempt == attempts - 1:
+                raise
+            time.sleep(0.05 * (2 ** attempt))
+
+
+def execute(sql, params=()):
+    """Execute a single statement in autocommit mode and return the cursor"""
+    conn = get_connection()
+    with span('db_query'):
+        return _with_retry(lambda: conn.execute(sql, params))
+
+
+def query_all(sql, params=()):
+    """Execute a query and return all rows"""
+    return execute(sql, params).fetchall()
+
+
+def query_one(sql, params=()):
+    """Execute a query and return the first row or None"""
+    return execute(sql, params).fetchone()
+
+
+@contextmanager
+def transaction():
+    """
+    Write transaction on the current thread's connection
+    Uses BEGIN IMMEDIATE so lock contention surfaces at the start, where it can be retried
+    """
+    conn = get_connection()
+
+    with span('db_transaction'):
+        _with_retry(lambda: conn.execute('BEGIN IMMEDIATE'))
+
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+
+def _add_missing_columns(conn):
+    """Bring tables created by older versions up to date"""
+    for table, column, declaration in COLUMNS:
+        existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if column not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+
+
+def _is_deferred(statement):
+    """Indexes and triggers, which may name columns _add_missing_columns adds"""
+    first_line = statement.split('\n')[0].upper()
+    return ' INDEX ' in first_line or ' TRIGGER ' in first_line
+
+
+# Stored in PRAGMA user_version; changes whenever SCHEMA, COLUMNS, BACKFILLS or DATA_MIGRATIONS do
+SCHEMA_VERSION = zlib.crc32(repr((SCHEMA, COLUMNS, BACKFILLS, DATA_MIGRATIONS)).encode()) & 0x7fffffff
+
+
+def init_schema():
+    """
+    Create all tables, add missing columns, create indexes and triggers,
+    then fill new search indexes and apply pending data migrations
+    """
+    with transaction() as conn:
+        existing = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        for statement in SCHEMA:
+            if not _is_deferred(statement):
+                conn.execute(statement)
+        _add_missing_columns(conn)
+        for statement in SCHEMA:
+            if _is_deferred(statement):
+                conn.execute(statement)
+
+        for table, statement in BACKFILLS.items():
+            if table not in existing:
+                conn.execute(statement)
+
+        conn.create_function('query_hash', 5, generate_query_hash, deterministic=True)
+        applied = {row['name'] for row in conn.execute('SELECT name FROM data_migrations')}
+        for name, statements in DATA_MIGRATIONS.items():
+            if name not in applied:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute('INSERT INTO data_migrations (name, applied_at) VALUES (?, ?)', (name, datetime.now()))
+
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+
+def schema_is_current():
+    return query_one('PRAGMA user_version')[0] == SCHEMA_VERSION
+
+
+def migrate():
+    """
+    Bring the database up to the current schema; a single read when it already is
+    Run once per deploy (setup.py, gunicorn's master), not on every import
+    Returns True if the schema was applied
+    """
+    if schema_is_current():
+        return False
+    init_schema()
+    return True
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        applied = migrate()
+        print(f"[OK] Schema {'migrated' if applied else 'already current'} ({database_path()})")
+    else:
+        print("Usage: python db.py migrate")
+        sys.exit(1)
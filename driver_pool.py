@@ -0,0 +1,267 @@
+"""
+Headless browser pool for Court Data Fetcher
+Keeps warm Chrome instances that CourtScraper borrows and returns,
+so requests don't pay a full browser cold start
+"""
+
+import os
+import threading
+import time
+import atexit
+from config_file import DRIVER_POOL, SCRAPING
+from resilience import LocalTimeout
+from tracing import span
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class _PooledDriver:
+    """Bookkeeping for a single Chrome instance owned by the pool"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created = time.time()
+
+
+def _process_tree_rss_mb(pid):
+    """
+    Resident memory of a process and all its children, in MB
+    Reads /proc directly; returns 0 where that is not available
+    """
+    total_kb = 0
+    pending = [pid]
+    seen = set()
+
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+
+    return total_kb / 1024
+
+
+class DriverPool:
+    """
+    Bounded pool of headless Chrome drivers
+
+    Drivers are health-checked on borrow and recycled after `max_uses`
+    borrows or once their process tree grows past `max_memory_mb`.
+    """
+
+    def __init__(self, max_size=None, max_uses=None, max_memory_mb=None, acquire_timeout=None):
+        self.max_size = max_size or DRIVER_POOL['max_size']
+        self.max_uses = max_uses or DRIVER_POOL['max_uses']
+        self.max_memory_mb = max_memory_mb or DRIVER_POOL['max_memory_mb']
+        self.acquire_timeout = acquire_timeout or DRIVER_POOL['acquire_timeout']
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._in_use = {}
+        self._size = 0
+        self._pid = os.getpid()
+        self._stats = {'created': 0, 'recycled': 0, 'unhealthy': 0, 'borrowed': 0}
+
+    def _create_driver(self):
+        """Launch a new headless Chrome instance"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+
+        chrome_options = Options()
+        if os.environ.get('SELENIUM_HEADLESS', 'true').lower() == 'true':
+            chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument(f"--user-agent={SCRAPING['user_agent']}")
+
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(DRIVER_POOL['page_load_timeout'])
+        return driver
+
+    def _check_fork(self):
+        """Forget drivers inherited from a parent process (caller holds the lock)"""
+        if os.getpid() != self._pid:
+            self._idle = []
+            self._in_use = {}
+            self._size = 0
+            self._pid = os.getpid()
+
+    def _is_healthy(self, entry):
+        """Cheap liveness probe on a driver"""
+        try:
+            entry.driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def _needs_recycle(self, entry):
+        """Check whether a driver has exceeded its use or memory budget"""
+        if entry.uses >= self.max_uses:
+            return True
+
+        try:
+            pid = entry.driver.service.process.pid
+        except AttributeError:
+            return False
+
+        return _process_tree_rss_mb(pid) > self.max_memory_mb
+
+    def _discard(self, entry):
+        """Quit a driver and free its slot"""
+        try:
+            entry.driver.quit()
+        except Exception:
+            pass
+
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @span('browser_acquire')
+    def acquire(self, timeout=None):
+        """
+        Borrow a driver from the pool
+        Blocks until one is free, raising LocalTimeout after `timeout` seconds
+        """
+        deadline = time.time() + (timeout or self.acquire_timeout)
+
+        while True:
+            entry = None
+            create = False
+
+            with self._cond:
+                self._check_fork()
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise LocalTimeout('No browser available in driver pool')
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    entry = _PooledDriver(self._create_driver())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                self._stats['created'] += 1
+            elif not self._is_healthy(entry):
+                self._stats['unhealthy'] += 1
+                self._discard(entry)
+                continue
+
+            with self._cond:
+                self._in_use[id(entry.driver)] = entry
+            self._stats['borrowed'] += 1
+            return entry.driver
+
+    def release(self, driver, broken=False):
+        """
+        Return a borrowed driver to the pool
+        Pass broken=True to discard it instead of reusing it
+        """
+        with self._cond:
+            entry = self._in_use.pop(id(driver), None)
+
+        if entry is None:
+            # Not ours (or borrowed before a fork) - just close it
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            return
+
+        entry.uses += 1
+
+        if broken or self._needs_recycle(entry):
+            self._stats['recycled'] += 1
+            self._discard(entry)
+            return
+
+        try:
+            driver.delete_all_cookies()
+            driver.get('about:blank')
+        except Exception:
+            self._discard(entry)
+            return
+
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def warm_up(self, count=None):
+        """Start drivers ahead of time so the first requests find a warm browser"""
+        count = min(count or DRIVER_POOL['warm_size'], self.max_size)
+        started = []
+
+        try:
+            for _ in range(count):
+                started.append(self.acquire())
+        except Exception as e:
+            logger.warning('driver pool warm-up stopped', extra={'error': str(e)})
+        finally:
+            for driver in started:
+                self.release(driver)
+
+        logger.info('driver pool warmed', extra={'browsers': len(started)})
+        return len(started)
+
+    def stats(self):
+        """Current pool counters"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'max_size': self.max_size,
+                **self._stats
+            }
+
+    def shutdown(self):
+        """Quit every idle driver owned by this process"""
+        with self._cond:
+            if os.getpid() != self._pid:
+                return
+            idle, self._idle = self._idle, []
+
+        for entry in idle:
+            self._discard(entry)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide driver pool, created on first use"""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DriverPool()
+                atexit.register(_pool.shutdown)
+
+    return _pool
@@ -0,0 +1,37 @@
+"""
+Gunicorn settings for Court Data Fetcher
+The app is imported once in the master and shared copy-on-write by the
+workers; each worker then opens its own pools before taking traffic.
+
+Usage:  gunicorn -c gunicorn.conf.py app:app
+"""
+
+import importlib
+import os
+import db
+from config_file import STARTUP
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Threaded workers: a slow request or a /api/jobs/<id>?wait=N long-poll holds one
+# thread, not a whole worker
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 120
+preload_app = True
+
+
+def on_starting(server):
+    """In the master, before any worker forks: migrate once and import the scraping backends"""
+    db.migrate()
+    # Workers must open their own connection, not inherit this one
+    db.close_connection()
+
+    for name in STARTUP['preload_modules']:
+        importlib.import_module(name)
+
+
+def post_fork(server, worker):
+    """In each worker: warm its HTTP session and browser pools"""
+    from app import warm_up_worker
+    warm_up_worker()
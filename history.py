@@ -0,0 +1,91 @@
+"""
+Query history for Court Data Fetcher
+Keyset-paginated listing of the queries table with optional filters
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+from config_file import HISTORY
+import db
+
+COLUMNS = 'id, case_type, case_number, year, court_name, query_time, status'
+
+# Request parameter -> column for equality filters
+FILTERS = {
+    'court_name': 'court_name',
+    'case_type': 'case_type',
+    'year': 'year',
+    'status': 'status',
+}
+
+
+def encode_cursor(query_time, row_id):
+    """Opaque cursor pointing just after a row"""
+    raw = json.dumps([str(query_time), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        query_time, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(query_time), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _day_start(value):
+    return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+
+
+def _day_after(value):
+    return (datetime.strptime(value, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def list_history(filters=None, cursor=None, limit=None):
+    """
+    One page of history, newest first
+    Returns {'items': [...], 'next_cursor': str or None}
+    """
+    filters = filters or {}
+    limit = min(int(limit or HISTORY['default_limit']), HISTORY['max_limit'])
+    if limit < 1:
+        raise ValueError('limit must be positive')
+
+    where = []
+    params = []
+
+    for name, column in FILTERS.items():
+        value = filters.get(name)
+        if value:
+            where.append(f'{column} = ?')
+            params.append(value)
+
+    if filters.get('date_from'):
+        where.append('query_time >= ?')
+        params.append(_day_start(filters['date_from']))
+    if filters.get('date_to'):
+        where.append('query_time < ?')
+        params.append(_day_after(filters['date_to']))
+
+    if cursor:
+        query_time, row_id = decode_cursor(cursor)
+        where.append('(query_time, id) < (?, ?)')
+        params.extend([query_time, row_id])
+
+    sql = f'SELECT {COLUMNS} FROM queries'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY query_time DESC, id DESC LIMIT ?'
+    params.append(limit + 1)
+
+    rows = db.query_all(sql, params)
+    items = [dict(row) for row in rows[:limit]]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last['query_time'], last['id'])
+
+    return {'items': items, 'next_cursor': next_cursor}
@@ -0,0 +1,182 @@
+"""
+Plain-HTTP scraping backend for Court Data Fetcher
+Pooled requests.Session objects per portal host (keep-alive, gzip, cookie
+reuse). Selenium is only used to bootstrap a session's cookies when a plain
+request runs into a CAPTCHA or JavaScript challenge.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from config_file import HTTP_BACKEND, SCRAPING
+from driver_pool import get_pool
+from rate_limiter import rate_limiter
+from resilience import FallbackRequired, LocalTimeout, resilience
+from utils_module import detect_captcha
+
+
+class _PooledSession:
+    """A requests.Session plus when its cookies were last bootstrapped"""
+
+    def __init__(self, session):
+        self.session = session
+        self.bootstrapped_at = None
+
+
+def _new_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_BACKEND['connections_per_host'])
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'User-Agent': SCRAPING['user_agent'],
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def _needs_browser(response):
+    return response.status_code == 403 or detect_captcha(response.text)
+
+
+class HttpSessionPool:
+    """Bounded set of sessions per host, borrowed for one request at a time"""
+
+    def __init__(self, sessions_per_host=None, acquire_timeout=None):
+        self.sessions_per_host = sessions_per_host or HTTP_BACKEND['sessions_per_host']
+        self.acquire_timeout = acquire_timeout or HTTP_BACKEND['acquire_timeout']
+        self._cond = threading.Condition()
+        self._idle = {}
+        self._size = {}
+        self._stats = {'requests': 0, 'bootstraps': 0, 'browser_bootstraps': 0, 'fallbacks': 0}
+
+    def acquire(self, host):
+        deadline = time.time() + self.acquire_timeout
+
+        with self._cond:
+            while True:
+                idle = self._idle.setdefault(host, [])
+                if idle:
+                    return idle.pop()
+                if self._size.get(host, 0) < self.sessions_per_host:
+                    self._size[host] = self._size.get(host, 0) + 1
+                    return _PooledSession(_new_session())
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise LocalTimeout(f'No HTTP session available for {host}')
+                self._cond.wait(remaining)
+
+    def release(self, host, entry, discard=False):
+        with self._cond:
+            if discard:
+                entry.session.close()
+                self._size[host] -= 1
+            else:
+                self._idle[host].append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def session(self, url):
+        """Borrow the pooled session for a URL's host"""
+        host = urlparse(url).netloc
+        entry = self.acquire(host)
+        try:
+            yield entry
+        except Exception:
+            self.release(host, entry, discard=True)
+            raise
+        else:
+            self.release(host, entry)
+
+    def _bootstrap(self, entry, base_url, use_browser=False):
+        """Load the portal's landing page to pick up session cookies"""
+        self._stats['bootstraps'] += 1
+
+        if use_browser:
+            self._stats['browser_bootstraps'] += 1
+            pool = get_pool()
+            driver = pool.acquire()
+            try:
+                driver.get(base_url)
+                for cookie in driver.get_cookies():
+                    entry.session.cookies.set(cookie['name'], cookie['value'],
+                                              domain=cookie.get('domain'), path=cookie.get('path', '/'))
+            finally:
+                pool.release(driver)
+        else:
+            self._request(entry, 'GET', base_url)
+
+        entry.bootstrapped_at = time.time()
+
+    def _request(self, entry, method, url, data=None):
+        """One rate-limited request; its latency and outcome feed the limiter"""
+        rate_limiter.acquire(url)
+        start = time.time()
+        try:
+            with resilience.exchange():
+                response = entry.session.request(method, url, data=data, timeout=SCRAPING['timeout'])
+        except requests.RequestException:
+            rate_limiter.record(url, time.time() - start)
+            raise
+
+        rate_limiter.record(url, time.time() - start, response.status_code, detect_captcha(response.text))
+        return response
+
+    def fetch(self, url, base_url, method='GET', data=None):
+        """
+        Fetch a page over plain HTTP and return its text
+        Raises FallbackRequired if even a browser-bootstrapped session is challenged
+        """
+        with self.session(url) as entry:
+            age = time.time() - (entry.bootstrapped_at or 0)
+            if age > HTTP_BACKEND['session_max_age']:
+                self._bootstrap(entry, base_url)
+
+            for use_browser in (False, True):
+                self._stats['requests'] += 1
+                response = self._request(entry, method, url, data)
+
+                if not _needs_browser(response):
+                    response.raise_for_status()
+                    return response.text
+
+                if use_browser:
+                    break
+                self._bootstrap(entry, base_url, use_browser=True)
+
+        self._stats['fallbacks'] += 1
+        raise FallbackRequired(f'Portal challenged the HTTP session for {url}')
+
+    def warm_up(self, base_url):
+        """Connect to a portal and pick up its cookies before the first lookup needs them"""
+        with self.session(base_url) as entry:
+            self._bootstrap(entry, base_url)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'hosts': {host: {'sessions': size, 'idle': len(self._idle.get(host, []))}
+                          for host, size in self._size.items()},
+                **self._stats
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    """Process-wide HTTP session pool, created on first use"""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HttpSessionPool()
+
+    return _pool
@@ -0,0 +1,252 @@
+"""
+Background job queue for Court Data Fetcher
+SQLite-backed queue so long scrapes don't hold a gunicorn worker
+
+Run a worker with:  python jobs.py [--processes N]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from config_file import JOBS, CAUSELIST, JUDGMENT_TEXT, WATCHLIST
+from case_service import lookup_case
+from batch_lookup import run_batch
+from causelist_store import get_causelist, start_prefetcher
+import db
+import judgment_text
+import watchlist
+from log_config import get_logger, request_id
+
+logger = get_logger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Kept out of jobs.result: the page already lives in raw_store
+UNSTORED = ('raw_html', 'page_hash')
+
+
+def _fetch_case(payload):
+    result = lookup_case(**payload)
+    return {key: value for key, value in result.items() if key not in UNSTORED}
+
+
+def _fetch_cases(payload):
+    *_, summary = run_batch(payload['cases'], payload.get('court_type', 'high_court'))
+    return summary
+
+
+def _fetch_causelist(payload):
+    return get_causelist(payload['court_type'], payload['court_name'], payload['date'],
+                         refresh=payload.get('refresh', False))
+
+
+def _refresh_watchlist(payload):
+    return watchlist.refresh_due(payload.get('limit'))
+
+
+HANDLERS = {
+    'fetch_case': _fetch_case,
+    'fetch_cases': _fetch_cases,
+    'fetch_causelist': _fetch_causelist,
+    'refresh_watchlist': _refresh_watchlist,
+}
+
+
+def enqueue(job_type, payload):
+    """Add a job to the queue and return its id"""
+    if job_type not in HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    c = db.execute('''INSERT INTO jobs (job_type, payload, status, created_at)
+                      VALUES (?, ?, ?, ?)''',
+                   (job_type, json.dumps(payload), QUEUED, datetime.now()))
+    return c.lastrowid
+
+
+def get_job(job_id):
+    """Job status and result as a dict, or None if it doesn't exist"""
+    row = db.query_one('''SELECT id, job_type, status, result, error, attempts,
+                                 created_at, started_at, finished_at
+                          FROM jobs WHERE id = ?''', (job_id,))
+    if row is None:
+        return None
+
+    return {
+        'job_id': row['id'],
+        'job_type': row['job_type'],
+        'status': row['status'],
+        'result': json.loads(row['result']) if row['result'] else None,
+        'error': row['error'],
+        'attempts': row['attempts'],
+        'created_at': row['created_at'],
+        'started_at': row['started_at'],
+        'finished_at': row['finished_at'],
+    }
+
+
+def wait_for_job(job_id, timeout):
+    """Long-poll helper: return the job once finished or when timeout expires"""
+    deadline = time.time() + min(timeout, JOBS['max_wait'])
+    delay = 0.1
+
+    while True:
+        job = get_job(job_id)
+        if job is None or job['status'] in (DONE, FAILED) or time.time() >= deadline:
+            return job
+        time.sleep(min(delay, max(0, deadline - time.time())))
+        delay = min(delay * 2, 1.0)
+
+
+def claim_next(worker_id):
+    """Atomically move the oldest queued job to running and return it"""
+    # Cheap read first so idle workers don't keep taking the write lock
+    if db.query_one('SELECT 1 FROM jobs WHERE status = ? LIMIT 1', (QUEUED,)) is None:
+        return None
+
+    with db.transaction() as conn:
+        row = conn.execute('''SELECT id, job_type, payload FROM jobs
+                              WHERE status = ? ORDER BY id LIMIT 1''', (QUEUED,)).fetchone()
+        if row is None:
+            return None
+
+        now = datetime.now()
+        conn.execute('''UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat = ?,
+                                        attempts = attempts + 1
+                        WHERE id = ?''', (RUNNING, worker_id, now, now, row['id']))
+
+    return {'id': row['id'], 'job_type': row['job_type'], 'payload': json.loads(row['payload']),
+            'worker': worker_id}
+
+
+def requeue_stale():
+    """
+    Put back running jobs whose worker stopped sending heartbeats
+    Long jobs keep their heartbeat fresh, so only jobs of dead workers are requeued;
+    a job that has used up max_attempts is marked failed instead, so one that
+    crashes its worker isn't retried forever
+    """
+    now = datetime.now()
+    cutoff = now - timedelta(seconds=JOBS['stale_after'])
+    with db.transaction() as conn:
+        failed = conn.execute('''UPDATE jobs SET status = ?, worker = NULL, finished_at = ?,
+                                               error = 'Worker stopped responding'
+                                 WHERE status = ? AND COALESCE(heartbeat, started_at) < ?
+                                   AND attempts >= ?''',
+                              (FAILED, now, RUNNING, cutoff, JOBS['max_attempts'])).rowcount
+        requeued = conn.execute('''UPDATE jobs SET status = ?, worker = NULL
+                                   WHERE status = ? AND COALESCE(heartbeat, started_at) < ?''',
+                                (QUEUED, RUNNING, cutoff)).rowcount
+    if requeued or failed:
+        logger.warning('requeued stale jobs', extra={'jobs': requeued, 'failed': failed})
+    return requeued
+
+
+def prune_finished():
+    """Delete done and failed jobs older than retention_days; returns rows deleted"""
+    cutoff = datetime.now() - timedelta(days=JOBS['retention_days'])
+    c = db.execute('''DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?''',
+                   (DONE, FAILED, cutoff))
+    if c.rowcount:
+        logger.info('pruned finished jobs', extra={'jobs': c.rowcount})
+    return c.rowcount
+
+
+def _heartbeat(job, stop_event):
+    """Mark the job as alive every heartbeat_interval seconds until it finishes"""
+    while not stop_event.wait(JOBS['heartbeat_interval']):
+        db.execute('UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = ? AND worker = ?',
+                   (datetime.now(), job['id'], RUNNING, job['worker']))
+
+
+def run_job(job):
+    """
+    Execute one claimed job and record its outcome
+    The outcome is only written while this worker still owns the job: one that
+    was requeued meanwhile belongs to its next run
+    """
+    token = request_id.set(f"job-{job['id']}")
+    stop_heartbeat = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job, stop_heartbeat), daemon=True).start()
+    try:
+        result = HANDLERS[job['job_type']](job['payload'])
+        db.execute('''UPDATE jobs SET status = ?, result = ?, finished_at = ?
+                      WHERE id = ? AND status = ? AND worker = ?''',
+                   (DONE, json.dumps(result), datetime.now(), job['id'], RUNNING, job['worker']))
+    except Exception as e:
+        attempts = db.query_one('SELECT attempts FROM jobs WHERE id = ?', (job['id'],))['attempts']
+        status = QUEUED if attempts < JOBS['max_attempts'] else FAILED
+        db.execute('''UPDATE jobs SET status = ?, error = ?, finished_at = ?
+                      WHERE id = ? AND status = ? AND worker = ?''',
+                   (status, str(e), datetime.now(), job['id'], RUNNING, job['worker']))
+        logger.error('job failed', extra={'job_id': job['id'], 'job_type': job['job_type'], 'error': str(e)})
+    finally:
+        stop_heartbeat.set()
+        request_id.reset(token)
+
+
+def run_worker(poll_interval=None, stop_event=None):
+    """Process jobs until stop_event is set (or forever)"""
+    poll_interval = poll_interval or JOBS['poll_interval']
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    db.migrate()
+    next_requeue = 0
+    next_prune = 0
+
+    logger.info('job worker started', extra={'worker': worker_id})
+
+    while stop_event is None or not stop_event.is_set():
+        if time.time() >= next_requeue:
+            requeue_stale()
+            next_requeue = time.time() + JOBS['heartbeat_interval']
+        if time.time() >= next_prune:
+            prune_finished()
+            next_prune = time.time() + JOBS['prune_interval']
+
+        job = claim_next(worker_id)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Court Data Fetcher job worker')
+    parser.add_argument('--processes', type=int, default=1, help='Worker processes to run')
+    args = parser.parse_args()
+
+    # One pre-fetcher, text extractor and watchlist scheduler per deployment, not one per web worker
+    db.migrate()
+    if CAUSELIST['prefetch_enabled']:
+        start_prefetcher()
+    if JUDGMENT_TEXT['enabled']:
+        judgment_text.start_extractor()
+    if WATCHLIST['enabled']:
+        watchlist.start_scheduler()
+
+    if args.processes <= 1:
+        run_worker()
+        return
+
+    # Supervise the worker processes: one that dies is replaced, and its job is requeued
+    # by the others once its heartbeat goes stale
+    processes = [None] * args.processes
+    while True:
+        for index, process in enumerate(processes):
+            if process is None or not process.is_alive():
+                if process is not None:
+                    logger.warning('job worker exited, restarting', extra={'exitcode': process.exitcode})
+                processes[index] = multiprocessing.Process(target=run_worker)
+                processes[index].start()
+        time.sleep(1)
+
+
+if __name__ == '__main__':
+    main()
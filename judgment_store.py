@@ -0,0 +1,283 @@
+"""
+Content-addressed judgment store for Court Data Fetcher
+Judgments are kept once per SHA-256 under downloads/blobs/ab/cd/<hash><ext>,
+with judgments rows pointing at them and a reference count per blob
+
+Maintenance:  python judgment_store.py gc | adopt | remove <judgment id>
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import uuid
+from datetime import datetime
+from config_file import DOWNLOAD_SETTINGS
+from judgment_stream import JudgmentStream
+import db
+
+
+def blob_path(content_hash, extension=''):
+    """Sharded location of a blob"""
+    return os.path.join(DOWNLOAD_SETTINGS['blob_folder'],
+                        content_hash[:2], content_hash[2:4], content_hash + extension)
+
+
+def find_by_url(url):
+    """Latest stored judgment for a source URL whose blob is still on disk"""
+    row = db.query_one('''SELECT j.id, j.query_id, j.filename, j.content_hash, b.file_path
+                          FROM judgments j
+                          JOIN judgment_blobs b ON b.content_hash = j.content_hash
+                          WHERE j.source_url = ?
+                          ORDER BY j.id DESC LIMIT 1''', (url,))
+    if row is None or not os.path.exists(row['file_path']):
+        return None
+    return row
+
+
+def _stage(download):
+    # Unique name so concurrent downloads never land on the same temp file
+    download.filepath = os.path.join(download.folder, uuid.uuid4().hex + download.extension)
+    return download
+
+
+def open_download(url, query_id):
+    """Start streaming a judgment into the temporary folder"""
+    return _stage(JudgmentStream(url, query_id, folder=DOWNLOAD_SETTINGS['tmp_folder']).open())
+
+
+def accept_download(url, query_id, content_type=None, content_length=None):
+    """
+    Like open_download for a response fetched elsewhere (the asyncio engine):
+    checks its announced type and size; the caller feeds begin()/write()/finish()
+    """
+    download = JudgmentStream(url, query_id, folder=DOWNLOAD_SETTINGS['tmp_folder'])
+    return _stage(download.accept(content_type, content_length))
+
+
+def _insert_judgment(conn, query_id, filename, content_hash, file_path, file_size, url):
+    c = conn.execute('''INSERT INTO judgments
+                        (query_id, filename, file_path, file_size, source_url,
+                         content_hash, download_time)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                     (query_id, filename, file_path, file_size, url,
+                      content_hash, datetime.now()))
+    conn.execute('UPDATE judgment_blobs SET ref_count = ref_count + 1 WHERE content_hash = ?',
+                 (content_hash,))
+    return c.lastrowid
+
+
+def commit_download(download):
+    """
+    Move a finished download into the store and record it; download.filepath
+    then points at the blob. If the same bytes are already stored, the new copy is discarded
+    """
+    content_hash = download.sha256
+    final_path = blob_path(content_hash, download.extension)
+
+    with db.transaction() as conn:
+        existing = conn.execute('SELECT file_path FROM judgment_blobs WHERE content_hash = ?',
+                                (content_hash,)).fetchone()
+
+        stored = existing is not None and os.path.exists(existing['file_path'])
+        if stored:
+            final_path = existing['file_path']
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(download.filepath, final_path)
+
+        try:
+            if not stored:
+                conn.execute('''INSERT INTO judgment_blobs (content_hash, file_path, file_size, created_at)
+                                VALUES (?, ?, ?, ?)
+                                ON CONFLICT(content_hash) DO UPDATE SET file_path = excluded.file_path''',
+                             (content_hash, final_path, download.size, datetime.now()))
+            judgment_id = _insert_judgment(conn, download.query_id, download.filename, content_hash,
+                                           final_path, download.size, download.url)
+        except Exception:
+            # Drop our copy before the rollback releases the write lock, so no
+            # other commit can have stored the same bytes at final_path yet
+            os.remove(download.filepath if stored else final_path)
+            raise
+
+        if stored:
+            os.remove(download.filepath)
+
+    download.filepath = final_path
+    return judgment_id
+
+
+def link_existing(existing, url, query_id):
+    """Record a repeat download of an already stored judgment without fetching it again"""
+    with db.transaction() as conn:
+        size = conn.execute('SELECT file_size FROM judgment_blobs WHERE content_hash = ?',
+                            (existing['content_hash'],)).fetchone()['file_size']
+        return _insert_judgment(conn, query_id, existing['filename'], existing['content_hash'],
+                                existing['file_path'], size, url)
+
+
+def remove_judgment(judgment_id):
+    """Delete a judgments row and release its blob reference"""
+    with db.transaction() as conn:
+        row = conn.execute('SELECT content_hash FROM judgments WHERE id = ?', (judgment_id,)).fetchone()
+        if row is None:
+            return False
+
+        conn.execute('DELETE FROM judgments WHERE id = ?', (judgment_id,))
+        if row['content_hash']:
+            conn.execute('UPDATE judgment_blobs SET ref_count = ref_count - 1 WHERE content_hash = ?',
+                         (row['content_hash'],))
+    return True
+
+
+def _orphan_blobs():
+    """Files under the blob folder that no judgment_blobs row points at"""
+    blob_folder = DOWNLOAD_SETTINGS['blob_folder']
+    if not os.path.isdir(blob_folder):
+        return []
+
+    known = {os.path.normpath(row['file_path'])
+             for row in db.query_all('SELECT file_path FROM judgment_blobs')}
+    orphans = []
+    for root, _, names in os.walk(blob_folder):
+        for name in names:
+            path = os.path.normpath(os.path.join(root, name))
+            if path not in known:
+                orphans.append(path)
+    return orphans
+
+
+def collect_garbage():
+    """
+    Delete unreferenced blobs, blob files without a row (left by a failed
+    commit) and abandoned temporary downloads; returns bytes freed
+    """
+    freed = 0
+
+    rows = db.query_all('''SELECT content_hash, file_path, file_size FROM judgment_blobs
+                           WHERE ref_count <= 0''')
+    for row in rows:
+        with db.transaction() as conn:
+            # Re-check inside the write lock in case the blob was just linked again
+            current = conn.execute('SELECT ref_count FROM judgment_blobs WHERE content_hash = ?',
+                                   (row['content_hash'],)).fetchone()
+            if current is None or current['ref_count'] > 0:
+                continue
+            conn.execute('DELETE FROM judgment_blobs WHERE content_hash = ?', (row['content_hash'],))
+
+            # Unlink before the lock is released: once it is, commit_download may
+            # store the same bytes again at this very path
+            if os.path.exists(row['file_path']):
+                os.remove(row['file_path'])
+                freed += row['file_size'] or 0
+
+    for path in _orphan_blobs():
+        with db.transaction() as conn:
+            # commit_download moves files in under the write lock, so a file
+            # still without a row once we hold it is really orphaned
+            row = conn.execute('SELECT file_path FROM judgment_blobs WHERE content_hash = ?',
+                               (os.path.splitext(os.path.basename(path))[0],)).fetchone()
+            if row is not None and os.path.normpath(row['file_path']) == path:
+                continue
+            if os.path.exists(path):
+                freed += os.path.getsize(path)
+                os.remove(path)
+
+    # Partial (.part) and finished-but-uncommitted downloads
+    tmp_folder = DOWNLOAD_SETTINGS['tmp_folder']
+    if os.path.isdir(tmp_folder):
+        cutoff = datetime.now().timestamp() - 24 * 3600
+        for name in os.listdir(tmp_folder):
+            path = os.path.join(tmp_folder, name)
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                freed += os.path.getsize(path)
+                os.remove(path)
+
+    return freed
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_SETTINGS['chunk_size_kb'] * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def adopt_legacy_files():
+    """Move judgments downloaded before the store existed into it; returns rows updated"""
+    rows = db.query_all('''SELECT id, file_path FROM judgments
+                           WHERE content_hash IS NULL''')
+    adopted = 0
+    moved = {}
+
+    for row in rows:
+        if row['file_path'] in moved:
+            content_hash, final_path, size = moved[row['file_path']]
+            with db.transaction() as conn:
+                conn.execute('''UPDATE judgments SET content_hash = ?, file_path = ?, file_size = ?
+                                WHERE id = ?''', (content_hash, final_path, size, row['id']))
+                conn.execute('UPDATE judgment_blobs SET ref_count = ref_count + 1 WHERE content_hash = ?',
+                             (content_hash,))
+            adopted += 1
+            continue
+
+        if not os.path.exists(row['file_path']):
+            continue
+
+        content_hash = _hash_file(row['file_path'])
+        extension = os.path.splitext(row['file_path'])[1].lower()
+        final_path = blob_path(content_hash, extension)
+        size = os.path.getsize(row['file_path'])
+
+        duplicate = False
+        with db.transaction() as conn:
+            existing = conn.execute('SELECT file_path FROM judgment_blobs WHERE content_hash = ?',
+                                    (content_hash,)).fetchone()
+            if existing:
+                duplicate = True
+                final_path = existing['file_path']
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                shutil.move(row['file_path'], final_path)
+                conn.execute('''INSERT INTO judgment_blobs (content_hash, file_path, file_size, created_at)
+                                VALUES (?, ?, ?, ?)''', (content_hash, final_path, size, datetime.now()))
+
+            conn.execute('''UPDATE judgments SET content_hash = ?, file_path = ?, file_size = ?
+                            WHERE id = ?''', (content_hash, final_path, size, row['id']))
+            conn.execute('UPDATE judgment_blobs SET ref_count = ref_count + 1 WHERE content_hash = ?',
+                         (content_hash,))
+
+        # Only drop the legacy copy once the row points at the stored blob
+        if duplicate:
+            os.remove(row['file_path'])
+        moved[row['file_path']] = (content_hash, final_path, size)
+        adopted += 1
+
+    return adopted
+
+
+def stats():
+    """Blob count, bytes on disk and how many judgments they serve"""
+    row = db.query_one('''SELECT COUNT(*) AS blobs, COALESCE(SUM(file_size), 0) AS bytes,
+                                 COALESCE(SUM(ref_count), 0) AS ref_total
+                          FROM judgment_blobs''')
+    return {'blobs': row['blobs'], 'bytes': row['bytes'], 'references': row['ref_total']}
+
+
+if __name__ == '__main__':
+    db.migrate()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'gc'
+
+    if command == 'gc':
+        print(f"[OK] Freed {collect_garbage()} bytes")
+    elif command == 'adopt':
+        print(f"[OK] Moved {adopt_legacy_files()} judgment(s) into the store")
+    elif command == 'remove' and len(sys.argv) > 2 and sys.argv[2].isdigit():
+        if not remove_judgment(int(sys.argv[2])):
+            print(f"Judgment {sys.argv[2]} not found")
+            sys.exit(1)
+        print(f"[OK] Removed judgment {sys.argv[2]}; run gc to free unreferenced files")
+    else:
+        print("Usage: python judgment_store.py [gc|adopt|remove <judgment id>]")
+        sys.exit(1)
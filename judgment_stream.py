@@ -0,0 +1,233 @@
+"""
+Streaming judgment downloads for Court Data Fetcher
+Copies upstream bytes to disk and to the client in fixed-size chunks,
+enforcing the size and file type limits as the bytes arrive. Only the
+eCourts portal hosts (ECOURTS_URLS) are fetched from, redirects included.
+"""
+
+import os
+import hashlib
+import tempfile
+from datetime import datetime
+from urllib.parse import urljoin, urlparse
+from config_file import DOWNLOAD_SETTINGS, ECOURTS_URLS, SCRAPING
+from utils_module import is_valid_url, sanitize_filename
+
+CONTENT_TYPE_EXTENSIONS = {
+    'application/pdf': '.pdf',
+    'application/msword': '.doc',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
+}
+
+EXTENSION_CONTENT_TYPES = {ext: ctype for ctype, ext in CONTENT_TYPE_EXTENSIONS.items()}
+
+# Leading bytes of each allowed format
+MAGIC_NUMBERS = {
+    b'%PDF': '.pdf',
+    b'\xd0\xcf\x11\xe0': '.doc',
+    b'PK\x03\x04': '.docx',
+}
+
+MAX_REDIRECTS = 5
+
+
+class DownloadRejected(Exception):
+    """Raised when a judgment breaks the size or file type rules"""
+
+
+def check_source(url):
+    """
+    Raise DownloadRejected unless url is on a portal host from ECOURTS_URLS
+    Demo links (not http(s) URLs) are never fetched, so they pass
+    """
+    if not is_valid_url(url):
+        return
+    # Read per call: ECOURTS_URLS can be pointed elsewhere at runtime (bench_pipeline)
+    portals = {urlparse(portal).netloc.lower() for portal in ECOURTS_URLS.values()}
+    if urlparse(url).netloc.lower() not in portals:
+        raise DownloadRejected('Judgments can only be downloaded from the eCourts portals')
+
+
+def sniff_extension(first_chunk):
+    """Guess the real file type from its first bytes; 'html' for error/CAPTCHA pages"""
+    for magic, extension in MAGIC_NUMBERS.items():
+        if first_chunk.startswith(magic):
+            return extension
+
+    head = first_chunk[:512].lstrip().lower()
+    if head.startswith(b'<!doctype html') or head.startswith(b'<html'):
+        return 'html'
+
+    return None
+
+
+class JudgmentStream:
+    """
+    One judgment download
+
+    open() runs the up-front checks (extension, Content-Length) so they can
+    still be reported as an HTTP error; chunks() then yields the body while
+    writing it to `filepath`.
+    """
+
+    def __init__(self, url, query_id, folder=None, session=None):
+        self.url = url
+        self.query_id = query_id
+        self.folder = folder or DOWNLOAD_SETTINGS['folder']
+        self.session = session
+        self.chunk_size = DOWNLOAD_SETTINGS['chunk_size_kb'] * 1024
+        self.max_bytes = DOWNLOAD_SETTINGS['max_file_size_mb'] * 1024 * 1024
+
+        self.extension = None
+        self.content_type = None
+        self.content_length = None
+        self.filename = None
+        self.filepath = None
+        self.size = 0
+        self.sha256 = None
+        self.complete = False
+        self._response = None
+        self._file = None
+        self._partial_path = None
+        self._digest = None
+
+    @property
+    def is_demo(self):
+        return not is_valid_url(self.url)
+
+    def _extension_from_url(self):
+        return os.path.splitext(urlparse(self.url).path)[1].lower()
+
+    def open(self):
+        """Start the download and validate what we can before any bytes are sent"""
+        if self.is_demo:
+            return self.accept()
+
+        if self.session is None:
+            import requests
+            self.session = requests
+
+        # Redirects are followed by hand so each hop gets the same host check
+        url = self.url
+        for _ in range(MAX_REDIRECTS + 1):
+            check_source(url)
+            self._response = self.session.get(
+                url,
+                stream=True,
+                timeout=SCRAPING['timeout'],
+                headers={'User-Agent': SCRAPING['user_agent']},
+                allow_redirects=False
+            )
+            if not self._response.is_redirect:
+                break
+            url = urljoin(url, self._response.headers['Location'])
+            self.close()
+        else:
+            raise DownloadRejected('Too many redirects')
+        self._response.raise_for_status()
+
+        content_type = self._response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        length = self._response.headers.get('Content-Length')
+        try:
+            return self.accept(content_type, int(length) if length and length.isdigit() else None)
+        except DownloadRejected:
+            self.close()
+            raise
+
+    def accept(self, content_type=None, content_length=None):
+        """
+        Check the type and size an upstream response announces and name the file
+        Used by open() and by callers that fetch the response themselves
+        """
+        allowed = DOWNLOAD_SETTINGS['allowed_extensions']
+        extension = self._extension_from_url()
+        if extension not in allowed and content_type:
+            extension = CONTENT_TYPE_EXTENSIONS.get(content_type, extension)
+
+        if content_length is not None:
+            self.content_length = content_length
+            if content_length > self.max_bytes:
+                raise DownloadRejected(f"Judgment exceeds {DOWNLOAD_SETTINGS['max_file_size_mb']} MB limit")
+
+        if extension not in allowed:
+            raise DownloadRejected(f"File type '{extension or 'unknown'}' is not allowed")
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.extension = extension
+        self.content_type = EXTENSION_CONTENT_TYPES.get(extension, 'application/octet-stream')
+        self.filename = sanitize_filename(f"judgment_{self.query_id}_{timestamp}{extension}")
+        self.filepath = os.path.join(self.folder, self.filename)
+        return self
+
+    def _demo_chunks(self):
+        # Placeholder body used until real eCourts downloads are wired up
+        yield (f"DEMO JUDGMENT\n"
+               f"Source: {self.url}\n"
+               f"\nNote: This is a placeholder file for demonstration.\n"
+               f"In production, this would be the actual judgment PDF from eCourts.\n").encode()
+
+    def _upstream_chunks(self):
+        for chunk in self._response.iter_content(chunk_size=self.chunk_size):
+            if chunk:
+                yield chunk
+
+    def begin(self):
+        """Open the partial file that write() appends to"""
+        os.makedirs(self.folder, exist_ok=True)
+        fd, self._partial_path = tempfile.mkstemp(dir=self.folder, suffix='.part')
+        self._file = os.fdopen(fd, 'wb')
+        self._digest = hashlib.sha256()
+
+    def write(self, chunk):
+        """Append one chunk, enforcing the file type (first chunk) and size limits"""
+        if self.size == 0 and not self.is_demo:
+            sniffed = sniff_extension(chunk)
+            if sniffed == 'html':
+                raise DownloadRejected('Portal returned an HTML page instead of a judgment')
+            if sniffed and sniffed not in DOWNLOAD_SETTINGS['allowed_extensions']:
+                raise DownloadRejected(f"File type '{sniffed}' is not allowed")
+
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise DownloadRejected(f"Judgment exceeds {DOWNLOAD_SETTINGS['max_file_size_mb']} MB limit")
+        self._digest.update(chunk)
+        self._file.write(chunk)
+
+    def finish(self):
+        """Move the complete file to `filepath` and record its SHA-256"""
+        self._file.close()
+        os.replace(self._partial_path, self.filepath)
+        self.sha256 = self._digest.hexdigest()
+        self.complete = True
+
+    def discard(self):
+        """Close the upstream response and remove the partial file of an unfinished download"""
+        self.close()
+        if self._file is not None:
+            self._file.close()
+        if not self.complete and self._partial_path and os.path.exists(self._partial_path):
+            os.remove(self._partial_path)
+
+    def chunks(self):
+        """Yield the judgment body chunk by chunk while saving it to disk"""
+        self.begin()
+        source = self._demo_chunks() if self.is_demo else self._upstream_chunks()
+
+        try:
+            for chunk in source:
+                self.write(chunk)
+                yield chunk
+            self.finish()
+        finally:
+            self.discard()
+
+    def save(self):
+        """Download the whole judgment to disk and return its path"""
+        for _ in self.chunks():
+            pass
+        return self.filepath
+
+    def close(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
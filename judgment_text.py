@@ -0,0 +1,234 @@
+"""
+Judgment text extraction for Court Data Fetcher
+Stored PDF judgments are read with pypdf in a process pool, a few pages per
+task so one long judgment spreads across workers. Text is saved page by page
+into judgment_pages (indexed for search by triggers), so an interrupted run
+resumes with the pages that are still missing.
+
+Run once or from cron:  python judgment_text.py extract [--limit N]
+"""
+
+import argparse
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from config_file import JUDGMENT_TEXT
+import db
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+_WHITESPACE = re.compile(r'[ \t\r\f\v]+')
+
+
+def _normalize(text):
+    """Collapse runs of spaces and blank lines left by PDF layout"""
+    lines = (_WHITESPACE.sub(' ', line).strip() for line in (text or '').splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+# The two functions below run in pool processes
+def _page_count(file_path):
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+
+def _extract_pages(file_path, pages):
+    """[(page, text)] for the given 0-based page numbers of a PDF"""
+    from pypdf import PdfReader
+    reader = PdfReader(file_path)
+    return [(page, _normalize(reader.pages[page].extract_text())) for page in pages]
+
+
+def _is_pdf(file_path):
+    """Whether the file has a PDF header; demo placeholders and Word files do not"""
+    with open(file_path, 'rb') as f:
+        return f.read(5) == b'%PDF-'
+
+
+def _chunks(pages, size):
+    for start in range(0, len(pages), size):
+        yield pages[start:start + size]
+
+
+def _pending(limit):
+    return db.query_all('''SELECT t.content_hash, t.page_count, t.attempts, b.file_path
+                           FROM judgment_texts t
+                           JOIN judgment_blobs b ON b.content_hash = t.content_hash
+                           WHERE t.status = ?
+                           ORDER BY t.updated_at LIMIT ?''', (PENDING, limit))
+
+
+def _missing_pages(content_hash, page_count):
+    done = {row['page'] for row in db.query_all('SELECT page FROM judgment_pages WHERE content_hash = ?',
+                                                (content_hash,))}
+    return [page for page in range(page_count) if page not in done]
+
+
+def _set_status(content_hash, status, **fields):
+    columns = ''.join(f', {name} = ?' for name in fields)
+    db.execute(f'UPDATE judgment_texts SET status = ?, updated_at = ?{columns} WHERE content_hash = ?',
+               (status, datetime.now(), *fields.values(), content_hash))
+
+
+def _record_failure(row, error):
+    """Count a failed attempt; the judgment is retried until max_attempts"""
+    attempts = row['attempts'] + 1
+    status = FAILED if attempts >= JUDGMENT_TEXT['max_attempts'] else PENDING
+    _set_status(row['content_hash'], status, attempts=attempts, error=str(error)[:500])
+    logger.warning('judgment text extraction failed', extra={
+        'content_hash': row['content_hash'], 'attempts': attempts, 'error': str(error)})
+
+
+def _save_pages(content_hash, pages):
+    with db.transaction() as conn:
+        conn.executemany('''INSERT OR IGNORE INTO judgment_pages (content_hash, page, text)
+                            VALUES (?, ?, ?)''', [(content_hash, page, text) for page, text in pages])
+
+
+def _new_pool(workers):
+    # spawn, not fork: the caller is usually a threaded worker process
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def extract_pending(limit=None, workers=None, pool=None):
+    """
+    Extract one batch of pending judgments; returns how many were completed
+    Pages of every judgment in the batch are extracted in parallel
+    """
+    rows = _pending(limit or JUDGMENT_TEXT['batch_size'])
+    if not rows:
+        return 0
+
+    own_pool = pool is None
+    pool = pool or _new_pool(workers or JUDGMENT_TEXT['workers'])
+    completed = 0
+
+    try:
+        readable = []
+        for row in rows:
+            try:
+                is_pdf = _is_pdf(row['file_path'])
+            except OSError as e:
+                _record_failure(row, e)
+                continue
+            if is_pdf:
+                readable.append(row)
+            else:
+                # Not an error: there is simply no PDF text to extract
+                _set_status(row['content_hash'], SKIPPED, error='Not a PDF')
+        rows = readable
+
+        counts = {pool.submit(_page_count, row['file_path']): row
+                  for row in rows if row['page_count'] is None}
+        page_counts = {row['content_hash']: row['page_count'] for row in rows}
+        for future in as_completed(counts):
+            row = counts[future]
+            try:
+                page_counts[row['content_hash']] = future.result()
+            except Exception as e:
+                _record_failure(row, e)
+                continue
+            _set_status(row['content_hash'], PENDING, page_count=page_counts[row['content_hash']])
+
+        tasks = {}
+        remaining = {}
+        for row in rows:
+            page_count = page_counts[row['content_hash']]
+            if page_count is None:
+                continue
+            if page_count > JUDGMENT_TEXT['max_pages']:
+                _set_status(row['content_hash'], FAILED, error=f'{page_count} pages exceeds max_pages')
+                continue
+
+            missing = _missing_pages(row['content_hash'], page_count)
+            remaining[row['content_hash']] = 0
+            for pages in _chunks(missing, JUDGMENT_TEXT['pages_per_task']):
+                tasks[pool.submit(_extract_pages, row['file_path'], pages)] = row
+                remaining[row['content_hash']] += 1
+
+        failed = set()
+        for future in as_completed(tasks):
+            row = tasks[future]
+            content_hash = row['content_hash']
+            remaining[content_hash] -= 1
+            try:
+                _save_pages(content_hash, future.result())
+            except Exception as e:
+                # Pages already saved are kept; the next run only asks for the rest
+                if content_hash not in failed:
+                    failed.add(content_hash)
+                    _record_failure(row, e)
+
+        for content_hash, left in remaining.items():
+            if left == 0 and content_hash not in failed:
+                _set_status(content_hash, DONE, error=None)
+                completed += 1
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    return completed
+
+
+def extract_all(limit=None, workers=None):
+    """Extract pending judgments batch by batch, reusing one pool; returns how many were completed"""
+    total = 0
+    with _new_pool(workers or JUDGMENT_TEXT['workers']) as pool:
+        while limit is None or total < limit:
+            batch = JUDGMENT_TEXT['batch_size'] if limit is None else min(JUDGMENT_TEXT['batch_size'], limit - total)
+            total += extract_pending(batch, pool=pool)
+            # Failed judgments stay pending until max_attempts, so this ends
+            if not _pending(1):
+                break
+    return total
+
+
+def _extract_loop():
+    while True:
+        try:
+            extract_all()
+        except Exception as e:
+            logger.warning('judgment text extraction round failed', extra={'error': str(e)})
+        time.sleep(JUDGMENT_TEXT['interval'])
+
+
+def start_extractor():
+    """Run extract_all periodically in a daemon thread"""
+    thread = threading.Thread(target=_extract_loop, daemon=True)
+    thread.start()
+    return thread
+
+
+def stats():
+    """Judgments per extraction status and pages indexed"""
+    counts = {row['status']: row['count'] for row in db.query_all(
+        'SELECT status, COUNT(*) AS count FROM judgment_texts GROUP BY status')}
+    pages = db.query_one('SELECT COUNT(*) FROM judgment_pages')[0]
+    return {'pending': counts.get(PENDING, 0), 'done': counts.get(DONE, 0),
+            'failed': counts.get(FAILED, 0), 'skipped': counts.get(SKIPPED, 0), 'pages': pages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract text from stored judgments')
+    parser.add_argument('command', choices=['extract'])
+    parser.add_argument('--limit', type=int, default=None, help='Stop after this many judgments')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    db.migrate()
+    completed = extract_all(args.limit, args.workers)
+    print(f"[OK] Extracted text from {completed} judgment(s)")
+    print(f"[OK] {stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Structured logging for Court Data Fetcher
+JSON lines with a per-request id. Records go onto a bounded in-memory queue
+and a background thread writes them to the log file and the console, so
+request threads never block on log I/O. DEBUG records are sampled.
+
+Processes only append to the file and never rotate it themselves: rotation
+is left to logrotate, and WatchedFileHandler reopens the file once it moves.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from config_file import LOGGING
+
+request_id = ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def _extras(record):
+    """Fields passed via extra=, in the order they were given"""
+    return {key: value for key, value in vars(record).items()
+            if key not in _RECORD_FIELDS and key not in ('request_id', 'sample_rate')}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+
+        for key, value in _extras(record).items():
+            entry.setdefault(key, value)
+
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Console lines for people, with extra= fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s]: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        extras = ' '.join(f'{key}={value}' for key, value in _extras(record).items())
+        if not extras:
+            return line
+
+        # Keep a traceback below the fields
+        message, _, trace = line.partition('\n')
+        return f'{message} {extras}' + (f'\n{trace}' if trace else '')
+
+
+class ContextFilter(logging.Filter):
+    """Stamp the current request id and sample DEBUG records"""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+
+        if record.levelno <= logging.DEBUG:
+            rate = getattr(record, 'sample_rate', LOGGING['debug_sample_rate'])
+            return rate >= 1 or random.random() < rate
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Format args now, while they still describe the calling thread's state
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        _ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_queue = queue.Queue(maxsize=LOGGING['queue_size'])
+_listener = None
+_listener_pid = None
+_lock = threading.Lock()
+
+
+def _build_handlers():
+    console = logging.StreamHandler()
+    console.setFormatter(JsonFormatter() if LOGGING['console_format'] == 'json' else TextFormatter())
+    if not LOGGING['file']:
+        return [console]
+
+    os.makedirs(os.path.dirname(LOGGING['file']) or '.', exist_ok=True)
+    # Appends only: safe with several writer processes, unlike RotatingFileHandler
+    file_handler = logging.handlers.WatchedFileHandler(LOGGING['file'], encoding='utf-8', delay=True)
+    file_handler.setFormatter(JsonFormatter())
+
+    return [file_handler, console]
+
+
+def _ensure_listener():
+    """Start the writer thread, again in a forked child where it didn't survive"""
+    global _listener, _listener_pid
+
+    if _listener_pid == os.getpid():
+        return
+
+    with _lock:
+        if _listener_pid != os.getpid():
+            _listener = logging.handlers.QueueListener(_queue, *_build_handlers(), respect_handler_level=True)
+            _listener.start()
+            _listener_pid = os.getpid()
+
+
+def _reset_after_fork():
+    """
+    Fresh queue and lock in a forked child (e.g. a preloaded gunicorn worker):
+    the parent's writer thread didn't survive and may have held either
+    """
+    global _queue, _listener, _listener_pid, _lock
+
+    _queue = queue.Queue(maxsize=LOGGING['queue_size'])
+    _listener = None
+    _listener_pid = None
+    _lock = threading.Lock()
+
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            handler.queue = _queue
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _stop_listener():
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+
+
+def setup_logging():
+    """Route the root logger through the queue; safe to call more than once"""
+    root = logging.getLogger()
+    if any(isinstance(handler, DroppingQueueHandler) for handler in root.handlers):
+        return
+
+    handler = DroppingQueueHandler(_queue)
+    handler.addFilter(ContextFilter())
+    root.addHandler(handler)
+    root.setLevel(LOGGING['level'])
+
+    for name in LOGGING.get('quiet_loggers', ()):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _ensure_listener()
+    atexit.register(_stop_listener)
+
+
+def get_logger(name):
+    """Module logger; configures the pipeline on first use"""
+    setup_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,175 @@
+"""
+HTML parser engine for Court Data Fetcher
+lxml-based extraction of case details and cause lists. Selectors from
+config_file.SELECTORS and keyword patterns from PARSER_KEYWORDS are compiled
+once at import; each page is walked in a single pass.
+"""
+
+import hashlib
+import re
+from lxml import etree, html
+from config_file import SELECTORS, PARSER_KEYWORDS, CAUSELIST_COLUMNS, CHANGE_DETECTION
+from tracing import span
+
+# Output field for each PARSER_KEYWORDS entry; more specific labels are
+# matched first so "Petitioner Advocate" is an advocate, not a petitioner
+FIELD_ORDER = [
+    ('advocate', 'advocate'),
+    ('judge', 'judge'),
+    ('filing_date', 'filing_date'),
+    ('next_hearing', 'next_hearing'),
+    ('status', 'case_status'),
+    ('petitioner', 'petitioner'),
+    ('respondent', 'respondent'),
+]
+
+_WHITESPACE = re.compile(r'\s+')
+
+_VOLATILE = re.compile('|'.join(f'(?:{pattern})' for pattern in CHANGE_DETECTION['volatile_patterns']),
+                       re.IGNORECASE | re.DOTALL)
+
+
+def css_to_xpath(selector):
+    """Translate the simple `tag`, `tag.class` and `tag#id` selectors used in SELECTORS"""
+    if selector.startswith('/') or selector.startswith('('):
+        return selector
+
+    match = re.fullmatch(r'([a-zA-Z0-9]*)(?:\.([\w-]+))?(?:#([\w-]+))?', selector.strip())
+    if not match:
+        raise ValueError(f"Unsupported selector: {selector}")
+
+    tag, css_class, element_id = match.groups()
+    xpath = f"//{tag or '*'}"
+    if css_class:
+        xpath += f"[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+    if element_id:
+        xpath += f"[@id='{element_id}']"
+    return xpath
+
+
+def _keyword_pattern(keywords):
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+
+_FIELD_PATTERNS = [(field, _keyword_pattern(PARSER_KEYWORDS[key])) for key, field in FIELD_ORDER]
+_COLUMN_PATTERNS = [(column, _keyword_pattern(keywords)) for column, keywords in CAUSELIST_COLUMNS.items()]
+
+_CASE_TABLES = etree.XPath(' | '.join(
+    css_to_xpath(SELECTORS[court]['result_table']) for court in ('high_court', 'district_court')))
+_CAUSELIST_TABLE = etree.XPath(css_to_xpath(SELECTORS['causelist']['result_table']))
+_JUDGMENT_LINKS = etree.XPath(SELECTORS['high_court']['judgment_links'])
+_ROWS = etree.XPath('.//tr')
+_CELLS = etree.XPath('./th|./td')
+
+
+def _to_tree(page):
+    """Parse str/bytes HTML; also accepts a BeautifulSoup object"""
+    if not isinstance(page, (str, bytes)):
+        page = str(page)
+    if not page.strip():
+        return None
+    return html.document_fromstring(page)
+
+
+def _text(element):
+    return _WHITESPACE.sub(' ', element.text_content()).strip()
+
+
+def _match(patterns, label):
+    label = label.lower()
+    for name, pattern in patterns:
+        if pattern.search(label):
+            return name
+    return None
+
+
+@span('page_fingerprint')
+def page_fingerprint(page):
+    """
+    Hash of a page without its volatile markup and whitespace
+    Pages with the same fingerprint parse to the same details
+    """
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', 'replace')
+    text = _WHITESPACE.sub(' ', _VOLATILE.sub('', str(page))).strip()
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+@span('parse_case')
+def parse_case_details(page):
+    """
+    Extract case details from a result page
+    Returns the same keys as the scraper's mock data, plus judge/advocate when present
+    """
+    details = {
+        'petitioner': '',
+        'respondent': '',
+        'filing_date': '',
+        'next_hearing': '',
+        'case_status': '',
+        'judgments': []
+    }
+
+    tree = _to_tree(page)
+    if tree is None:
+        return details
+
+    tables = _CASE_TABLES(tree) or [tree]
+    for table in tables:
+        for row in _ROWS(table):
+            cells = _CELLS(row)
+            if len(cells) < 2:
+                continue
+
+            field = _match(_FIELD_PATTERNS, _text(cells[0]))
+            if field and not details.get(field):
+                details[field] = _text(cells[1])
+
+    seen = set()
+    for link in _JUDGMENT_LINKS(tree):
+        url = link.get('href')
+        if url and url not in seen:
+            seen.add(url)
+            details['judgments'].append({'text': _text(link) or url, 'url': url})
+
+    return details
+
+
+@span('parse_causelist')
+def parse_causelist(page):
+    """Extract cause list rows as dicts with case_number, parties, court_room and time"""
+    tree = _to_tree(page)
+    if tree is None:
+        return []
+
+    tables = _CAUSELIST_TABLE(tree)
+    if not tables:
+        return []
+
+    columns = list(CAUSELIST_COLUMNS)
+    positions = None
+    cases = []
+
+    for row in _ROWS(tables[0]):
+        cells = _CELLS(row)
+        if not cells:
+            continue
+
+        texts = [_text(cell) for cell in cells]
+
+        # The first row with <th> cells (or matching labels) decides column order
+        if positions is None:
+            header = [_match(_COLUMN_PATTERNS, text) for text in texts]
+            if row.find('th') is not None or sum(1 for name in header if name) >= 2:
+                positions = {name: index for index, name in enumerate(header) if name}
+                continue
+            positions = {name: index for index, name in enumerate(columns)}
+
+        case = {name: texts[index] if index < len(texts) else ''
+                for name, index in positions.items()}
+        if any(case.values()):
+            for name in columns:
+                case.setdefault(name, '')
+            cases.append(case)
+
+    return cases
@@ -0,0 +1,120 @@
+"""
+Adaptive per-host rate limiter for Court Data Fetcher
+A token bucket per court host, stored in the rate_limits table so every
+gunicorn worker and job process draws from the same budget. The refill
+rate adapts AIMD-style: it creeps up while the portal answers quickly and
+halves on HTTP 429/503, CAPTCHA pages or slow responses.
+"""
+
+import asyncio
+import time
+from config_file import RATE_LIMIT
+import db
+from resilience import LocalTimeout, host_of
+from tracing import span
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class RateLimiter:
+    """Shared token buckets; use acquire() before a request and record() after it"""
+
+    def __init__(self, settings=None):
+        self.settings = dict(RATE_LIMIT, **(settings or {}))
+
+    def _load(self, conn, host, now):
+        conn.execute('''INSERT OR IGNORE INTO rate_limits (host, rate, tokens, updated_at)
+                        VALUES (?, ?, ?, ?)''',
+                     (host, self.settings['initial_rate'], self.settings['burst'], now))
+        return conn.execute('SELECT * FROM rate_limits WHERE host = ?', (host,)).fetchone()
+
+    def try_acquire(self, host):
+        """Take a token if one is available; returns seconds to wait (0 when granted)"""
+        now = time.time()
+
+        with db.transaction() as conn:
+            row = self._load(conn, host, now)
+            tokens = min(self.settings['burst'], row['tokens'] + (now - row['updated_at']) * row['rate'])
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / row['rate']
+
+            conn.execute('UPDATE rate_limits SET tokens = ?, updated_at = ? WHERE host = ?',
+                         (tokens, now, host))
+
+        return wait
+
+    @span('rate_limit_wait')
+    def acquire(self, url, timeout=None):
+        """Block until a request to url's host is allowed"""
+        host = host_of(url)
+        deadline = time.time() + (timeout or self.settings['acquire_timeout'])
+
+        while True:
+            wait = self.try_acquire(host)
+            if not wait:
+                return
+            if time.time() + wait > deadline:
+                raise LocalTimeout(f'Rate limit for {host} not available in time')
+            time.sleep(wait)
+
+    async def acquire_async(self, url, timeout=None):
+        """acquire() for coroutines; the SQLite work runs in a thread"""
+        host = host_of(url)
+        deadline = time.time() + (timeout or self.settings['acquire_timeout'])
+
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, host)
+            if not wait:
+                return
+            if time.time() + wait > deadline:
+                raise LocalTimeout(f'Rate limit for {host} not available in time')
+            await asyncio.sleep(wait)
+
+    def record(self, url, latency, status_code=None, captcha=False):
+        """Adapt the host's rate from one response"""
+        host = host_of(url)
+        settings = self.settings
+        throttled = (status_code in THROTTLE_STATUSES or captcha
+                     or latency > settings['slow_latency'])
+        now = time.time()
+
+        with db.transaction() as conn:
+            row = self._load(conn, host, now)
+
+            if not throttled:
+                rate = min(settings['max_rate'], row['rate'] + settings['increase_step'])
+                conn.execute('UPDATE rate_limits SET rate = ?, successes = successes + 1 WHERE host = ?',
+                             (rate, host))
+                return
+
+            # One decrease per interval, so a burst of failures from requests
+            # already in flight doesn't collapse the rate to the floor
+            if row['last_throttle_at'] and now - row['last_throttle_at'] < settings['decrease_interval']:
+                conn.execute('UPDATE rate_limits SET throttles = throttles + 1 WHERE host = ?', (host,))
+                return
+
+            rate = max(settings['min_rate'], row['rate'] * settings['decrease_factor'])
+            conn.execute('''UPDATE rate_limits
+                            SET rate = ?, tokens = 0, updated_at = ?, last_throttle_at = ?,
+                                throttles = throttles + 1
+                            WHERE host = ?''', (rate, now, now, host))
+
+    def rates(self):
+        """Current rate and counters for every host seen"""
+        rows = db.query_all('''SELECT host, rate, tokens, successes, throttles, last_throttle_at
+                               FROM rate_limits ORDER BY host''')
+        return [{
+            'host': row['host'],
+            'rate_per_second': round(row['rate'], 3),
+            'tokens': round(row['tokens'], 2),
+            'successes': row['successes'],
+            'throttles': row['throttles'],
+            'last_throttle_at': row['last_throttle_at'],
+        } for row in rows]
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,130 @@
+"""
+Raw response store for Court Data Fetcher
+Keeps scraped HTML out of the queries table: compressed, de-duplicated by
+SHA-256 in raw_responses, referenced from queries.raw_hash
+
+Move existing rows with:  python raw_store.py migrate [--batch-size N] [--vacuum]
+"""
+
+import argparse
+import hashlib
+import json
+import zlib
+from config_file import RAW_STORE
+import db
+
+CODECS = {
+    'zlib': (lambda data: zlib.compress(data, RAW_STORE['compression_level']), zlib.decompress),
+    'none': (lambda data: data, lambda data: data),
+}
+
+
+def compact_json(value):
+    """JSON without whitespace, for parsed_data"""
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+def put_raw(raw_html):
+    """Store a raw response once and return its hash (None for empty responses)"""
+    if not raw_html:
+        return None
+
+    data = raw_html.encode('utf-8')
+    content_hash = hashlib.sha256(data).hexdigest()
+
+    # Cheap existence check first so repeated pages skip compression entirely
+    if db.query_one('SELECT 1 FROM raw_responses WHERE content_hash = ?', (content_hash,)):
+        return content_hash
+
+    codec = RAW_STORE['codec']
+    compress, _ = CODECS[codec]
+    db.execute('''INSERT OR IGNORE INTO raw_responses (content_hash, codec, raw_size, data)
+                  VALUES (?, ?, ?, ?)''', (content_hash, codec, len(data), compress(data)))
+    return content_hash
+
+
+def get_raw(content_hash):
+    """Raw response text for a hash, or '' if unknown"""
+    if not content_hash:
+        return ''
+
+    row = db.query_one('SELECT codec, data FROM raw_responses WHERE content_hash = ?', (content_hash,))
+    if row is None:
+        return ''
+
+    _, decompress = CODECS[row['codec']]
+    return decompress(row['data']).decode('utf-8')
+
+
+def raw_for_query(row):
+    """Raw response for a queries row, whether migrated or still inline"""
+    if row['raw_hash']:
+        return get_raw(row['raw_hash'])
+    if row['raw_response']:
+        return json.loads(row['raw_response'])
+    return ''
+
+
+def migrate(batch_size=None):
+    """Move inline raw_response values into the store in batches; returns rows migrated"""
+    batch_size = batch_size or RAW_STORE['migrate_batch_size']
+    total = 0
+    last_id = 0
+
+    while True:
+        rows = db.query_all('''SELECT id, raw_response, parsed_data FROM queries
+                               WHERE id > ? AND raw_response IS NOT NULL AND raw_hash IS NULL
+                               ORDER BY id LIMIT ?''', (last_id, batch_size))
+        if not rows:
+            break
+
+        with db.transaction() as conn:
+            for row in rows:
+                try:
+                    raw_html = json.loads(row['raw_response'])
+                except ValueError:
+                    raw_html = row['raw_response']
+
+                parsed_data = row['parsed_data']
+                if parsed_data:
+                    parsed_data = compact_json(json.loads(parsed_data))
+
+                conn.execute('''UPDATE queries SET raw_hash = ?, raw_response = NULL, parsed_data = ?
+                                WHERE id = ?''', (put_raw(raw_html), parsed_data, row['id']))
+
+        total += len(rows)
+        last_id = rows[-1]['id']
+        print(f"  migrated {total} rows")
+
+    return total
+
+
+def stats():
+    """Stored response count with raw and compressed sizes"""
+    row = db.query_one('''SELECT COUNT(*) AS responses,
+                                 COALESCE(SUM(raw_size), 0) AS raw_bytes,
+                                 COALESCE(SUM(LENGTH(data)), 0) AS stored_bytes
+                          FROM raw_responses''')
+    return dict(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Raw response store maintenance')
+    parser.add_argument('command', choices=['migrate', 'stats'])
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--vacuum', action='store_true', help='Reclaim freed pages afterwards')
+    args = parser.parse_args()
+
+    db.migrate()
+
+    if args.command == 'migrate':
+        print(f"[OK] Migrated {migrate(args.batch_size)} rows")
+        if args.vacuum:
+            db.execute('VACUUM')
+            print("[OK] Database vacuumed")
+
+    print(f"[OK] Store: {stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,401 @@
+"""
+Resilience layer for Court Data Fetcher portal requests
+Exponential backoff with full jitter, retries only for transient errors,
+a circuit breaker per court host so a portal that is down fails fast, and
+hedged requests once a call outlives the host's recent p95 latency.
+
+Only the network exchange, marked with `resilience.exchange()`, is timed:
+waits for a rate-limit token, a pooled session or a host semaphore neither
+feed the latency samples nor count towards the hedge delay.
+"""
+
+import asyncio
+import contextvars
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from config_file import RESILIENCE, SCRAPING
+
+TRANSIENT = 'transient'     # Timeouts, connection errors, 5xx and 429: retry with backoff
+CHALLENGE = 'challenge'     # CAPTCHA / browser required: caller decides, never retried here
+PERMANENT = 'permanent'     # 4xx, parse errors, rejected files: retrying won't help
+LOCAL = 'local'             # Our own rate limit or pools ran out of time: says nothing about the portal
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a portal whose circuit is open"""
+
+
+class FallbackRequired(Exception):
+    """Raised when a page can't be fetched without a full browser"""
+
+
+class LocalTimeout(TimeoutError):
+    """
+    Raised when a local wait (rate-limit token, pooled session or browser) times out
+    Not retried and not counted against the portal's circuit
+    """
+
+
+def host_of(url):
+    """Rate limit, breaker and latency key for a URL"""
+    return urlparse(url).netloc or url
+
+
+class _Attempt:
+    """One request of a call: when its network exchange started and how long it took"""
+
+    def __init__(self, started):
+        self.started = started      # threading.Event or asyncio.Event, set when the exchange starts
+        self.started_at = None
+        self.latency = None
+
+
+_attempt = contextvars.ContextVar('resilience_attempt', default=None)
+
+
+# requests and aiohttp are looked up rather than imported: an error can only
+# come from a client library that is already loaded, and importing them here
+# would put both on the startup path of every process
+def _status_of(error):
+    requests = sys.modules.get('requests')
+    aiohttp = sys.modules.get('aiohttp')
+
+    if requests and isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code
+    if aiohttp and isinstance(error, aiohttp.ClientResponseError):
+        return error.status
+    return None
+
+
+def _transient_errors():
+    errors = [asyncio.TimeoutError, TimeoutError, ConnectionError]
+    requests = sys.modules.get('requests')
+    aiohttp = sys.modules.get('aiohttp')
+
+    if requests:
+        errors += [requests.Timeout, requests.ConnectionError]
+    if aiohttp:
+        errors.append(aiohttp.ClientConnectionError)
+    return tuple(errors)
+
+
+def classify(error):
+    """TRANSIENT, CHALLENGE or PERMANENT for an exception raised by a portal call"""
+    if isinstance(error, FallbackRequired):
+        return CHALLENGE
+    if isinstance(error, LocalTimeout):
+        return LOCAL
+
+    status = _status_of(error)
+    if status is not None:
+        return TRANSIENT if status in RETRYABLE_STATUSES else PERMANENT
+
+    if isinstance(error, _transient_errors()):
+        return TRANSIENT
+
+    return PERMANENT
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Full-jitter exponential backoff for a 0-based retry attempt"""
+    base = SCRAPING['retry_delay'] if base is None else base
+    cap = RESILIENCE['max_delay'] if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Per-host closed / open / half-open breaker
+
+    Opens after `failure_threshold` consecutive transient failures, fails
+    fast for `reset_timeout` seconds, then lets a single probe through.
+    """
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or RESILIENCE['failure_threshold']
+        self.reset_timeout = reset_timeout or RESILIENCE['reset_timeout']
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host):
+        return self._hosts.setdefault(host, {'state': 'closed', 'failures': 0,
+                                             'opened_at': None, 'probing': False})
+
+    def before_call(self, host):
+        with self._lock:
+            entry = self._host(host)
+            if entry['state'] == 'closed':
+                return
+
+            if entry['state'] == 'open' and time.time() - entry['opened_at'] >= self.reset_timeout:
+                entry['state'] = 'half_open'
+
+            if entry['state'] == 'half_open' and not entry['probing']:
+                entry['probing'] = True
+                return
+
+            raise CircuitOpen(f'{host} is unavailable, retry in a minute')
+
+    def record_success(self, host):
+        with self._lock:
+            self._hosts[host] = {'state': 'closed', 'failures': 0, 'opened_at': None, 'probing': False}
+
+    def release_probe(self, host):
+        """Let another probe through after one that never reached the portal"""
+        with self._lock:
+            self._host(host)['probing'] = False
+
+    def record_failure(self, host):
+        with self._lock:
+            entry = self._host(host)
+            entry['failures'] += 1
+            entry['probing'] = False
+            if entry['state'] == 'half_open' or entry['failures'] >= self.failure_threshold:
+                entry['state'] = 'open'
+                entry['opened_at'] = time.time()
+
+    def states(self):
+        with self._lock:
+            return {host: {'state': entry['state'], 'failures': entry['failures']}
+                    for host, entry in self._hosts.items()}
+
+
+class LatencyTracker:
+    """Recent successful-call latencies per host"""
+
+    def __init__(self, window=None):
+        self.window = window or RESILIENCE['latency_window']
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def add(self, host, latency):
+        with self._lock:
+            self._samples.setdefault(host, deque(maxlen=self.window)).append(latency)
+
+    def percentile(self, host, percentile=None, min_samples=None):
+        """Latency at the given percentile, or None with too few samples"""
+        percentile = percentile or RESILIENCE['hedge_percentile']
+        min_samples = min_samples or RESILIENCE['hedge_min_samples']
+
+        with self._lock:
+            samples = sorted(self._samples.get(host, ()))
+
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+
+class Resilience:
+    """
+    Wraps portal calls: call(url, func) for blocking code and
+    call_async(url, factory) for coroutines. Only idempotent reads should
+    be hedged.
+    """
+
+    def __init__(self, attempts=None):
+        self.attempts = attempts or SCRAPING['retry_attempts']
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0, 'fast_failures': 0,
+                       'local_timeouts': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _hedge_after(self, host, hedge):
+        if not (hedge and RESILIENCE['hedge_enabled']):
+            return None
+        return self.latency.percentile(host)
+
+    @contextmanager
+    def exchange(self):
+        """
+        Mark the network exchange of the request being made through call()/call_async()
+        Only this part is timed; a no-op outside those calls
+        """
+        attempt = _attempt.get()
+        start = time.time()
+        if attempt is not None:
+            attempt.started_at = start
+            attempt.started.set()
+        try:
+            yield
+        finally:
+            if attempt is not None:
+                attempt.latency = time.time() - start
+
+    def _timed(self, host, func, attempt):
+        token = _attempt.set(attempt)
+        start = time.time()
+        try:
+            result = func()
+        finally:
+            _attempt.reset(token)
+        self.latency.add(host, attempt.latency if attempt.latency is not None else time.time() - start)
+        return result
+
+    @staticmethod
+    def _remaining(attempt, delay):
+        """Hedge delay left, counted from the start of the first request's exchange"""
+        if attempt.started_at is None:
+            return 0
+        return max(0.0, delay - (time.time() - attempt.started_at))
+
+    def _hedged(self, host, func, hedge):
+        delay = self._hedge_after(host, hedge)
+        if delay is None:
+            return self._timed(host, func, _Attempt(threading.Event()))
+
+        # Run in copies of this context so stage timings still reach the request's trace
+        attempt = _Attempt(threading.Event())
+        first = self._executor.submit(contextvars.copy_context().run, self._timed, host, func, attempt)
+        first.add_done_callback(lambda _: attempt.started.set())
+
+        # Local queueing before the exchange doesn't count towards the delay
+        attempt.started.wait()
+        if wait([first], timeout=self._remaining(attempt, delay)).done:
+            return first.result()
+
+        self._count('hedges')
+        second = self._executor.submit(contextvars.copy_context().run, self._timed, host, func,
+                                       _Attempt(threading.Event()))
+        error = None
+        for future in as_completed([first, second]):
+            try:
+                result = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if future is second:
+                self._count('hedge_wins')
+            return result
+        raise error
+
+    def _failed(self, host, error, attempt):
+        """Update the breaker; True if the call should be retried"""
+        kind = classify(error)
+        if kind == LOCAL:
+            # Never reached the portal: no verdict on its health, and a retry would wait again
+            self._count('local_timeouts')
+            self.breaker.release_probe(host)
+            return False
+        if kind != TRANSIENT:
+            # The portal answered, so it is up even if this request failed
+            self.breaker.record_success(host)
+            return False
+
+        self.breaker.record_failure(host)
+        return attempt < self.attempts - 1
+
+    def _before(self, host):
+        try:
+            self.breaker.before_call(host)
+        except CircuitOpen:
+            self._count('fast_failures')
+            raise
+
+    def call(self, url, func, hedge=True):
+        """Run func() against url's portal with retries, breaker and hedging"""
+        host = host_of(url)
+        self._count('calls')
+
+        for attempt in range(self.attempts):
+            self._before(host)
+            try:
+                result = self._hedged(host, func, hedge)
+            except Exception as e:
+                if not self._failed(host, e, attempt):
+                    raise
+                self._count('retries')
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            self.breaker.record_success(host)
+            return result
+
+    async def _timed_async(self, host, factory, attempt):
+        # Runs as its own task, so this only sets the attempt for that task
+        _attempt.set(attempt)
+        start = time.time()
+        result = await factory()
+        self.latency.add(host, attempt.latency if attempt.latency is not None else time.time() - start)
+        return result
+
+    async def _hedged_async(self, host, factory, hedge):
+        delay = self._hedge_after(host, hedge)
+        if delay is None:
+            return await asyncio.ensure_future(self._timed_async(host, factory, _Attempt(asyncio.Event())))
+
+        attempt = _Attempt(asyncio.Event())
+        first = asyncio.ensure_future(self._timed_async(host, factory, attempt))
+        first.add_done_callback(lambda _: attempt.started.set())
+
+        # Waiting for the host semaphore and rate limit doesn't count towards the delay
+        await attempt.started.wait()
+        done, _ = await asyncio.wait({first}, timeout=self._remaining(attempt, delay))
+        if done:
+            return first.result()
+
+        self._count('hedges')
+        second = asyncio.ensure_future(self._timed_async(host, factory, _Attempt(asyncio.Event())))
+        pending = {first, second}
+        error = None
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                for task_left in pending:
+                    task_left.cancel()
+                if task is second:
+                    self._count('hedge_wins')
+                return task.result()
+
+        raise error
+
+    async def call_async(self, url, factory, hedge=True):
+        """call() for coroutines; factory() must return a fresh awaitable each time"""
+        host = host_of(url)
+        self._count('calls')
+
+        for attempt in range(self.attempts):
+            self._before(host)
+            try:
+                result = await self._hedged_async(host, factory, hedge)
+            except Exception as e:
+                if not self._failed(host, e, attempt):
+                    raise
+                self._count('retries')
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            self.breaker.record_success(host)
+            return result
+
+    def stats(self):
+        """Counters, breaker state and hedge threshold per host"""
+        with self._lock:
+            stats = dict(self._stats)
+
+        hosts = self.breaker.states()
+        for host, entry in hosts.items():
+            p95 = self.latency.percentile(host)
+            entry['hedge_after'] = round(p95, 3) if p95 is not None else None
+        stats['hosts'] = hosts
+        return stats
+
+
+resilience = Resilience()
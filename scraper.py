@@ -1,44 +1,76 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
-import requests
-import time
-import os
 from datetime import datetime
 import random
+from config_file import CHANGE_DETECTION, ECOURTS_URLS, SCRAPING, SELECTORS, WAIT_TIMES, PORTAL_ENDPOINTS
+from driver_pool import get_pool
+from resilience import FallbackRequired, resilience
+from tracing import span
+from log_config import get_logger
+from judgment_stream import JudgmentStream
+from parser_engine import page_fingerprint, parse_case_details, parse_causelist
+
+logger = get_logger(__name__)
+
+def _session_pool():
+    """Shared HTTP session pool; imported on first live fetch (requests is slow to import)"""
+    from http_backend import get_session_pool
+    return get_session_pool()
+
 
 class CourtScraper:
     def __init__(self):
         self.driver = None
         self.base_urls = {
-            'high_court': 'https://services.ecourts.gov.in/ecourtindia_v6/',
-            'district_court': 'https://districts.ecourts.gov.in/india-dco-beta/'
+            'high_court': ECOURTS_URLS['high_court_main'],
+            'district_court': ECOURTS_URLS['district_court_main']
         }
     
     def setup_driver(self):
-        """Setup Chrome driver with headless option"""
-        # Only initialize if needed (currently using mock data)
-        pass
+        """Borrow a headless Chrome driver from the shared pool"""
+        if self.driver is None:
+            self.driver = get_pool().acquire()
+        return self.driver
+    
+    def release_driver(self, broken=False):
+        """Return the borrowed driver to the shared pool"""
+        if self.driver is not None:
+            driver, self.driver = self.driver, None
+            get_pool().release(driver, broken=broken)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release_driver(broken=exc_type is not None)
     
-    def fetch_case_details(self, case_type, case_number, year, court_type='high_court', court_name='Delhi'):
+    @span('scrape_case')
+    def fetch_case_details(self, case_type, case_number, year, court_type='high_court', court_name='Delhi',
+                           last_hash=None):
         """
         Fetch case details from eCourts portal
         
-        Note: This is a demonstration implementation using mock data.
-        Real eCourts scraping requires:
+        Note: In the default 'demo' mode this returns mock data. With
+        SCRAPER_MODE=live the portal is queried over pooled HTTP sessions,
+        falling back to a browser when the portal demands one. Real eCourts
+        scraping may still require:
         - CAPTCHA solving
-        - Session management
         - Proxy rotation
         - API access or official authorization
+        
+        last_hash is the page_hash of the stored version; when the page still
+        matches it, the result is {'status': 'success', 'unchanged': True}
+        without parsed_data
         """
         try:
-            print(f"Fetching case: {case_type}/{case_number}/{year} from {court_name} {court_type}")
+            logger.info('fetching case', extra={'case': f'{case_type}/{case_number}/{year}',
+                                                'court_name': court_name, 'court_type': court_type})
+            
+            if SCRAPING['mode'] != 'live':
+                # Generate realistic mock data based on input
+                return self._generate_mock_case_data(case_type, case_number, year, court_name)
             
-            # Generate realistic mock data based on input
-            return self._generate_mock_case_data(case_type, case_number, year, court_name)
+            if court_type == 'district_court':
+                return self._fetch_district_court_case(case_type, case_number, year, court_name, last_hash)
+            return self._fetch_high_court_case(case_type, case_number, year, court_name, last_hash)
             
         except Exception as e:
             return {
@@ -108,72 +140,177 @@ class CourtScraper:
             'raw_html': f'<!-- Mock data for demo purposes - Case {case_type}/{case_number}/{year} -->'
         }
         
-        print(f"✓ Generated mock data for {court_name} case {case_type}/{case_number}/{year}")
-        print(f"  Status: {mock_data['parsed_data']['case_status']}")
-        print(f"  Judgments: {len(judgments)}")
+        logger.debug('generated mock case', extra={'case': f'{case_type}/{case_number}/{year}',
+                                                   'case_status': mock_data['parsed_data']['case_status'],
+                                                   'judgments': len(judgments)})
         
         return mock_data
     
-    def _fetch_high_court_case(self, case_type, case_number, year, court_name):
+    def _fetch_high_court_case(self, case_type, case_number, year, court_name, last_hash=None):
         """Fetch case from High Court portal"""
-        return self._generate_mock_case_data(case_type, case_number, year, court_name)
+        form, submit = self._case_form('high_court', case_type, case_number, year)
+        return self._fetch_case_page('high_court', form, submit, last_hash)
     
-    def _fetch_district_court_case(self, case_type, case_number, year, court_name):
+    def _fetch_district_court_case(self, case_type, case_number, year, court_name, last_hash=None):
         """Fetch case from District Court portal"""
-        return self._generate_mock_case_data(case_type, case_number, year, court_name)
+        form, submit = self._case_form('district_court', case_type, case_number, year)
+        return self._fetch_case_page('district_court', form, submit, last_hash)
+    
+    def _case_form(self, court_type, case_type, case_number, year):
+        """Case status search form fields and submit button id for a portal"""
+        selectors = SELECTORS[court_type]
+        if court_type == 'district_court':
+            form = {
+                selectors['case_type_input']: case_type,
+                selectors['case_number_input']: case_number,
+                selectors['year_input']: year,
+            }
+            return form, selectors['submit_button']
+        
+        form = {
+            selectors['case_type_dropdown']: case_type,
+            selectors['case_number_input']: case_number,
+            selectors['year_input']: year,
+        }
+        return form, selectors['search_button']
+    
+    def _causelist_form(self, court_name, date):
+        """Cause list search form fields and submit button id"""
+        selectors = SELECTORS['causelist']
+        form = {
+            selectors['date_input']: date,
+            selectors['court_dropdown']: court_name,
+        }
+        return form, selectors['search_button']
     
-    def _parse_case_details(self, soup):
-        """Parse case details from HTML"""
+    def _fetch_case_page(self, court_type, form, submit, last_hash=None):
+        """Submit a case status search and parse the result page"""
+        page = self._fetch_page(court_type, 'case_status', form, submit,
+                                SELECTORS[court_type]['result_table'])
+        return self._case_result(page, last_hash)
+    
+    def _case_result(self, page, last_hash=None):
+        """Turn a case status result page into a lookup result"""
+        page_hash = page_fingerprint(page) if CHANGE_DETECTION['enabled'] else None
+        if page_hash is not None and page_hash == last_hash:
+            # Same page as the stored version: nothing to parse or store
+            return {'status': 'success', 'unchanged': True, 'page_hash': page_hash}
+        
+        parsed_data = parse_case_details(page)
+        
+        if not (parsed_data['petitioner'] or parsed_data['case_status']):
+            return {
+                'status': 'error',
+                'message': 'Case not found on the portal',
+                'parsed_data': {}
+            }
+        
         return {
-            'petitioner': '',
-            'respondent': '',
-            'filing_date': '',
-            'next_hearing': '',
-            'case_status': '',
-            'judgments': []
+            'status': 'success',
+            'parsed_data': parsed_data,
+            'raw_html': page,
+            'page_hash': page_hash
         }
     
-    def download_judgment(self, url, query_id):
+    def _fetch_page(self, court_type, endpoint, form, submit, result_selector):
         """
-        Download judgment PDF
+        Fetch a portal result page, over plain HTTP when possible
         
-        Note: In production, this would download actual PDFs from eCourts.
-        For demo, we create a placeholder PDF.
+        One pooled-session POST in the common case, retried and hedged by the
+        resilience layer; a browser render only when the HTTP backend reports
+        the portal needs one.
         """
+        base_url = self.base_urls[court_type]
+        url = base_url + PORTAL_ENDPOINTS[court_type][endpoint]
+        
         try:
-            os.makedirs('downloads', exist_ok=True)
-            
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"judgment_{query_id}_{timestamp}.pdf"
-            filepath = os.path.join('downloads', filename)
+            with span('http_fetch'):
+                return resilience.call(
+                    url, lambda: _session_pool().fetch(url, base_url, method='POST', data=form))
+        except FallbackRequired:
+            logger.warning('HTTP session challenged, falling back to browser', extra={'court_type': court_type})
+        
+        return self._render_page(base_url, form, submit, result_selector)
+    
+    @span('browser_render')
+    def _render_page(self, base_url, form, submit, result_selector):
+        """Fill and submit a portal form in the pooled browser"""
+        # Selenium is only imported once a page actually needs a browser
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import Select, WebDriverWait
+
+        driver = self.setup_driver()
+        try:
+            driver.get(base_url)
+            wait = WebDriverWait(driver, WAIT_TIMES['page_load'])
             
-            # Create a simple text file as placeholder
-            # In production, this would be actual PDF from eCourts
-            with open(filepath, 'w') as f:
-                f.write(f"DEMO JUDGMENT\n")
-                f.write(f"Query ID: {query_id}\n")
-                f.write(f"Downloaded: {datetime.now()}\n")
-                f.write(f"\nNote: This is a placeholder file for demonstration.\n")
-                f.write(f"In production, this would be the actual judgment PDF from eCourts.\n")
+            for name, value in form.items():
+                field = wait.until(EC.presence_of_element_located((By.NAME, name)))
+                if field.tag_name == 'select':
+                    Select(field).select_by_value(str(value))
+                else:
+                    field.clear()
+                    field.send_keys(str(value))
             
-            print(f"✓ Created demo judgment file: {filepath}")
+            driver.find_element(By.ID, submit).click()
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, result_selector)))
+            return driver.page_source
+        except Exception:
+            self.release_driver(broken=True)
+            raise
+        finally:
+            self.release_driver()
+    
+    def _parse_case_details(self, page):
+        """Parse case details from HTML (string, bytes or BeautifulSoup)"""
+        return parse_case_details(page)
+    
+    def open_judgment(self, url, query_id):
+        """
+        Start a streaming judgment download
+        
+        Returns a JudgmentStream whose chunks() yields the file while saving it
+        to downloads/. Raises DownloadRejected if the type or size is not allowed.
+        """
+        return JudgmentStream(url, query_id).open()
+    
+    @span('download_judgment')
+    def download_judgment(self, url, query_id):
+        """
+        Download judgment PDF
+        
+        Note: Relative (demo) URLs produce a placeholder file; absolute URLs
+        are streamed from the portal in chunks.
+        """
+        try:
+            filepath = self.open_judgment(url, query_id).save()
+            logger.info('downloaded judgment', extra={'path': filepath})
             return filepath
             
         except Exception as e:
-            print(f"Download error: {str(e)}")
+            logger.error('judgment download failed', extra={'url': url, 'error': str(e)})
             return None
     
+    @span('scrape_causelist')
     def fetch_causelist(self, court_type, court_name, date):
         """
         Fetch cause list for a specific date
         
-        Note: Generates realistic mock data for demonstration.
+        Note: Generates realistic mock data unless SCRAPER_MODE=live.
         """
         try:
-            print(f"Fetching cause list for {court_name} {court_type} on {date}")
+            logger.info('fetching cause list', extra={'court_name': court_name, 'court_type': court_type,
+                                                      'date': date})
             
-            # Generate realistic mock cause list
-            cases = self._generate_mock_causelist(court_name, date)
+            if SCRAPING['mode'] == 'live':
+                form, submit = self._causelist_form(court_name, date)
+                page = self._fetch_page(court_type, 'causelist', form, submit,
+                                        SELECTORS['causelist']['result_table'])
+                cases = parse_causelist(page)
+            else:
+                # Generate realistic mock cause list
+                cases = self._generate_mock_causelist(court_name, date)
             
             return {
                 'status': 'success',
@@ -223,17 +360,17 @@ class CourtScraper:
         # Sort by time
         cases.sort(key=lambda x: x['time'])
         
-        print(f"✓ Generated {len(cases)} cases for cause list on {date}")
+        logger.debug('generated mock cause list', extra={'date': date, 'cases': len(cases)})
         return cases
     
-    def _parse_causelist(self, soup):
-        """Parse cause list from HTML"""
-        return []
+    def _parse_causelist(self, page):
+        """Parse cause list from HTML (string, bytes or BeautifulSoup)"""
+        return parse_causelist(page)
     
     def __del__(self):
-        """Cleanup: close driver if it exists"""
+        """Cleanup: hand the driver back to the pool if still borrowed"""
         if hasattr(self, 'driver') and self.driver:
             try:
-                self.driver.quit()
+                self.release_driver()
             except:
                 pass
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+Full-text search for Court Data Fetcher
+Ranked lookups over the FTS5 indexes that triggers in db.SCHEMA keep
+current: parties and status of cases and cause lists (case_search,
+causelist_search) and the extracted text of judgments (judgment_search)
+"""
+
+import re
+from config_file import JUDGMENT_TEXT, SEARCH
+import db
+from tracing import span
+
+SOURCES = ('cases', 'causelists')
+
+_WORD = re.compile(r'\w+')
+_TOKEN = re.compile(r'"([^"]*)"|(\w+)')
+
+
+def build_match(text):
+    """
+    FTS5 query for free text: every word or "quoted phrase" must match, and
+    a trailing unquoted word also matches as a prefix
+    Terms are quoted so FTS5 operators in user input are taken literally
+    Raises ValueError when there is nothing to search for
+    """
+    terms = []
+    for phrase, word in _TOKEN.findall(text or ''):
+        words = _WORD.findall(phrase) if phrase else [word]
+        if words:
+            terms.append((' '.join(words), bool(word)))
+    terms = terms[:SEARCH['max_terms']]
+    if not terms:
+        raise ValueError('Search text is required')
+
+    quoted = [f'"{term}"' for term, _ in terms]
+    # The last word may still be being typed; a whole-word match also scores
+    # the exact term, so it ranks above a longer word sharing the prefix.
+    # Prefix queries are served by the 2- and 3-character prefix indexes
+    last, is_word = terms[-1]
+    if is_word and len(last) >= 2:
+        quoted[-1] = f'({quoted[-1]} OR {quoted[-1]}*)'
+    return ' AND '.join(quoted)
+
+
+def _page_args(limit, offset, settings):
+    """Validated (limit, offset) for a search with the given settings"""
+    limit = min(int(limit or settings['default_limit']), settings['max_limit'])
+    offset = int(offset or 0)
+    if limit < 1 or offset < 0:
+        raise ValueError('limit must be positive and offset not negative')
+    if offset > settings['max_offset']:
+        raise ValueError(f"offset can't exceed {settings['max_offset']}; refine the search instead")
+    return limit, offset
+
+
+# bm25 is computed for every row it is asked to rank, and a common word
+# ("pending", "state") matches hundreds of thousands. Only the newest
+# rank_window matches are scored, so rarer queries are still ranked in full.
+def _search_cases(match, count):
+    weights = SEARCH['weights']
+    rows = db.query_all('''SELECT q.id, q.case_type, q.case_number, q.year, q.court_type, q.court_name,
+                                  q.query_time, s.petitioner, s.respondent, s.case_status, s.score
+                           FROM (SELECT * FROM
+                                    (SELECT rowid, petitioner, respondent, case_status,
+                                            bm25(case_search, ?, ?, ?) AS score
+                                     FROM case_search WHERE case_search MATCH ?
+                                     ORDER BY rowid DESC LIMIT ?)
+                                 ORDER BY score LIMIT ?) s
+                           JOIN queries q ON q.id = s.rowid
+                           ORDER BY s.score''',
+                        (weights['petitioner'], weights['respondent'], weights['case_status'], match,
+                         SEARCH['rank_window'], count))
+    return [dict(row, source='case') for row in rows]
+
+
+def _search_causelists(match, count):
+    weights = SEARCH['weights']
+    rows = db.query_all('''SELECT c.id, c.case_number, c.parties, c.court_room, c.time,
+                                  l.court_type, l.court_name, l.causelist_date, s.score
+                           FROM (SELECT * FROM
+                                    (SELECT rowid, bm25(causelist_search, ?, ?) AS score
+                                     FROM causelist_search WHERE causelist_search MATCH ?
+                                     ORDER BY rowid DESC LIMIT ?)
+                                 ORDER BY score LIMIT ?) s
+                           JOIN causelist_cases c ON c.id = s.rowid
+                           JOIN causelists l ON l.id = c.causelist_id
+                           ORDER BY s.score''',
+                        (weights['petitioner'], weights['respondent'], match, SEARCH['rank_window'], count))
+    return [dict(row, source='causelist') for row in rows]
+
+
+@span('search')
+def search(text, source=None, limit=None, offset=None):
+    """
+    One page of matches, best first (lower bm25 score is better)
+    source is 'cases', 'causelists' or None for both
+    Returns {'items': [...], 'next_offset': int or None}
+    """
+    limit, offset = _page_args(limit, offset, SEARCH)
+    if source not in (None, 'all') + SOURCES:
+        raise ValueError(f"source must be one of: all, {', '.join(SOURCES)}")
+
+    match = build_match(text)
+    # Each index returns its own top offset + limit; the page is cut from the merged ranking
+    count = offset + limit + 1
+
+    items = []
+    if source in (None, 'all', 'cases'):
+        items += _search_cases(match, count)
+    if source in (None, 'all', 'causelists'):
+        items += _search_causelists(match, count)
+    items.sort(key=lambda item: item['score'])
+
+    page = items[offset:offset + limit]
+    next_offset = offset + limit if len(items) > offset + limit else None
+    return {'items': page, 'next_offset': next_offset}
+
+
+def _judgment_snippets(match, rowids):
+    open_mark, close_mark = JUDGMENT_TEXT['snippet_marks']
+    placeholders = ','.join('?' * len(rowids))
+    rows = db.query_all(f'''SELECT rowid, snippet(judgment_search, 0, ?, ?, '...', ?) AS snippet
+                            FROM judgment_search
+                            WHERE judgment_search MATCH ? AND rowid IN ({placeholders})''',
+                        (open_mark, close_mark, JUDGMENT_TEXT['snippet_tokens'], match, *rowids))
+    return {row['rowid']: row['snippet'] for row in rows}
+
+
+def _judgment_rows(content_hashes):
+    placeholders = ','.join('?' * len(content_hashes))
+    rows = db.query_all(f'''SELECT j.id, j.content_hash, j.query_id, j.filename, j.download_time,
+                                   q.case_type, q.case_number, q.year, q.court_name
+                            FROM judgments j
+                            LEFT JOIN queries q ON q.id = j.query_id
+                            WHERE j.content_hash IN ({placeholders})
+                            ORDER BY j.id DESC''', content_hashes)
+    judgments = {}
+    for row in rows:
+        entry = dict(row)
+        judgments.setdefault(entry.pop('content_hash'), []).append(entry)
+    return judgments
+
+
+@span('search_judgments')
+def search_judgments(text, limit=None, offset=None):
+    """
+    Judgments whose text matches, best first, one entry per stored file
+    Each entry has its best page (1-based) with a snippet, how many pages
+    matched, and the judgments rows (with their case) that point at the file
+    Returns {'items': [...], 'next_offset': int or None}
+    """
+    limit, offset = _page_args(limit, offset, JUDGMENT_TEXT)
+    match = build_match(text)
+
+    # Pages are ranked like the party indexes (newest rank_window matches);
+    # snippets are only built for the page being returned
+    rows = db.query_all('''SELECT content_hash, page, page_id, score, pages_matched FROM
+                               (SELECT p.content_hash, p.page, s.rowid AS page_id, s.score,
+                                       ROW_NUMBER() OVER (PARTITION BY p.content_hash ORDER BY s.score) AS position,
+                                       COUNT(*) OVER (PARTITION BY p.content_hash) AS pages_matched
+                                FROM (SELECT rowid, bm25(judgment_search) AS score
+                                      FROM judgment_search WHERE judgment_search MATCH ?
+                                      ORDER BY rowid DESC LIMIT ?) s
+                                JOIN judgment_pages p ON p.id = s.rowid)
+                           WHERE position = 1
+                           ORDER BY score LIMIT ? OFFSET ?''',
+                        (match, JUDGMENT_TEXT['rank_window'], limit + 1, offset))
+
+    next_offset = offset + limit if len(rows) > limit else None
+    rows = rows[:limit]
+    if not rows:
+        return {'items': [], 'next_offset': None}
+
+    snippets = _judgment_snippets(match, [row['page_id'] for row in rows])
+    judgments = _judgment_rows([row['content_hash'] for row in rows])
+
+    items = [{
+        'content_hash': row['content_hash'],
+        'page': row['page'] + 1,
+        'pages_matched': row['pages_matched'],
+        'snippet': snippets.get(row['page_id'], ''),
+        'score': row['score'],
+        'judgments': judgments.get(row['content_hash'], []),
+    } for row in rows]
+    return {'items': items, 'next_offset': next_offset}
@@ -4,67 +4,32 @@ Creates necessary directories and initializes database
 """
 
 import os
-import sqlite3
 import sys
+import db
 
 def initialize_database():
     """Initialize SQLite database with required tables"""
     print("\nInitializing database...")
     
     try:
-        conn = sqlite3.connect('court_data.db')
-        c = conn.cursor()
+        # Tables and indexes are defined once in db.SCHEMA; migrate() is a
+        # no-op when the database is already at db.SCHEMA_VERSION
+        db.migrate()
         
-        # Create queries table
-        c.execute('''CREATE TABLE IF NOT EXISTS queries
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      case_type TEXT NOT NULL,
-                      case_number TEXT NOT NULL,
-                      year TEXT NOT NULL,
-                      court_type TEXT NOT NULL,
-                      court_name TEXT NOT NULL,
-                      query_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                      raw_response TEXT,
-                      parsed_data TEXT,
-                      status TEXT NOT NULL,
-                      error_message TEXT)''')
-        
-        # Create judgments table
-        c.execute('''CREATE TABLE IF NOT EXISTS judgments
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      query_id INTEGER NOT NULL,
-                      filename TEXT NOT NULL,
-                      file_path TEXT NOT NULL,
-                      file_size INTEGER,
-                      download_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                      FOREIGN KEY(query_id) REFERENCES queries(id))''')
-        
-        # Create causelists table
-        c.execute('''CREATE TABLE IF NOT EXISTS causelists
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      court_type TEXT NOT NULL,
-                      court_name TEXT NOT NULL,
-                      causelist_date DATE NOT NULL,
-                      fetch_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                      raw_data TEXT,
-                      total_cases INTEGER)''')
-        
-        # Create indexes for better performance
-        c.execute('''CREATE INDEX IF NOT EXISTS idx_queries_case 
-                     ON queries(case_type, case_number, year)''')
-        
-        c.execute('''CREATE INDEX IF NOT EXISTS idx_queries_court 
-                     ON queries(court_type, court_name)''')
-        
-        c.execute('''CREATE INDEX IF NOT EXISTS idx_judgments_query 
-                     ON judgments(query_id)''')
-        
-        conn.commit()
-        conn.close()
+        journal_mode = db.query_one('PRAGMA journal_mode')[0]
+        tables = [row['name'] for row in db.query_all(
+            # Leaves out the FTS5 shadow tables (case_search_data, ...)
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '%search!_%' ESCAPE '!' "
+            "AND name NOT LIKE 'sqlite!_%' ESCAPE '!' ORDER BY name")]
+        indexes = db.query_one("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' "
+                               "AND name NOT LIKE 'sqlite_%'")[0]
+        db.close_connection()
         
         print("[OK] Database initialized successfully")
-        print("[OK] Tables created: queries, judgments, causelists")
-        print("[OK] Indexes created for performance")
+        print(f"[OK] Tables: {', '.join(tables)}")
+        print(f"[OK] Indexes: {indexes}")
+        print(f"[OK] Journal mode: {journal_mode}")
+        print(f"[OK] Schema version: {db.SCHEMA_VERSION}")
         
     except Exception as e:
         print(f"[ERROR] Database initialization failed: {str(e)}")
@@ -0,0 +1,134 @@
+"""
+Request coalescing for Court Data Fetcher
+Concurrent calls for the same key share one execution: threads in a
+process wait on the leader's result, and other workers wait on a row in
+the inflight table, then load what the leader stored. Callers with a
+deadline (web requests) pass max_wait and get StillRunning instead of
+waiting out a slow leader.
+"""
+
+import os
+import socket
+import threading
+import time
+from config_file import SINGLE_FLIGHT
+import db
+
+
+class StillRunning(Exception):
+    """Raised when another caller's run for the key outlasts max_wait"""
+
+
+def _copy(result):
+    # Callers add keys like 'cached' to what they get back
+    return dict(result) if isinstance(result, dict) else result
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    do(key, func, load_shared) runs func at most once at a time per key
+
+    load_shared() is called by followers in other workers once the leader
+    finishes; it should return the stored result, or None if the leader
+    failed (the follower then runs func itself). With max_wait, a caller
+    that would wait longer than that for another run raises StillRunning.
+    """
+
+    def __init__(self, lease=None, poll_interval=None):
+        self.lease = lease or SINGLE_FLIGHT['lease']
+        self.poll_interval = poll_interval or SINGLE_FLIGHT['poll_interval']
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'followers': 0, 'remote_followers': 0, 'timeouts': 0}
+
+    @property
+    def owner(self):
+        # Evaluated per call so forked workers don't share an identity
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _claim(self, key):
+        """Take the cross-worker lock for key; False if another worker holds a live lease"""
+        now = time.time()
+        with db.transaction() as conn:
+            conn.execute('DELETE FROM inflight WHERE key = ? AND started_at < ?', (key, now - self.lease))
+            cursor = conn.execute('INSERT OR IGNORE INTO inflight (key, owner, started_at) VALUES (?, ?, ?)',
+                                  (key, self.owner, now))
+            return cursor.rowcount == 1
+
+    def _release(self, key):
+        db.execute('DELETE FROM inflight WHERE key = ? AND owner = ?', (key, self.owner))
+
+    def _wait_remote(self, key, deadline):
+        """Poll until the other worker releases key, its lease runs out or the deadline passes"""
+        lease_end = time.time() + self.lease
+        while time.time() < lease_end:
+            if db.query_one('SELECT 1 FROM inflight WHERE key = ?', (key,)) is None:
+                return
+            if deadline is not None and time.time() >= deadline:
+                self._count('timeouts')
+                raise StillRunning(key)
+            time.sleep(self.poll_interval)
+
+    def _lead(self, key, func, load_shared, deadline):
+        """Run func for this process, coordinating with other workers"""
+        while not self._claim(key):
+            self._count('remote_followers')
+            self._wait_remote(key, deadline)
+            shared = load_shared() if load_shared else None
+            if shared is not None:
+                return shared
+
+        self._count('leaders')
+        try:
+            return func()
+        finally:
+            self._release(key)
+
+    def do(self, key, func, load_shared=None, max_wait=None):
+        """Return func()'s result, shared with every concurrent caller for key"""
+        deadline = time.time() + max_wait if max_wait is not None else None
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._count('followers')
+            if not call.done.wait(max_wait):
+                self._count('timeouts')
+                raise StillRunning(key)
+            if call.error is not None:
+                raise call.error
+            return _copy(call.result)
+
+        try:
+            call.result = self._lead(key, func, load_shared, deadline)
+            return _copy(call.result)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+
+single_flight = SingleFlight()
@@ -202,6 +202,276 @@ def test_parser():
     
     del scraper
 
+def test_causelist_parser():
+    """Test cause list parser with sample data"""
+    print("\n=== Testing Cause List Parser ===")
+    
+    sample_html = """
+    <table class="causelist-table">
+        <tr><th>Time</th><th>Case No.</th><th>Parties</th><th>Court Room</th></tr>
+        <tr><td>10:00 AM</td><td>WP/123/2024</td><td>Amit Kumar vs State of Delhi</td><td>Court Room 1</td></tr>
+        <tr><td>10:30 AM</td><td>CS/456/2024</td><td>ABC Ltd. vs XYZ Corp.</td><td>Court Room 2</td></tr>
+    </table>
+    """
+    
+    scraper = CourtScraper()
+    cases = scraper._parse_causelist(sample_html)
+    
+    print("Parsed cases:")
+    print(json.dumps(cases, indent=2))
+    
+    assert len(cases) == 2
+    assert cases[0]['case_number'] == 'WP/123/2024'
+    assert cases[1]['time'] == '10:30 AM'
+    
+    del scraper
+
+def test_case_cache():
+    """Test case lookup cache"""
+    print("\n=== Testing Case Cache ===")
+    from case_cache import CaseCache, ttl_for_status, FRESH
+    
+    cache = CaseCache(max_entries=2)
+    result = {'status': 'success', 'parsed_data': {'case_status': 'Disposed'}}
+    
+    cache.put('a', result)
+    cache.put('b', result)
+    cache.put('c', result)
+    
+    cached, state = cache.get('c')
+    print(f"Lookup state: {state}")
+    print(f"Cache stats: {cache.stats()}")
+    
+    assert state == FRESH
+    assert cache.stats()['entries'] == 2
+    assert ttl_for_status('Disposed') > ttl_for_status('Pending')
+    assert ttl_for_status('Not Disposed') == ttl_for_status('Pending')
+    
+    # Callers get their own copy of nested fields
+    cached['parsed_data']['case_status'] = 'Pending'
+    assert cache.get('c')[0]['parsed_data']['case_status'] == 'Disposed'
+
+def test_rate_limiter():
+    """Test adaptive rate limiter"""
+    print("\n=== Testing Rate Limiter ===")
+    import db
+    from rate_limiter import RateLimiter
+    
+    db.init_schema()
+    host = f'test-{datetime.now().timestamp()}.example'
+    limiter = RateLimiter({'initial_rate': 2.0, 'burst': 1})
+    
+    assert limiter.try_acquire(host) == 0
+    assert limiter.try_acquire(host) > 0
+    
+    limiter.record(host, 0.5)
+    limiter.record(host, 0.5, status_code=429)
+    limiter.record(host, 0.5, captcha=True)
+    
+    rate = next(item for item in limiter.rates() if item['host'] == host)
+    print(f"Rate after throttling: {rate}")
+    
+    # One decrease per interval, however many throttled responses arrive
+    assert rate['rate_per_second'] == round((2.0 + 0.05) * 0.5, 3)
+    assert rate['throttles'] == 2
+
+def test_startup():
+    """Test schema migration and lazy scraping imports"""
+    print("\n=== Testing Startup ===")
+    import db
+    import subprocess
+    import sys
+    
+    db.migrate()
+    assert db.schema_is_current()
+    assert db.migrate() is False
+    
+    # Selenium, BeautifulSoup, aiohttp and requests load on first use, not on import
+    code = "import sys, app; print(','.join(m for m in ('selenium', 'bs4', 'aiohttp', 'requests') if m in sys.modules))"
+    loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout.strip()
+    print(f"Heavy modules loaded by import app: {loaded or 'none'}")
+    assert loaded == ''
+
+def test_search():
+    """Test full-text search over stored cases and cause lists"""
+    print("\n=== Testing Search ===")
+    import db
+    from case_service import store_case_result
+    from causelist_store import save_causelist
+    from search import search
+    
+    db.migrate()
+    name = f'Zorawar{int(datetime.now().timestamp() * 1000)}'
+    result = {'status': 'success', 'raw_html': '<html></html>',
+              'parsed_data': {'petitioner': f'{name}  Singh!', 'respondent': 'State of Delhi', 'case_status': 'Pending'}}
+    
+    # A second lookup of the same case replaces the first in the index
+    store_case_result('CS', '1', '2024', 'high_court', 'Delhi', result, f'search-{name}')
+    query_id = store_case_result('CS', '1', '2024', 'high_court', 'Delhi', result, f'search-{name}')
+    save_causelist('high_court', 'Delhi', '2024-10-02',
+                   {'cases': [{'case_number': 'WP/1/2024', 'parties': f'{name} vs Union of India'}]})
+    
+    items = search(name.lower())['items']
+    print(f"Matches: {[(item['source'], item['id']) for item in items]}")
+    
+    cases = [item for item in items if item['source'] == 'case']
+    assert [item['id'] for item in cases] == [query_id]
+    assert cases[0]['petitioner'] == f'{name} Singh'
+    assert any(item['source'] == 'causelist' and item['parties'].startswith(name) for item in items)
+
+def _text_pdf(path, pages):
+    """Write a minimal PDF with one line of text per page"""
+    kids = ' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages)))
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>',
+               f'<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>',
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    for i, text in enumerate(pages):
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>')
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+    
+    data = '%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f'{number} 0 obj\n{body}\nendobj\n'
+    xref = len(data)
+    data += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'
+    data += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets)
+    data += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'
+    with open(path, 'w') as f:
+        f.write(data)
+    
+def test_judgment_text():
+    """Test text extraction from stored judgments and searching it"""
+    print("\n=== Testing Judgment Text Search ===")
+    import os
+    import db
+    import judgment_text
+    from search import search_judgments
+    
+    db.migrate()
+    marker = f'Quixotic{int(datetime.now().timestamp() * 1000)}'
+    content_hash = marker.lower().ljust(64, '0')
+    os.makedirs('downloads', exist_ok=True)
+    path = os.path.join('downloads', f'{marker}.pdf')
+    _text_pdf(path, ['Order sheet', f'The doctrine of res judicata applies here {marker}'])
+    
+    # Storing the blob queues it for extraction
+    db.execute('''INSERT INTO judgment_blobs (content_hash, file_path, file_size, created_at)
+                  VALUES (?, ?, ?, ?)''', (content_hash, path, os.path.getsize(path), datetime.now()))
+    judgment_text.extract_all(workers=1)
+    
+    items = search_judgments(f'"res judicata" {marker.lower()[:-2]}')['items']
+    print(f"Matches: {[(item['content_hash'][:12], item['page'], item['snippet']) for item in items]}")
+    assert [item['content_hash'] for item in items] == [content_hash]
+    assert items[0]['page'] == 2 and '[res judicata]' in items[0]['snippet']
+    assert search_judgments(f'"judicata res" {marker}')['items'] == []
+    
+    # A demo placeholder is skipped, not counted as a failed extraction
+    placeholder_hash = content_hash[::-1]
+    placeholder = os.path.join('downloads', f'{marker}-demo.pdf')
+    with open(placeholder, 'w') as f:
+        f.write('DEMO JUDGMENT\nSource: demo\n')
+    db.execute('''INSERT INTO judgment_blobs (content_hash, file_path, file_size, created_at)
+                  VALUES (?, ?, ?, ?)''', (placeholder_hash, placeholder, os.path.getsize(placeholder), datetime.now()))
+    failed = judgment_text.stats()['failed']
+    judgment_text.extract_all(workers=1)
+    status = db.query_one('SELECT status FROM judgment_texts WHERE content_hash = ?', (placeholder_hash,))
+    assert status['status'] == judgment_text.SKIPPED
+    assert judgment_text.stats()['failed'] == failed
+    
+    # Dropping the blob drops its text from the index
+    db.execute('DELETE FROM judgment_blobs WHERE content_hash IN (?, ?)', (content_hash, placeholder_hash))
+    os.remove(path)
+    os.remove(placeholder)
+    assert search_judgments(marker)['items'] == []
+
+def test_watchlist():
+    """Test field-level change detection for watched cases"""
+    print("\n=== Testing Watchlist ===")
+    import db
+    import watchlist
+    
+    db.migrate()
+    case_number = str(int(datetime.now().timestamp() * 1000))
+    watch_id = watchlist.watch([['WP', case_number, '2024', 'Delhi']])['ids'][0]
+    details = {'petitioner': 'Amit Kumar', 'respondent': 'State', 'case_status': 'Pending',
+               'next_hearing': '15/03/2024', 'judgments': []}
+    
+    def refresh(parsed_data):
+        row = db.query_one('SELECT * FROM watchlist WHERE id = ?', (watch_id,))
+        with db.transaction() as conn:
+            return watchlist.apply_result(conn, row, {'status': 'success', 'parsed_data': parsed_data})
+    
+    outcomes = [refresh(details),
+                refresh(dict(details, petitioner='Amit  Kumar ')),
+                refresh(dict(details, case_status='Disposed', judgments=[{'text': 'Order', 'url': '/o.pdf'}]))]
+    print(f"Outcomes: {outcomes}")
+    assert outcomes == ['baseline', 'unchanged', 'changed']
+    
+    changes = watchlist.changes_since('2000-01-01', watch_id=watch_id)['items']
+    print(f"Changes: {[(c['field'], c['previous'], c['value']) for c in changes]}")
+    assert [(c['field'], c['previous']) for c in changes] == [('case_status', 'Pending'), ('judgments', [])]
+    
+    watched = db.query_one('SELECT next_hearing, next_check FROM watchlist WHERE id = ?', (watch_id,))
+    assert watched['next_hearing'] == '2024-03-15'
+    assert watchlist.unwatch(watch_id)
+
+def test_unchanged_page():
+    """Test that a re-fetched page matching the stored version is not parsed again"""
+    print("\n=== Testing Unchanged Page Detection ===")
+    page = ('<html><body><input type="hidden" name="csrf_token" value="{token}">'
+            '<table class="case-details"><tr><td>Petitioner Name</td><td>{name}</td></tr>'
+            '<tr><td>Case Status</td><td>Pending</td></tr></table></body></html>')
+    
+    scraper = CourtScraper()
+    first = scraper._case_result(page.format(token='a1', name='John Doe'))
+    again = scraper._case_result(page.format(token='b2', name='John  Doe'), first['page_hash'])
+    changed = scraper._case_result(page.format(token='c3', name='Jane Doe'), first['page_hash'])
+    print(f"Again: {again}")
+    
+    assert first['parsed_data']['petitioner'] == 'John Doe'
+    assert again == {'status': 'success', 'unchanged': True, 'page_hash': first['page_hash']}
+    assert not changed.get('unchanged') and changed['parsed_data']['petitioner'] == 'Jane Doe'
+    
+    # Same fields under new markup (a timestamp): the stored version keeps them and takes the new fingerprint
+    from case_service import matches_stored
+    stamped = scraper._case_result(page.format(token='d4', name='John Doe') + '<!-- 10:42 -->'
+                                   '<p>Updated 10:42</p>', first['page_hash'])
+    version = {'parsed_data': json.dumps(first['parsed_data'])}
+    assert stamped['page_hash'] != first['page_hash']
+    assert matches_stored(stamped, version)
+    assert not matches_stored(changed, version)
+
+def test_case_import():
+    """Test streaming validation and de-duplication of a CSV case list"""
+    print("\n=== Testing Case Import ===")
+    import io
+    from case_import import import_cases
+    
+    rows = ("Case Type,Case No.,Year,Court\n"
+            "wp,123,2023,Delhi\n"
+            "WP,,2023,Delhi\n"
+            "WP,124,1900,Delhi\n"
+            "\n"
+            "WP,123,2023,delhi\n"
+            "CRL,5/2,2024,Mumbai\n")
+    lines = list(import_cases(io.BytesIO(rows.encode()), 'cases.csv', mode='validate'))
+    print(f"Lines: {lines}")
+    
+    assert [(line['line'], line['message']) for line in lines if 'line' in line] == [
+        (3, 'Case number is required'), (4, 'Year must be between 1950 and ' + str(datetime.now().year + 1))]
+    summary = lines[-1]
+    assert (summary['rows'], summary['valid'], summary['duplicates'], summary['invalid']) == (5, 2, 1, 2)
+    
+    try:
+        next(import_cases(io.BytesIO(b"Type,Number\nWP,1\n"), 'cases.csv', mode='validate'))
+        assert False, 'missing year column accepted'
+    except ValueError as e:
+        assert 'year' in str(e)
+
 def run_all_tests():
     """Run all tests"""
     print("=" * 60)
@@ -211,6 +481,15 @@ def run_all_tests():
     tests = [
         ("Database Operations", test_database_operations),
         ("HTML Parser", test_parser),
+        ("Cause List Parser", test_causelist_parser),
+        ("Case Cache", test_case_cache),
+        ("Rate Limiter", test_rate_limiter),
+        ("Startup", test_startup),
+        ("Search", test_search),
+        ("Judgment Text Search", test_judgment_text),
+        ("Watchlist", test_watchlist),
+        ("Unchanged Page Detection", test_unchanged_page),
+        ("Case Import", test_case_import),
         # Uncomment these when you have actual case numbers to test
         # ("High Court Search", test_high_court_search),
         # ("District Court Search", test_district_court_search),
@@ -0,0 +1,26 @@
+"""
+Shared fixtures for the focused module tests
+Each test gets its own empty SQLite database and working directory, so
+downloads and other relative paths never touch the project tree
+"""
+
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import db
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """Migrated, empty database in tmp_path, which is also the working directory"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DATABASE_PATH', str(tmp_path / 'court_data.db'))
+    db.close_connection()
+    db.migrate()
+    yield tmp_path
+    db.close_connection()
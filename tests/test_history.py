@@ -0,0 +1,101 @@
+"""Tests for history.py: cursor encoding, page edges and invalid cursors"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+import pytest
+from config_file import HISTORY
+import db
+from history import decode_cursor, encode_cursor, list_history
+
+START = datetime(2024, 3, 1, 9, 0, 0)
+
+
+@pytest.fixture
+def rows(fresh_db):
+    """Seven lookups; ids 3-4 and 5-6 share a query_time to exercise the id tie-break"""
+    offsets = [0, 1, 2, 2, 3, 3, 4]
+    ids = []
+    for index, minutes in enumerate(offsets):
+        c = db.execute('''INSERT INTO queries (case_type, case_number, year, court_type, court_name,
+                                               query_time, status)
+                          VALUES (?, ?, '2024', 'high_court', ?, ?, 'success')''',
+                       ('CS' if index % 2 else 'WP', str(index), 'Delhi' if index < 5 else 'Bombay',
+                        START + timedelta(minutes=minutes)))
+        ids.append(c.lastrowid)
+    return ids
+
+
+def _walk(filters=None, limit=2):
+    pages = []
+    cursor = None
+    while True:
+        page = list_history(filters, cursor, limit)
+        pages.append([item['id'] for item in page['items']])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('2024-03-01 09:00:00', 42)
+    assert decode_cursor(cursor) == ('2024-03-01 09:00:00', 42)
+    # Safe to put in a query string as is
+    assert set(cursor) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor',
+    base64.urlsafe_b64encode(b'{not json').decode(),
+    base64.urlsafe_b64encode(json.dumps(['2024-03-01']).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(['2024-03-01', 'x']).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(42).encode()).decode(),
+])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_row_once_newest_first(rows):
+    pages = _walk(limit=2)
+
+    assert pages == [[rows[6], rows[5]], [rows[4], rows[3]], [rows[2], rows[1]], [rows[0]]]
+
+
+def test_last_full_page_has_no_cursor(rows):
+    first = list_history(limit=4)
+    second = list_history(cursor=first['next_cursor'], limit=4)
+
+    assert len(second['items']) == 3
+    assert second['next_cursor'] is None
+    assert list_history(limit=7)['next_cursor'] is None
+
+
+def test_cursor_keeps_filters(rows):
+    pages = _walk({'court_name': 'Delhi'}, limit=2)
+
+    assert pages == [[rows[4], rows[3]], [rows[2], rows[1]], [rows[0]]]
+
+
+def test_date_range_includes_the_whole_last_day(rows):
+    page = list_history({'date_from': '2024-03-01', 'date_to': '2024-03-01'})
+    assert len(page['items']) == 7
+    assert list_history({'date_from': '2024-03-02'})['items'] == []
+
+
+def test_limit_is_capped_and_must_be_positive(rows, monkeypatch):
+    monkeypatch.setitem(HISTORY, 'max_limit', 3)
+    assert len(list_history(limit=100)['items']) == 3
+
+    # Query-string values arrive as text
+    for limit in ('0', '-1'):
+        with pytest.raises(ValueError):
+            list_history(limit=limit)
+
+
+def test_history_route_rejects_bad_cursor(rows):
+    from app import app
+
+    response = app.test_client().get('/api/history?cursor=bogus')
+    assert response.status_code == 400
+    assert response.json['error'] == 'Invalid cursor'
@@ -0,0 +1,129 @@
+"""Tests for jobs.py: claiming, stale-job recovery, outcomes and retention"""
+
+from datetime import datetime, timedelta
+import pytest
+from config_file import JOBS
+import db
+import jobs
+
+LONG_AGO = datetime.now() - timedelta(hours=1)
+
+
+@pytest.fixture
+def queue(fresh_db, monkeypatch):
+    monkeypatch.setitem(JOBS, 'max_attempts', 2)
+    return jobs
+
+
+def _set(job_id, **columns):
+    assignments = ', '.join(f'{name} = ?' for name in columns)
+    db.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*columns.values(), job_id))
+
+
+def test_claim_takes_oldest_queued_job(queue):
+    assert queue.claim_next('w1') is None
+
+    first = queue.enqueue('fetch_case', {'case_number': '1'})
+    queue.enqueue('fetch_case', {'case_number': '2'})
+
+    job = queue.claim_next('w1')
+    assert job == {'id': first, 'job_type': 'fetch_case', 'payload': {'case_number': '1'}, 'worker': 'w1'}
+
+    stored = queue.get_job(first)
+    assert stored['status'] == jobs.RUNNING
+    assert stored['attempts'] == 1
+    assert queue.claim_next('w2')['payload'] == {'case_number': '2'}
+    assert queue.claim_next('w3') is None
+
+
+def test_enqueue_rejects_unknown_type(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue('mine_bitcoin', {})
+
+
+def test_requeue_uses_heartbeat_not_start_time(queue):
+    alive = queue.enqueue('fetch_case', {})
+    dead = queue.enqueue('fetch_case', {})
+    queue.claim_next('w1')
+    queue.claim_next('w2')
+    # Both started long ago; only the dead worker stopped beating
+    _set(alive, started_at=LONG_AGO, heartbeat=datetime.now())
+    _set(dead, started_at=LONG_AGO, heartbeat=LONG_AGO)
+
+    assert queue.requeue_stale() == 1
+    assert queue.get_job(alive)['status'] == jobs.RUNNING
+    assert queue.get_job(dead)['status'] == jobs.QUEUED
+
+
+def test_requeue_fails_jobs_out_of_attempts(queue):
+    job_id = queue.enqueue('fetch_case', {})
+    for worker in ('w1', 'w2'):
+        queue.claim_next(worker)
+        _set(job_id, heartbeat=LONG_AGO)
+        queue.requeue_stale()
+
+    job = queue.get_job(job_id)
+    assert job['status'] == jobs.FAILED
+    assert job['attempts'] == 2
+    assert job['error'] == 'Worker stopped responding'
+
+
+def test_run_job_stores_result_without_page(queue, monkeypatch):
+    monkeypatch.setattr(jobs, 'lookup_case', lambda **payload: {
+        'status': 'success', 'parsed_data': {'status': 'Pending'}, 'query_id': 7,
+        'raw_html': '<html>...</html>', 'page_hash': 'abc'})
+    job_id = queue.enqueue('fetch_case', {'case_type': 'CS'})
+
+    queue.run_job(queue.claim_next('w1'))
+
+    job = queue.get_job(job_id)
+    assert job['status'] == jobs.DONE
+    assert job['result'] == {'status': 'success', 'parsed_data': {'status': 'Pending'}, 'query_id': 7}
+
+
+def test_run_job_retries_then_fails(queue, monkeypatch):
+    def boom(payload):
+        raise RuntimeError('portal down')
+    monkeypatch.setitem(jobs.HANDLERS, 'fetch_case', boom)
+    job_id = queue.enqueue('fetch_case', {})
+
+    queue.run_job(queue.claim_next('w1'))
+    assert queue.get_job(job_id)['status'] == jobs.QUEUED
+
+    queue.run_job(queue.claim_next('w1'))
+    job = queue.get_job(job_id)
+    assert job['status'] == jobs.FAILED
+    assert job['error'] == 'portal down'
+
+
+def test_requeued_job_keeps_its_next_runs_outcome(queue, monkeypatch):
+    monkeypatch.setitem(jobs.HANDLERS, 'fetch_case', lambda payload: {'run': 'old'})
+    job_id = queue.enqueue('fetch_case', {})
+    stale = queue.claim_next('w1')
+
+    # w1 looked dead, so the job was requeued and picked up by w2
+    _set(job_id, heartbeat=LONG_AGO)
+    queue.requeue_stale()
+    queue.claim_next('w2')
+
+    queue.run_job(stale)
+    job = queue.get_job(job_id)
+    assert job['status'] == jobs.RUNNING
+    assert job['result'] is None
+
+
+def test_prune_keeps_recent_and_unfinished_jobs(queue):
+    old_done = queue.enqueue('fetch_case', {})
+    old_failed = queue.enqueue('fetch_case', {})
+    recent = queue.enqueue('fetch_case', {})
+    waiting = queue.enqueue('fetch_case', {})
+    month_ago = datetime.now() - timedelta(days=30)
+    _set(old_done, status=jobs.DONE, finished_at=month_ago)
+    _set(old_failed, status=jobs.FAILED, finished_at=month_ago)
+    _set(recent, status=jobs.DONE, finished_at=datetime.now())
+
+    assert queue.prune_finished() == 2
+    assert queue.get_job(old_done) is None
+    assert queue.get_job(old_failed) is None
+    assert queue.get_job(recent)['status'] == jobs.DONE
+    assert queue.get_job(waiting)['status'] == jobs.QUEUED
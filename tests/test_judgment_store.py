@@ -0,0 +1,122 @@
+"""Tests for judgment_store.py: de-duplication, reference counts and garbage collection"""
+
+import os
+import sqlite3
+import time
+import pytest
+import db
+import judgment_store
+
+PDF = b'%PDF-1.4 judgment body'
+
+
+@pytest.fixture
+def query_id(fresh_db):
+    c = db.execute('''INSERT INTO queries (case_type, case_number, year, court_type, court_name, status)
+                      VALUES ('CS', '1', '2024', 'high_court', 'Delhi', 'success')''')
+    return c.lastrowid
+
+
+def _download(query_id, body=PDF, url='https://portal.example/orders/1.pdf'):
+    """A finished download in the temp folder, as the routes produce it"""
+    download = judgment_store.accept_download(url, query_id, 'application/pdf', len(body))
+    download.begin()
+    download.write(body)
+    download.finish()
+    return download
+
+
+def _files(folder='downloads'):
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(folder) for name in names)
+
+
+def _blob(content_hash):
+    return db.query_one('SELECT ref_count, file_path FROM judgment_blobs WHERE content_hash = ?',
+                        (content_hash,))
+
+
+def test_same_bytes_are_stored_once(query_id):
+    first = _download(query_id)
+    judgment_store.commit_download(first)
+    second = _download(query_id, url='https://portal.example/orders/2.pdf')
+    judgment_store.commit_download(second)
+
+    assert first.filepath == second.filepath
+    assert _files() == [os.path.normpath(first.filepath)]
+    assert _blob(first.sha256)['ref_count'] == 2
+    assert judgment_store.stats() == {'blobs': 1, 'bytes': len(PDF), 'references': 2}
+
+
+def test_link_existing_adds_a_reference(query_id):
+    download = _download(query_id)
+    judgment_store.commit_download(download)
+
+    existing = judgment_store.find_by_url(download.url)
+    judgment_id = judgment_store.link_existing(existing, download.url, query_id)
+
+    assert judgment_id != existing['id']
+    assert _blob(download.sha256)['ref_count'] == 2
+
+
+def test_remove_then_gc_frees_the_file(query_id):
+    download = _download(query_id)
+    judgment_id = judgment_store.commit_download(download)
+
+    assert judgment_store.remove_judgment(judgment_id)
+    assert not judgment_store.remove_judgment(judgment_id)
+    assert os.path.exists(download.filepath)
+
+    assert judgment_store.collect_garbage() == len(PDF)
+    assert not os.path.exists(download.filepath)
+    assert _blob(download.sha256) is None
+
+
+def test_gc_leaves_shared_blobs_alone(query_id):
+    first = judgment_store.commit_download(_download(query_id))
+    download = _download(query_id, url='https://portal.example/orders/2.pdf')
+    judgment_store.commit_download(download)
+
+    judgment_store.remove_judgment(first)
+    assert judgment_store.collect_garbage() == 0
+
+    assert os.path.exists(download.filepath)
+    assert _blob(download.sha256)['ref_count'] == 1
+
+
+def test_failed_commit_leaves_no_file(query_id):
+    download = _download(None)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        judgment_store.commit_download(download)
+
+    assert _files() == []
+    assert judgment_store.stats()['blobs'] == 0
+
+
+def test_failed_commit_of_stored_bytes_keeps_the_blob(query_id):
+    stored = _download(query_id)
+    judgment_store.commit_download(stored)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        judgment_store.commit_download(_download(None))
+
+    assert _files() == [os.path.normpath(stored.filepath)]
+    assert _blob(stored.sha256)['ref_count'] == 1
+
+
+def test_gc_removes_orphaned_blob_and_stale_temp_files(query_id):
+    download = _download(query_id)
+    judgment_store.commit_download(download)
+
+    orphan = judgment_store.blob_path('f' * 64, '.pdf')
+    os.makedirs(os.path.dirname(orphan))
+    with open(orphan, 'wb') as f:
+        f.write(b'orphan')
+
+    stale = _download(query_id).filepath
+    day_ago = time.time() - 25 * 3600
+    os.utime(stale, (day_ago, day_ago))
+    fresh = _download(query_id).filepath
+
+    assert judgment_store.collect_garbage() == len(b'orphan') + len(PDF)
+    assert _files() == sorted([os.path.normpath(download.filepath), os.path.normpath(fresh)])
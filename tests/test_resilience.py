@@ -0,0 +1,183 @@
+"""Tests for resilience.py: error classes, the circuit breaker, retries and hedging"""
+
+import asyncio
+import threading
+import time
+import pytest
+import requests
+import resilience
+from resilience import CircuitBreaker, CircuitOpen, LocalTimeout, Resilience
+
+URL = 'https://portal.example/case'
+HOST = 'portal.example'
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, 'backoff_delay', lambda attempt: 0)
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f'{status} error', response=response)
+
+
+def _failing(error, calls):
+    def func():
+        calls.append(1)
+        raise error
+    return func
+
+
+def test_circuit_opens_at_threshold_and_half_opens_after_reset():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.1)
+
+    for _ in range(2):
+        breaker.record_failure(HOST)
+    breaker.before_call(HOST)
+
+    breaker.record_failure(HOST)
+    assert breaker.states()[HOST]['state'] == 'open'
+    with pytest.raises(CircuitOpen):
+        breaker.before_call(HOST)
+
+    time.sleep(0.15)
+    breaker.before_call(HOST)
+    assert breaker.states()[HOST]['state'] == 'half_open'
+    # Only one probe at a time
+    with pytest.raises(CircuitOpen):
+        breaker.before_call(HOST)
+
+    breaker.record_success(HOST)
+    assert breaker.states()[HOST] == {'state': 'closed', 'failures': 0}
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure(HOST)
+    time.sleep(0.06)
+    breaker.before_call(HOST)
+
+    breaker.record_failure(HOST)
+    assert breaker.states()[HOST]['state'] == 'open'
+
+
+def test_local_timeout_releases_probe_without_opening_circuit():
+    guard = Resilience(attempts=3)
+    guard.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    guard.breaker.record_failure(HOST)
+    time.sleep(0.06)
+
+    calls = []
+    with pytest.raises(LocalTimeout):
+        guard.call(URL, _failing(LocalTimeout('no token'), calls), hedge=False)
+
+    assert calls == [1]
+    assert guard.stats()['retries'] == 0
+    assert guard.stats()['local_timeouts'] == 1
+    assert guard.breaker.states()[HOST]['state'] == 'half_open'
+    # The probe slot is free again, so the next call reaches the portal and closes the circuit
+    assert guard.call(URL, lambda: 'ok', hedge=False) == 'ok'
+    assert guard.breaker.states()[HOST]['state'] == 'closed'
+
+
+def test_local_timeouts_never_open_the_circuit():
+    guard = Resilience(attempts=2)
+    guard.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    for _ in range(5):
+        with pytest.raises(LocalTimeout):
+            guard.call(URL, _failing(LocalTimeout('pool empty'), []), hedge=False)
+
+    assert guard.breaker.states()[HOST] == {'state': 'closed', 'failures': 0}
+
+
+@pytest.mark.parametrize('status', [400, 403, 404])
+def test_client_errors_are_not_retried(status):
+    guard = Resilience(attempts=3)
+    calls = []
+
+    with pytest.raises(requests.HTTPError):
+        guard.call(URL, _failing(_http_error(status), calls), hedge=False)
+
+    assert calls == [1]
+    assert guard.stats()['retries'] == 0
+    assert guard.breaker.states()[HOST]['state'] == 'closed'
+
+
+def test_server_errors_are_retried():
+    guard = Resilience(attempts=3)
+    calls = []
+
+    with pytest.raises(requests.HTTPError):
+        guard.call(URL, _failing(_http_error(503), calls), hedge=False)
+
+    assert len(calls) == 3
+    assert guard.stats()['retries'] == 2
+
+
+def _prime_latency(guard, seconds):
+    for _ in range(resilience.RESILIENCE['hedge_min_samples']):
+        guard.latency.add(HOST, seconds)
+
+
+def test_hedge_returns_the_faster_result():
+    guard = Resilience(attempts=1)
+    _prime_latency(guard, 0.02)
+    release = threading.Event()
+    calls = []
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        with guard.exchange():
+            if first:
+                release.wait(2)
+                return 'slow'
+            return 'fast'
+
+    try:
+        assert guard.call(URL, fetch) == 'fast'
+    finally:
+        release.set()
+
+    assert guard.stats()['hedges'] == 1
+    assert guard.stats()['hedge_wins'] == 1
+
+
+def test_async_hedge_returns_the_faster_result():
+    guard = Resilience(attempts=1)
+    _prime_latency(guard, 0.02)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        first = len(calls) == 1
+        with guard.exchange():
+            await asyncio.sleep(2 if first else 0)
+        return 'slow' if first else 'fast'
+
+    started = time.time()
+    assert asyncio.run(guard.call_async(URL, fetch)) == 'fast'
+
+    assert time.time() - started < 1
+    assert guard.stats()['hedge_wins'] == 1
+
+
+def test_local_queueing_does_not_trigger_a_hedge():
+    guard = Resilience(attempts=1)
+    _prime_latency(guard, 0.02)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)            # waiting for a rate-limit token, outside the exchange
+        with guard.exchange():
+            return 'ok'
+
+    assert guard.call(URL, fetch) == 'ok'
+    assert calls == [1]
+    assert guard.stats()['hedges'] == 0
@@ -0,0 +1,105 @@
+"""Tests for single_flight.py: sharing a leader's result, stale lease takeover and the wait cap"""
+
+import threading
+import time
+import pytest
+import db
+from single_flight import SingleFlight, StillRunning
+
+
+@pytest.fixture
+def flight(fresh_db):
+    return SingleFlight(lease=5, poll_interval=0.02)
+
+
+def _remote_leader(key, started_at=None):
+    """Pretend another worker process holds the lease for key"""
+    db.execute('INSERT INTO inflight (key, owner, started_at) VALUES (?, ?, ?)',
+               (key, 'other-host:1', started_at or time.time()))
+
+
+def test_follower_gets_leaders_result(flight):
+    release = threading.Event()
+    calls = []
+    results = {}
+
+    def scrape():
+        calls.append(1)
+        release.wait(2)
+        return {'status': 'success', 'case': 'CS/1/2024'}
+
+    def run(name):
+        results[name] = flight.do('case', scrape)
+
+    leader = threading.Thread(target=run, args=('leader',))
+    leader.start()
+    while flight.stats()['in_flight'] == 0:
+        time.sleep(0.01)
+    follower = threading.Thread(target=run, args=('follower',))
+    follower.start()
+    while flight.stats()['followers'] == 0:
+        time.sleep(0.01)
+
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert calls == [1]
+    assert results['leader'] == results['follower'] == {'status': 'success', 'case': 'CS/1/2024'}
+    # Each caller gets its own copy
+    assert results['leader'] is not results['follower']
+
+
+def test_remote_follower_loads_shared_result(flight):
+    _remote_leader('case')
+
+    def finish_remote():
+        time.sleep(0.1)
+        db.execute("DELETE FROM inflight WHERE key = 'case'")
+        db.close_connection()
+
+    threading.Thread(target=finish_remote).start()
+    result = flight.do('case', lambda: pytest.fail('follower must not scrape'),
+                       lambda: {'status': 'success', 'from': 'leader'})
+
+    assert result == {'status': 'success', 'from': 'leader'}
+    assert flight.stats()['remote_followers'] == 1
+
+
+def test_stale_leader_is_taken_over(flight):
+    _remote_leader('case', started_at=time.time() - flight.lease - 1)
+
+    started = time.time()
+    assert flight.do('case', lambda: 'scraped') == 'scraped'
+
+    assert time.time() - started < 1
+    assert flight.stats()['leaders'] == 1
+    assert db.query_one("SELECT 1 FROM inflight WHERE key = 'case'") is None
+
+
+def test_remote_follower_gives_up_after_max_wait(flight):
+    _remote_leader('case')
+
+    started = time.time()
+    with pytest.raises(StillRunning):
+        flight.do('case', lambda: pytest.fail('follower must not scrape'), lambda: None, max_wait=0.2)
+
+    assert 0.2 <= time.time() - started < 1
+    assert flight.stats()['timeouts'] == 1
+    # The other worker's lease is left alone
+    assert db.query_one("SELECT owner FROM inflight WHERE key = 'case'")['owner'] == 'other-host:1'
+
+
+def test_local_follower_gives_up_after_max_wait(flight):
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=('case', lambda: release.wait(2)))
+    leader.start()
+    while flight.stats()['in_flight'] == 0:
+        time.sleep(0.01)
+
+    with pytest.raises(StillRunning):
+        flight.do('case', lambda: pytest.fail('follower must not scrape'), max_wait=0.1)
+
+    release.set()
+    leader.join()
+    assert flight.stats()['timeouts'] == 1
@@ -0,0 +1,152 @@
+"""
+Request tracing for Court Data Fetcher
+span() times a stage (as a context manager or decorator). Each duration
+is added to the current request's trace, which becomes the Server-Timing
+header, and to per-stage histograms served at /metrics in Prometheus text
+format.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from config_file import TRACING
+
+_current = ContextVar('trace', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    def __init__(self, name, help_text, label_names, buckets=None):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets or TRACING['buckets'])
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        """Prometheus text exposition lines"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+
+        with self._lock:
+            series = {labels: (list(counts), total, count)
+                      for labels, (counts, total, count) in self._series.items()}
+
+        for labels, (counts, total, count) in sorted(series.items()):
+            label_text = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+
+        return lines
+
+
+SPAN_SECONDS = Histogram('court_span_duration_seconds', 'Time spent per pipeline stage', ('span',))
+REQUEST_SECONDS = Histogram('court_http_request_duration_seconds', 'API request latency',
+                            ('endpoint', 'method', 'status'))
+
+
+class Trace:
+    """Stage durations for one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, duration):
+        with self._lock:
+            total, count = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (total + duration, count + 1)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """Server-Timing header value, durations in milliseconds"""
+        with self._lock:
+            stages = sorted(self.stages.items())
+        entries = [f'{name};dur={total * 1000:.1f}' for name, (total, _) in stages]
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+
+class span:
+    """
+    Time a stage:  `with span('http_fetch'):`  or  `@span('parse_case')`
+    """
+
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record(self.name, time.perf_counter() - self.started)
+
+    def __call__(self, func):
+        name = self.name
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+
+        return wrapper
+
+
+def record(name, duration):
+    """Add a measured duration to the histograms and the current trace"""
+    if not TRACING['enabled']:
+        return
+    SPAN_SECONDS.observe((name,), duration)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, duration)
+
+
+def start_trace():
+    """Begin a trace for the current request; returns a token for end_trace"""
+    trace = Trace()
+    return trace, _current.set(trace)
+
+
+def end_trace(token):
+    _current.reset(token)
+
+
+def current_trace():
+    return _current.get()
+
+
+def render_metrics(extra_lines=None):
+    """All histograms in Prometheus text format"""
+    lines = SPAN_SECONDS.render() + REQUEST_SECONDS.render() + list(extra_lines or [])
+    return '\n'.join(lines) + '\n'
@@ -6,19 +6,21 @@ import re
 import os
 import hashlib
 from datetime import datetime
-import logging
+from tracing import span
+from log_config import get_logger
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log'),
-        logging.StreamHandler()
-    ]
-)
+# Structured, queue-backed logging (see log_config.py)
+logger = get_logger(__name__)
+
+# Validation rules, shared with the bulk importer (case_import.py)
+CASE_NUMBER_PATTERN = re.compile(r'^[A-Za-z0-9/-]+$')
+CASE_NUMBER_MAX_LENGTH = 20
+CASE_TYPE_PATTERN = re.compile(r'^[A-Z]{1,10}$')
+MIN_YEAR = 1950
 
-logger = logging.getLogger(__name__)
+def max_year():
+    """Latest accepted case year (next year, for cases filed in advance)"""
+    return datetime.now().year + 1
 
 def validate_case_number(case_number):
     """
@@ -32,12 +34,12 @@ def validate_case_number(case_number):
     case_number = str(case_number).strip()
     
     # Check if alphanumeric
-    if not re.match(r'^[A-Za-z0-9/-]+$', case_number):
+    if not CASE_NUMBER_PATTERN.match(case_number):
         return False, "Case number can only contain letters, numbers, / and -"
     
     # Check length
-    if len(case_number) < 1 or len(case_number) > 20:
-        return False, "Case number must be between 1 and 20 characters"
+    if len(case_number) < 1 or len(case_number) > CASE_NUMBER_MAX_LENGTH:
+        return False, f"Case number must be between 1 and {CASE_NUMBER_MAX_LENGTH} characters"
     
     return True, None
 
@@ -48,10 +50,10 @@ def validate_year(year):
     """
     try:
         year_int = int(year)
-        current_year = datetime.now().year
+        latest = max_year()
         
-        if year_int < 1950 or year_int > current_year + 1:
-            return False, f"Year must be between 1950 and {current_year + 1}"
+        if year_int < MIN_YEAR or year_int > latest:
+            return False, f"Year must be between {MIN_YEAR} and {latest}"
         
         return True, None
         
@@ -69,7 +71,7 @@ def validate_case_type(case_type):
     case_type = str(case_type).strip().upper()
     
     # Check format (usually 2-5 letters)
-    if not re.match(r'^[A-Z]{1,10}$', case_type):
+    if not CASE_TYPE_PATTERN.match(case_type):
         return False, "Invalid case type format"
     
     return True, None
@@ -147,12 +149,12 @@ def clean_text(text):
     
     return text.strip()
 
-def generate_query_hash(case_type, case_number, year, court_name):
+def generate_query_hash(case_type, case_number, year, court_type, court_name):
     """
     Generate unique hash for a query
-    Useful for deduplication
+    Useful for deduplication; High Court and District Court cases never share one
     """
-    query_string = f"{case_type}_{case_number}_{year}_{court_name}".lower()
+    query_string = f"{court_type}_{case_type}_{case_number}_{year}_{court_name}".lower()
     return hashlib.md5(query_string.encode()).hexdigest()
 
 def format_file_size(size_bytes):
@@ -182,6 +184,8 @@ def is_valid_url(url):
     
     return url_pattern.match(url) is not None
 
+PARTY_SEPARATOR = re.compile(r'\s+(?:vs\.?|v/s\.?|versus|v\.)\s+', re.IGNORECASE)
+
 def parse_case_parties(text):
     """
     Parse case parties from text like "John Doe vs Jane Smith"
@@ -190,34 +194,33 @@ def parse_case_parties(text):
     if not text:
         return None, None
     
-    # Common separators in case names
-    separators = ['vs', 'v/s', 'versus', 'v.']
-    
-    for sep in separators:
-        if sep in text.lower():
-            parts = re.split(sep, text, maxsplit=1, flags=re.IGNORECASE)
-            if len(parts) == 2:
-                return parts[0].strip(), parts[1].strip()
+    # Common separators in case names, as whole words ("vs" inside "Devsharma" is not one)
+    parts = PARTY_SEPARATOR.split(text, maxsplit=1)
+    if len(parts) == 2:
+        return parts[0].strip(), parts[1].strip()
     
     return text.strip(), None
 
 def retry_on_failure(func, max_attempts=3, delay=2):
     """
-    Retry a function on failure
+    Retry a function on transient failures (timeouts, connection errors, 5xx/429)
+    with exponential backoff and full jitter; other errors are raised at once
     """
     import time
+    from resilience import classify, backoff_delay, TRANSIENT
     
     for attempt in range(max_attempts):
         try:
             return func()
         except Exception as e:
-            if attempt < max_attempts - 1:
+            if classify(e) == TRANSIENT and attempt < max_attempts - 1:
                 logger.warning(f"Attempt {attempt + 1} failed: {str(e)}. Retrying...")
-                time.sleep(delay)
+                time.sleep(backoff_delay(attempt, base=delay))
             else:
-                logger.error(f"All {max_attempts} attempts failed")
+                logger.error(f"Giving up after {attempt + 1} attempts: {str(e)}")
                 raise
 
+@span('detect_captcha')
 def detect_captcha(html_content):
     """
     Detect if CAPTCHA is present in HTML
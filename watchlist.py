@@ -0,0 +1,365 @@
+"""
+Case watchlist for Court Data Fetcher
+Tracked cases are refreshed on a schedule, soonest next hearing first. Each
+result is compared with the case's last snapshot field by field, by hash,
+and only the fields that changed are written to watch_changes, so "what
+changed since yesterday" is a single indexed query.
+
+Refresh due cases once or from cron:  python watchlist.py refresh [--limit N]
+List recent changes:                  python watchlist.py changes [--since YYYY-MM-DD]
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from config_file import WATCHLIST
+from batch_lookup import normalize_items
+from case_cache import case_cache
+from case_service import last_versions, mark_verified, remember_page_hash, store_case_result, stored_result
+from utils_module import format_date
+import db
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+CASE_COLUMNS = ('case_type', 'case_number', 'year', 'court_type', 'court_name')
+
+WATCH_COLUMNS = '''id, case_type, case_number, year, court_type, court_name, label, next_hearing,
+                   case_status, last_checked, last_changed, next_check, failures, last_error'''
+
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def _canonical(value):
+    """Value with insignificant whitespace removed, so layout noise isn't reported as a change"""
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    return value
+
+
+def _hash(value):
+    raw = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def snapshot(parsed_data):
+    """({field: value}, {field: hash}, hash of the whole snapshot) for parsed case details"""
+    values = {field: _canonical(value) for field, value in (parsed_data or {}).items()
+              if field not in WATCHLIST['ignore_fields']}
+    hashes = {field: _hash(value) for field, value in values.items()}
+    return values, hashes, _hash(hashes)
+
+
+def changed_fields(old_hashes, new_hashes):
+    """Fields added, removed or changed between two snapshots"""
+    return sorted(field for field in old_hashes.keys() | new_hashes.keys()
+                  if old_hashes.get(field) != new_hashes.get(field))
+
+
+def _next_hearing(parsed_data):
+    """Next hearing as YYYY-MM-DD, or None when missing or unparseable"""
+    value = format_date(str(parsed_data.get('next_hearing') or ''))
+    return value if value and _ISO_DATE.match(value) else None
+
+
+def _next_check(now, next_hearing, case_status):
+    status = (case_status or '').lower()
+    soon = (now + timedelta(days=WATCHLIST['hearing_soon_days'])).strftime('%Y-%m-%d')
+
+    if any(word in status for word in WATCHLIST['closed_statuses']):
+        delay = WATCHLIST['closed_every']
+    elif next_hearing and next_hearing <= soon:
+        delay = WATCHLIST['hearing_soon_every']
+    else:
+        delay = WATCHLIST['refresh_every']
+    return now + timedelta(seconds=delay)
+
+
+def _limit(limit):
+    limit = min(int(limit or WATCHLIST['default_limit']), WATCHLIST['max_limit'])
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return limit
+
+
+def _cursor(cursor):
+    try:
+        return int(cursor)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def watch(items, default_court_type='high_court', label=None):
+    """
+    Start tracking cases ([case_type, case_number, year, court] lists or dicts)
+    Cases already on the watchlist are left as they are; new ones are due at once
+    Returns {'added': int, 'ids': [...], 'errors': [...]}
+    """
+    cases, errors = normalize_items(items, default_court_type)
+    if not cases:
+        return {'added': 0, 'ids': [], 'errors': errors}
+
+    now = datetime.now()
+    with db.transaction() as conn:
+        before = conn.total_changes
+        conn.executemany('''INSERT OR IGNORE INTO watchlist
+                            (query_hash, case_type, case_number, year, court_type, court_name,
+                             label, next_check, created_at)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                         [(query_hash, *(case[column] for column in CASE_COLUMNS), label, now, now)
+                          for query_hash, case in cases.items()])
+        added = conn.total_changes - before
+
+        ids = {}
+        hashes = list(cases)
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(f'SELECT id, query_hash FROM watchlist WHERE query_hash IN ({placeholders})',
+                                    chunk):
+                ids[row['query_hash']] = row['id']
+
+    return {'added': added, 'ids': [ids[query_hash] for query_hash in cases], 'errors': errors}
+
+
+def unwatch(watch_id):
+    """Stop tracking a case and drop its change history; False if it wasn't watched"""
+    return db.execute('DELETE FROM watchlist WHERE id = ?', (watch_id,)).rowcount > 0
+
+
+def list_watched(cursor=None, limit=None):
+    """
+    One page of watched cases in the order they were added
+    Returns {'items': [...], 'next_cursor': str or None}
+    """
+    limit = _limit(limit)
+    after = _cursor(cursor) if cursor else 0
+    rows = db.query_all(f'SELECT {WATCH_COLUMNS} FROM watchlist WHERE id > ? ORDER BY id LIMIT ?',
+                        (after, limit + 1))
+
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = str(items[-1]['id']) if len(rows) > limit else None
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+def _claim_due(limit):
+    """
+    Due cases, soonest next hearing first (cases without one last)
+    They are pushed back by retry_after while being refreshed, so concurrent
+    schedulers don't refresh the same case twice
+    """
+    now = datetime.now()
+    with db.transaction() as conn:
+        rows = conn.execute('''SELECT * FROM watchlist WHERE next_check <= ?
+                               ORDER BY next_hearing IS NULL, next_hearing, next_check
+                               LIMIT ?''', (now, limit)).fetchall()
+        conn.executemany('UPDATE watchlist SET next_check = ? WHERE id = ?',
+                         [(now + timedelta(seconds=WATCHLIST['retry_after']), row['id']) for row in rows])
+    return rows
+
+
+def apply_result(conn, row, result):
+    """
+    Compare a fresh lookup of a watched case with its last snapshot and record the delta
+    Only a changed case gets a new queries row; an unchanged one just gets last_checked,
+    and the new page_hash when its page was parsed (results the scraper marked
+    unchanged must already carry the stored version)
+    Returns 'baseline' (first snapshot), 'changed', 'unchanged' or 'failed'
+    """
+    now = datetime.now()
+
+    if result.get('status') == 'error':
+        failures = row['failures'] + 1
+        delay = min(WATCHLIST['retry_after'] * 2 ** (failures - 1), WATCHLIST['max_retry_after'])
+        conn.execute('''UPDATE watchlist SET failures = ?, last_error = ?, last_checked = ?, next_check = ?
+                        WHERE id = ?''',
+                     (failures, str(result.get('message'))[:500], now, now + timedelta(seconds=delay), row['id']))
+        return 'failed'
+
+    parsed_data = result.get('parsed_data') or {}
+    values, hashes, snapshot_hash = snapshot(parsed_data)
+    next_hearing = _next_hearing(parsed_data)
+    case_status = parsed_data.get('case_status')
+    next_check = _next_check(now, next_hearing, case_status)
+
+    if snapshot_hash == row['snapshot_hash']:
+        if not result.get('unchanged'):
+            # The page was re-parsed but the fields match: store its new fingerprint so the
+            # next check can skip parsing (pages that carry a timestamp differ every time)
+            remember_page_hash(row['query_hash'], result.get('page_hash'))
+        conn.execute('''UPDATE watchlist SET last_checked = ?, next_check = ?, failures = 0, last_error = NULL
+                        WHERE id = ?''', (now, next_check, row['id']))
+        result['query_id'] = row['last_query_id']
+        return 'unchanged'
+
+    baseline = row['snapshot_hash'] is None
+    fields = changed_fields(json.loads(row['field_hashes'] or '{}'), hashes)
+    conn.executemany('''INSERT INTO watch_changes (watch_id, field, value, baseline, changed_at)
+                        VALUES (?, ?, ?, ?, ?)''',
+                     [(row['id'], field,
+                       json.dumps(values[field], ensure_ascii=False) if field in values else None,
+                       int(baseline), now) for field in fields])
+
+    if not result.get('unchanged'):
+        result['query_id'] = store_case_result(row['case_type'], row['case_number'], row['year'],
+                                               row['court_type'], row['court_name'], result, row['query_hash'])
+    conn.execute('''UPDATE watchlist SET snapshot_hash = ?, field_hashes = ?, next_hearing = ?, case_status = ?,
+                                         last_query_id = ?, last_checked = ?, last_changed = ?, next_check = ?,
+                                         failures = 0, last_error = NULL
+                    WHERE id = ?''',
+                 (snapshot_hash, json.dumps(hashes, sort_keys=True), next_hearing, case_status,
+                  result['query_id'], now, now, next_check, row['id']))
+    return 'baseline' if baseline else 'changed'
+
+
+def refresh_due(limit=None):
+    """
+    Refresh one batch of due cases and record what changed
+    Returns counts: checked, baseline, changed, unchanged, failed
+    """
+    rows = {row['id']: row for row in _claim_due(limit or WATCHLIST['batch_size'])}
+    counts = {'checked': len(rows), 'baseline': 0, 'changed': 0, 'unchanged': 0, 'failed': 0}
+    if not rows:
+        return counts
+
+    # Imported on first refresh, as in batch_lookup
+    from async_scraper import get_async_scraper
+
+    versions = last_versions(row['query_hash'] for row in rows.values())
+    cases = {}
+    for watch_id, row in rows.items():
+        version = versions.get(row['query_hash'])
+        cases[watch_id] = {column: row[column] for column in CASE_COLUMNS}
+        cases[watch_id]['last_hash'] = version['page_hash'] if version else None
+    results = dict(get_async_scraper().fetch_many(cases))
+
+    # A page unchanged since the stored version isn't parsed; its stored details are compared instead
+    verified = []
+    for watch_id, result in results.items():
+        if result.get('unchanged'):
+            version = versions[rows[watch_id]['query_hash']]
+            result.update(stored_result(version))
+            verified.append(version['id'])
+
+    with db.transaction() as conn:
+        mark_verified(verified)
+        outcomes = {watch_id: apply_result(conn, rows[watch_id], result) for watch_id, result in results.items()}
+
+    for watch_id, outcome in outcomes.items():
+        counts[outcome] += 1
+        if outcome != 'failed':
+            case_cache.put(rows[watch_id]['query_hash'], results[watch_id])
+
+    logger.info('watchlist refreshed', extra=counts)
+    return counts
+
+
+def _since(value):
+    if not value:
+        return datetime.now() - timedelta(seconds=WATCHLIST['changes_window'])
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError('since must be YYYY-MM-DD or an ISO timestamp')
+
+
+def _decode(value):
+    return None if value is None else json.loads(value)
+
+
+def changes_since(since=None, watch_id=None, field=None, cursor=None, limit=None):
+    """
+    Field changes recorded since a time (default: the last changes_window), oldest first
+    Each item has the field's previous and new value; first snapshots aren't changes
+    Returns {'items': [...], 'next_cursor': str or None}
+    """
+    limit = _limit(limit)
+    where = ['c.baseline = 0', 'c.changed_at >= ?']
+    params = [_since(since)]
+
+    if watch_id:
+        where.append('c.watch_id = ?')
+        params.append(int(watch_id))
+    if field:
+        where.append('c.field = ?')
+        params.append(field)
+    if cursor:
+        where.append('c.id > ?')
+        params.append(_cursor(cursor))
+
+    rows = db.query_all(f'''SELECT c.id, c.watch_id, w.case_type, w.case_number, w.year, w.court_type,
+                                   w.court_name, w.label, c.field, c.value, c.changed_at,
+                                   (SELECT p.value FROM watch_changes p
+                                    WHERE p.watch_id = c.watch_id AND p.field = c.field AND p.id < c.id
+                                    ORDER BY p.id DESC LIMIT 1) AS previous
+                            FROM watch_changes c
+                            JOIN watchlist w ON w.id = c.watch_id
+                            WHERE {' AND '.join(where)}
+                            ORDER BY c.id LIMIT ?''', (*params, limit + 1))
+
+    items = []
+    for row in rows[:limit]:
+        item = dict(row)
+        item['value'] = _decode(item['value'])
+        item['previous'] = _decode(item['previous'])
+        items.append(item)
+
+    next_cursor = str(items[-1]['id']) if len(rows) > limit else None
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+def stats():
+    """Watched cases, how many are due now and how many are failing"""
+    row = db.query_one('''SELECT COUNT(*) AS watched,
+                                 COALESCE(SUM(next_check <= ?), 0) AS due,
+                                 COALESCE(SUM(failures > 0), 0) AS failing,
+                                 COALESCE(SUM(snapshot_hash IS NULL), 0) AS never_checked
+                          FROM watchlist''', (datetime.now(),))
+    return dict(row)
+
+
+def _refresh_loop():
+    while True:
+        try:
+            # Keep going while whole batches come back, so a backlog drains in one round
+            while refresh_due()['checked'] >= WATCHLIST['batch_size']:
+                pass
+        except Exception as e:
+            logger.warning('watchlist refresh failed', extra={'error': str(e)})
+        time.sleep(WATCHLIST['interval'])
+
+
+def start_scheduler():
+    """Refresh due watched cases periodically in a daemon thread"""
+    thread = threading.Thread(target=_refresh_loop, daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Case watchlist')
+    parser.add_argument('command', choices=['refresh', 'changes'])
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--since', default=None, help='YYYY-MM-DD or ISO timestamp (changes)')
+    args = parser.parse_args()
+
+    db.migrate()
+    if args.command == 'refresh':
+        print(f"[OK] {refresh_due(args.limit)}")
+        return
+
+    for change in changes_since(args.since, limit=args.limit or WATCHLIST['max_limit'])['items']:
+        print(f"{change['changed_at']}  {change['case_type']}/{change['case_number']}/{change['year']} "
+              f"{change['court_name']}  {change['field']}: {change['previous']!r} -> {change['value']!r}")
+
+
+if __name__ == '__main__':
+    main()